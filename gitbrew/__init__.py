@@ -1 +1,6 @@
-from .shell import Shell
+def __getattr__(name):
+    if name == "Shell":  # deferred so that `python -m gitbrew.cli` stays light
+        from .shell import Shell
+
+        return Shell
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
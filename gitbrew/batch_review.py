@@ -0,0 +1,145 @@
+"""
+Headless batch review of the open pull requests of a repository
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from tqdm import tqdm
+
+from .utilities import RateLimiter
+
+
+class BatchReviewer:
+    """
+    Reviews many pull requests concurrently without user interaction
+    """
+
+    def __init__(
+        self,
+        reviewer,
+        workers=8,
+        calls_per_minute=60,
+        post=False,
+        logger=None,
+        rate_limiter=None,
+    ):
+        """
+        Initialize the batch reviewer
+
+        :param reviewer: PullRequestReviewer with the repository already set,
+            it is not modified and can be shared with other callers
+        :param workers: number of pull requests reviewed concurrently
+        :param calls_per_minute: limit for the LLM calls of the batch,
+            None for no limit
+        :param post: post the reviews to the pull requests
+        :param logger: Logger
+        :param rate_limiter: RateLimiter shared with other batches,
+            replaces calls_per_minute
+        """
+        self.reviewer = reviewer
+        self.rate_limiter = rate_limiter or RateLimiter(calls_per_minute)
+        self.workers = workers
+        self.post = post
+        self.logger = logger or reviewer.logger
+
+    def select(self, labels=(), author=None, since=None):
+        """
+        Select the open pull requests matching all given filters
+
+        :param labels: review pull requests with any of these labels
+        :param author: login of the pull request author
+        :param since: only pull requests updated since (datetime or ISO date)
+        :return: list of pull requests
+        """
+        since = self._as_utc(since)
+        labels = set(labels)
+        selected = []
+        pull_requests = self.reviewer.git_helper.get_pull_requests(
+            state="open", sort="updated", direction="desc"
+        )
+        for pr in pull_requests:
+            if since and self._as_utc(pr.updated_at) < since:
+                break  # sorted by last update, the rest is older
+            if author and pr.user.login != author:
+                continue
+            if labels and not labels & {label.name for label in pr.labels}:
+                continue
+            selected.append(pr)
+        self.logger.info(f"Selected {len(selected)} pull request(s) for review")
+        return selected
+
+    @staticmethod
+    def _as_utc(value):
+        """
+        Convert an ISO date string or datetime to an aware UTC datetime
+
+        :param value: datetime, ISO formatted string or None
+        :return: datetime or None
+        """
+        if not value:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+
+    def run(self, pull_requests):
+        """
+        Review pull requests through a pool of workers
+
+        :param pull_requests: list of pull requests
+        :return: report as a list of dicts ordered by pull request number
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._review, pr) for pr in pull_requests]
+            report = [
+                future.result()
+                for future in tqdm(as_completed(futures), total=len(futures))
+            ]
+        return sorted(report, key=lambda entry: entry["number"])
+
+    def _review(self, pr):
+        """
+        Review a single pull request, errors are recorded in the report
+
+        :param pr: pull request object
+        :return: report entry
+        """
+        entry = {
+            "number": pr.number,
+            "title": pr.title,
+            "url": pr.html_url,
+            "author": pr.user.login,
+            "reviews": {},
+            "skipped": {},
+            "posted": False,
+            "error": None,
+        }
+        try:
+            reviews, entry["skipped"] = self.reviewer.review_files(
+                pr, rate_limiter=self.rate_limiter
+            )
+            entry["reviews"] = {
+                file: "\n".join(review) for file, review in reviews.items()
+            }
+            if self.post and reviews:
+                self.reviewer.post_review(reviews, pr)
+                entry["posted"] = True
+        except Exception as e:
+            self.logger.error(f"Error reviewing pull request #{pr.number}: {e}")
+            entry["error"] = str(e)
+        return entry
+
+    @staticmethod
+    def write_report(report, path):
+        """
+        Write the report as JSON
+
+        :param report: list of report entries
+        :param path: output file path
+        :return: None
+        """
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
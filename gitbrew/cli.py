@@ -0,0 +1,519 @@
+"""
+Non-interactive command line interface
+Subcommands run without prompts so that gitbrew can be used from scripts and CI
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from dotenv import find_dotenv, load_dotenv
+
+from .batch_review import BatchReviewer
+from .pull_requests import PullRequestReviewer
+from .utilities import RateLimiter, setup_logger
+from .webhook import WebhookServer, replay
+
+
+def build_parser():
+    """
+    Build the argument parser for the subcommands
+    :return: ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog="gitbrew",
+        description="LLM-powered github utility. "
+        "Run without arguments to start the interactive shell.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    review_all = subparsers.add_parser(
+        "review-all", help="Review all open pull requests of a repository"
+    )
+    review_all.add_argument("repos", nargs="+", help="Repositories (user/repo)")
+    review_all.add_argument(
+        "--label",
+        action="append",
+        default=[],
+        help="Only review pull requests with this label (repeatable)",
+    )
+    review_all.add_argument("--author", help="Only review pull requests by this user")
+    review_all.add_argument(
+        "--since",
+        type=_iso_date,
+        help="Only review pull requests updated since (YYYY-MM-DD)",
+    )
+    review_all.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Pull requests reviewed concurrently, per repository",
+    )
+    review_all.add_argument(
+        "--repo-workers",
+        type=int,
+        default=2,
+        help="Repositories reviewed concurrently",
+    )
+    review_all.add_argument(
+        "--calls-per-minute",
+        type=int,
+        default=60,
+        help="Global limit for LLM calls per minute (0 for no limit)",
+    )
+    review_all.add_argument(
+        "--diff-source",
+        choices=PullRequestReviewer.DIFF_SOURCES,
+        help="Read diffs from the GitHub API or from a cached local clone",
+    )
+    review_all.add_argument(
+        "--post", action="store_true", help="Post the reviews to the pull requests"
+    )
+    review_all.add_argument(
+        "--report",
+        default="gitbrew_review_report.json",
+        help="Path of the JSON report",
+    )
+    review_all.set_defaults(handler=review_all_pull_requests)
+
+    serve = subparsers.add_parser(
+        "serve", help="Review pull requests automatically from GitHub webhooks"
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    serve.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    serve.add_argument(
+        "--workers", type=int, default=2, help="Pull requests reviewed concurrently"
+    )
+    serve.add_argument(
+        "--diff-source",
+        choices=PullRequestReviewer.DIFF_SOURCES,
+        help="Read diffs from the GitHub API or from a cached local clone",
+    )
+    serve.add_argument(
+        "--no-post",
+        dest="post",
+        action="store_false",
+        help="Only log the reviews, do not post them",
+    )
+    serve.set_defaults(handler=serve_webhooks)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Post a recorded webhook payload to a running server"
+    )
+    replay_parser.add_argument("payload", help="Path of the recorded JSON payload")
+    replay_parser.add_argument(
+        "--url", default="http://127.0.0.1:8080/", help="Webhook endpoint"
+    )
+    replay_parser.add_argument(
+        "--event", default="pull_request", help="Value of the X-GitHub-Event header"
+    )
+    replay_parser.set_defaults(handler=replay_payload)
+
+    review = subparsers.add_parser("review", help="Review pull requests by url")
+    review.add_argument(
+        "pull_requests",
+        nargs="+",
+        help="Pull request urls, or user/repo#number",
+    )
+    review.add_argument(
+        "--diff-source",
+        choices=PullRequestReviewer.DIFF_SOURCES,
+        help="Read diffs from the GitHub API or from a cached local clone",
+    )
+    review.add_argument(
+        "--post", action="store_true", help="Post the reviews to the pull requests"
+    )
+    _add_batch_arguments(review, calls_per_minute=60)
+    review.set_defaults(handler=review_pull_requests)
+
+    dedupe = subparsers.add_parser(
+        "issues-dedupe", help="Find likely duplicates among the open issues"
+    )
+    dedupe.add_argument("repos", nargs="+", help="Repositories (user/repo)")
+    dedupe.add_argument(
+        "--threshold", type=float, default=0.8, help="Minimum cosine similarity"
+    )
+    _add_batch_arguments(dedupe)
+    dedupe.set_defaults(handler=find_duplicate_issues)
+
+    similar = subparsers.add_parser(
+        "issues-similar", help="Find open issues similar to a new issue"
+    )
+    similar.add_argument("repos", nargs="+", help="Repositories (user/repo)")
+    similar.add_argument("--title", required=True, help="Title of the new issue")
+    similar.add_argument("--body", default="", help="Description of the new issue")
+    similar.add_argument(
+        "--top", type=int, default=10, help="Number of similar issues per repository"
+    )
+    _add_batch_arguments(similar)
+    similar.set_defaults(handler=find_similar_issues)
+
+    readme = subparsers.add_parser(
+        "readme", help="Generate readmes for repositories or local checkouts"
+    )
+    readme.add_argument(
+        "repos", nargs="+", help="Repository urls or paths of local checkouts"
+    )
+    readme.add_argument(
+        "--output-dir",
+        default="gitbrew_readmes",
+        help="Directory the readmes are written to, one <user_repo>.md per repository",
+    )
+    readme.add_argument(
+        "--token-budget", type=int, help="Estimated tokens to spend per repository"
+    )
+    readme.add_argument(
+        "--time-budget", type=int, help="Seconds to spend summarizing per repository"
+    )
+    readme.add_argument(
+        "--update",
+        action="store_true",
+        help="Update readmes generated before with the changes since then",
+    )
+    _add_batch_arguments(readme, workers=2)
+    readme.set_defaults(handler=generate_readmes)
+
+    daemon = subparsers.add_parser(
+        "daemon", help="Keep gitbrew loaded in the background for faster subcommands"
+    )
+    daemon.add_argument(
+        "action",
+        choices=("start", "stop", "status", "run"),
+        help="start in the background, stop, show the status or run in the foreground",
+    )
+    daemon.add_argument(
+        "--socket", help="Path of the Unix socket (GITBREW_SOCKET by default)"
+    )
+    daemon.set_defaults(handler=manage_daemon)
+    return parser
+
+
+def _iso_date(value):
+    """
+    Parse an ISO date argument
+    :param value: argument value
+    :return: datetime
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value} (use YYYY-MM-DD)")
+
+
+def _add_batch_arguments(parser, workers=4, calls_per_minute=None):
+    """
+    Arguments shared by the subcommands that process many targets
+    :param parser: subcommand parser
+    :param workers: default number of targets processed concurrently
+    :param calls_per_minute: default limit for LLM calls, None for no limit
+    :return: None
+    """
+    parser.add_argument(
+        "--workers", type=int, default=workers, help="Targets processed concurrently"
+    )
+    if calls_per_minute:
+        parser.add_argument(
+            "--calls-per-minute",
+            type=int,
+            default=calls_per_minute,
+            help="Global limit for LLM calls per minute (0 for no limit)",
+        )
+    parser.add_argument(
+        "--output", help="Path of the JSON output, printed to stdout if not set"
+    )
+
+
+def _run_concurrently(targets, run, workers, logger):
+    """
+    Run a function for every target through a pool of workers
+    Output printed by the handlers goes to stderr, so that stdout only
+    carries the JSON result. Errors are recorded per target.
+
+    :param targets: list of targets (repositories, pull requests)
+    :param run: callable taking a target, returns a JSON serializable result
+    :param workers: number of targets processed concurrently
+    :param logger: Logger
+    :return: list of dicts with the target, result and error, in input order
+    """
+
+    def _run(target):
+        try:
+            return {"target": target, "result": run(target), "error": None}
+        except Exception as e:
+            logger.error(f"Error processing {target}: {e}")
+            return {"target": target, "result": None, "error": str(e)}
+
+    with redirect_stdout(sys.stderr), ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(_run, targets))
+
+
+def _write_output(results, path):
+    """
+    Write results as JSON to a file or to stdout
+    :param results: list of result entries
+    :param path: output path, None for stdout
+    :return: exit code, 1 if any target failed
+    """
+    if path:
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 1 if any(entry["error"] for entry in results) else 0
+
+
+def review_all_pull_requests(args, logger):
+    """
+    Review all open pull requests matching the filters and write a JSON report
+    A repository that cannot be reviewed gets an entry with its error, the
+    report is written for the other repositories.
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    rate_limiter = RateLimiter(args.calls_per_minute)
+
+    def review_repository(repo):
+        reviewer = PullRequestReviewer(logger, diff_source=args.diff_source)
+        reviewer.git_helper.set_repo(repo)
+        batch_reviewer = BatchReviewer(
+            reviewer,
+            workers=args.workers,
+            post=args.post,
+            logger=logger,
+            rate_limiter=rate_limiter,  # one limit across all repositories
+        )
+        pull_requests = batch_reviewer.select(
+            labels=args.label, author=args.author, since=args.since
+        )
+        report = batch_reviewer.run(pull_requests)
+        for entry in report:
+            entry["repo"] = repo
+        return report
+
+    results = _run_concurrently(
+        args.repos, review_repository, min(args.repo_workers, len(args.repos)), logger
+    )
+    report = []
+    for result in results:
+        if result["error"]:  # the pull requests of the repository were not listed
+            report.append(
+                {"repo": result["target"], "number": None, "error": result["error"]}
+            )
+        else:
+            report += result["result"]
+    BatchReviewer.write_report(report, args.report)
+    failed = [
+        f"{entry['repo']}#{entry['number']}" if entry["number"] else entry["repo"]
+        for entry in report
+        if entry["error"]
+    ]
+    reviewed = sum(1 for entry in report if entry["number"])
+    print(f"Reviewed {reviewed} pull request(s). Report saved to {args.report}")
+    if failed:
+        print(f"Failed to review: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+def serve_webhooks(args, logger):
+    """
+    Run the webhook server until interrupted
+    The secret is read from GITHUB_WEBHOOK_SECRET, it is required unless
+    the server only listens on a loopback interface
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret and not WebhookServer.is_loopback(args.host):
+        print(f"Set GITHUB_WEBHOOK_SECRET to listen on {args.host or 'all interfaces'}")
+        return 2
+    server = WebhookServer(
+        PullRequestReviewer(logger, diff_source=args.diff_source),
+        logger,
+        secret=secret,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        post=args.post,
+    )
+    print(f"Listening for GitHub webhooks on http://{args.host}:{args.port}/")
+    server.serve_forever()
+    return 0
+
+
+def replay_payload(args, logger):
+    """
+    Post a recorded payload, signed with GITHUB_WEBHOOK_SECRET if it is set
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    with open(args.payload, "rb") as file:
+        payload = file.read()
+    status, response = replay(
+        args.url, payload, args.event, os.getenv("GITHUB_WEBHOOK_SECRET")
+    )
+    print(f"{status}: {json.dumps(response)}")
+    return 0 if status < 400 else 1
+
+
+def review_pull_requests(args, logger):
+    """
+    Review pull requests given by url and print the reviews as JSON
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    reviewer = PullRequestReviewer(logger, diff_source=args.diff_source)
+    reviewer.rate_limiter = RateLimiter(args.calls_per_minute)
+
+    def review(target):
+        match = re.search(r"([\w.-]+/[\w.-]+)(?:/pull/|#)(\d+)", target)
+        if not match:
+            raise ValueError(f"Invalid pull request: {target}")
+        repo = reviewer.git_helper.github.get_repo(match[1])
+        pr = repo.get_pull(int(match[2]))
+        if args.post:
+            posted, skipped = reviewer.review_and_post(pr)
+            return {"url": pr.html_url, "posted": posted, "skipped": skipped}
+        reviews, skipped = reviewer.review_files(pr)
+        reviews = {file: "\n".join(review) for file, review in reviews.items()}
+        return {"url": pr.html_url, "reviews": reviews, "skipped": skipped}
+
+    results = _run_concurrently(args.pull_requests, review, args.workers, logger)
+    return _write_output(results, args.output)
+
+
+def find_duplicate_issues(args, logger):
+    """
+    Find likely duplicate issues in every repository and print them as JSON
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    from .issue_manager import IssueManager
+
+    def dedupe(repo):
+        issue_manager = IssueManager(logger)
+        issue_manager.git_helper.set_repo(repo)
+        return issue_manager.find_duplicate_issues(args.threshold)
+
+    results = _run_concurrently(args.repos, dedupe, args.workers, logger)
+    return _write_output(results, args.output)
+
+
+def find_similar_issues(args, logger):
+    """
+    Find the open issues similar to a new issue in every repository
+    and print them as JSON
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    from .issue_manager import IssueManager
+
+    def search(repo):
+        issue_manager = IssueManager(logger)
+        issue_manager.git_helper.set_repo(repo)
+        return issue_manager.find_similar_issues(args.title, args.body, args.top)
+
+    results = _run_concurrently(args.repos, search, args.workers, logger)
+    return _write_output(results, args.output)
+
+
+def generate_readmes(args, logger):
+    """
+    Generate or update the readmes of repositories and local checkouts
+    and print the written files as JSON
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    from .generate_readme import ReadmeGenerator
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    def generate(repo_url):
+        name = re.sub(r"\W+", "_", repo_url.split("github.com/")[-1]).strip("_")
+        if os.path.isdir(repo_url):
+            name = os.path.basename(os.path.abspath(repo_url))
+        file_name = os.path.join(args.output_dir, f"{name}.md")
+        readme_generator = ReadmeGenerator(logger)
+        if args.update and readme_generator.readme_updater.update(repo_url, file_name):
+            return {"file": file_name, "updated": True}
+        readme_generator.write_readme(
+            repo_url, file_name, args.token_budget, args.time_budget
+        )
+        return {
+            "file": file_name,
+            "updated": False,
+            "failed": readme_generator.failed,
+            "over_budget": readme_generator.over_budget,
+        }
+
+    results = _run_concurrently(args.repos, generate, args.workers, logger)
+    return _write_output(results, args.output)
+
+
+def manage_daemon(args, logger):
+    """
+    Start, stop or query the gitbrew daemon
+    :param args: parsed arguments
+    :param logger: Logger
+    :return: exit code
+    """
+    from . import daemon
+
+    path = args.socket or daemon.socket_path()
+    if args.action == "run":
+        return daemon.Daemon(logger, path).serve()
+    answer = daemon.request({"ping": True}, path)
+    if args.action == "status":
+        if not answer:
+            print("The gitbrew daemon is not running")
+            return 1
+        print(f"The gitbrew daemon is running (pid {answer['pid']}) on {path}")
+        return 0
+    if args.action == "stop":
+        if answer:
+            daemon.request({"stop": True}, path)
+            print(f"Stopped the gitbrew daemon (pid {answer['pid']})")
+        return 0
+    if answer:
+        print(f"The gitbrew daemon is already running (pid {answer['pid']})")
+        return 0
+    subprocess.Popen(
+        [sys.executable, "-m", "gitbrew.main", "daemon", "run", "--socket", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 60  # the libraries are imported before listening
+    while time.monotonic() < deadline:
+        if answer := daemon.request({"ping": True}, path):
+            print(f"Started the gitbrew daemon (pid {answer['pid']}) on {path}")
+            return 0
+        time.sleep(0.1)
+    print("The gitbrew daemon did not start, see the gitbrew logs")
+    return 1
+
+
+def main(argv=None):
+    """
+    Entry point for the subcommands
+    :param argv: command line arguments without the program name
+    :return: exit code
+    """
+    args = build_parser().parse_args(argv)
+    load_dotenv(find_dotenv(usecwd=True))
+    logger = setup_logger(save_logs=True, print_logs=False)
+    return args.handler(args, logger)
@@ -3,36 +3,55 @@ Handler for git commands
 """
 import os
 import re
+import shlex
 import subprocess
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 from PyInquirer import prompt
 from rich.console import Console
 
-from .constants import SafeCommands
+from .constants import ConversationLimits, OutputLimits, SafeCommands
 from .exceptions import InvalidAnswerFormatException
+from .intent_cache import IntentCache
+from .intent_parser import IntentParser
 from .llms.openai import OpenAI
 from .prompts.clarification_prompt import ClarificationPrompt
 from .prompts.explain_command_prompt import ExplainCommandPrompt
 from .prompts.generate_command_prompt import GenerateCommandPrompt
 from .questions import Questions
+from .repo_context import RepoContext
+from .utilities import setup_logger
 
 
 class CommandHandler:
-    def __init__(self, logger, model="gpt-3.5-turbo", temperature=0.2, debug=False):
+    def __init__(
+        self, logger=None, model="gpt-3.5-turbo", temperature=0.2, debug=False
+    ):
         load_dotenv()
         openai_api_key = os.getenv("OPENAI_API_KEY")
         self.console = Console(color_system="auto")
         self.openai_client = OpenAI(
             openai_api_key, chat_model=model, temperature=temperature
         )
-        self.logger = logger
+        self.logger = logger or setup_logger()
         self.START_TAG = "<START>"
         self.END_TAG = "<END>"
         self.SEP_TAG = "<SEP>"
         self.COMMAND_PATTERN = re.compile(r"<START>(.*?)<END>", re.DOTALL)
         self.CLARIFICATION_PATTERN = re.compile(r"<CLARIFY>(.*?)</CLARIFY", re.DOTALL)
         self.GIT_PREFIX = "git"
+        self.intent_cache = IntentCache(self.logger)
+        self.intent_parser = IntentParser(self.logger)
+        self.repo_context = RepoContext(self.logger)
+        # latest command lists extracted from answers, oldest dropped first
+        self.history = deque(maxlen=ConversationLimits.COMMAND_HISTORY)
+        # explanations of the commands awaiting confirmation, one at a time
+        # so that the ones never asked for can be cancelled before they start
+        self.explainer = ThreadPoolExecutor(1, thread_name_prefix="explain")
+        self.explanations = {}  # command: Future
 
     def handle(self, line):
         """
@@ -40,12 +59,33 @@ class CommandHandler:
         Generates the prompt, retrieves answer from the model,
         extracts commands from it and executes them
         """
-        answer = self.ask_llm(line)
+        scope = self.repo_context.scope()
+        # common intents are parsed offline, repeated ones come from the cache
+        parsed = self.intent_parser.parse(line)
+        cached = None if parsed else self.intent_cache.get(line, scope)
+        answer = parsed or cached or self.ask_llm(line)
         self.logger.debug(f"LLM: {answer}")
-        commands = self.extract_commands(answer) or self._get_clarification(
-            answer, GenerateCommandPrompt.template.format(user_intention=line)
+        # answers that needed a clarification are not reused
+        reusable = not (parsed or cached)
+        if not (commands := self.extract_commands(answer)):
+            reusable = False
+            commands = self._get_clarification(answer, self.generate_prompt(line))
+        # a cached answer may come from a similar intent, the user confirms all of it
+        executed = self._execute_commands(commands, confirm_all=bool(cached))
+        if executed and reusable:  # only answers the user accepted and that ran
+            self.intent_cache.set(line, scope, answer)
+
+    def generate_prompt(self, line):
+        """
+        Prompt for the commands of an intent, with the repository context
+        :param line: User intention
+        :return: prompt
+        """
+        context = self.repo_context.describe()
+        return GenerateCommandPrompt.template.format(
+            user_intention=line,
+            repository_context=f"Repository context:\n{context}\n" if context else "",
         )
-        self._execute_commands(commands)
 
     def ask_llm(self, line):
         """
@@ -54,8 +94,9 @@ class CommandHandler:
         :param line: User intention
         :return: Answer from the model
         """
-        _prompt = GenerateCommandPrompt.template.format(user_intention=line)
-        _prompt = self.openai_client.create_message(user_prompt=_prompt)
+        _prompt = self.openai_client.create_message(
+            user_prompt=self.generate_prompt(line)
+        )
         self.logger.debug(f"Prompt: {_prompt}")
         return self.openai_client.ask_llm(_prompt)
 
@@ -63,7 +104,7 @@ class CommandHandler:
         """
         Extract commands from the answer
         If clarification present, return [] otherwise return list of commands
-        Update command history
+        Update command history (bounded, the oldest entries are dropped)
         :param answer:
         :return: list of commands in the answer
         """
@@ -71,20 +112,40 @@ class CommandHandler:
             extracted_commands = list(
                 map(lambda s: s.strip(), commands[1].split(self.SEP_TAG))
             )
+            self.history.append(extracted_commands)
             return [] if "<CLARIFY>" in answer else extracted_commands
         if "<CLARIFY>" in answer:
             return []
         raise InvalidAnswerFormatException("Answer does not contain commands")
 
-    def _execute_commands(self, commands):
+    def _execute_commands(self, commands, confirm_all=False):
         """
         Execute commands after confirmation from the user
 
         For each command, checks if its whitelisted (safe / read-only), and executes it.
         If it's not safe, ask for confirmation from the user
 
+        :param commands: list of commands and comments
+        :param confirm_all: ask for confirmation of the whitelisted commands too
+        :return: True if every command was accepted and ran successfully
         """
         self.print_comments(commands)
+        self._prefetch_explanations(commands, confirm_all)
+        try:
+            return self._confirm_and_execute(commands, confirm_all)
+        finally:
+            for future in self.explanations.values():
+                future.cancel()
+            self.explanations.clear()
+
+    def _confirm_and_execute(self, commands, confirm_all=False):
+        """
+        Execute the commands in order, stopping at the first failure or refusal
+        :param commands: list of commands and comments
+        :param confirm_all: ask for confirmation of the whitelisted commands too
+        :return: True if at least one command ran and none failed or was refused
+        """
+        executed = False
         for command in commands:
             command_list = command.split()
             command = self.sanitize_command(
@@ -93,34 +154,137 @@ class CommandHandler:
             if command_list[0] != self.GIT_PREFIX:  # check if it's a comment
                 pass
             elif (  # check if it's a safe command or get confirmation from the user
-                command_list[1] not in SafeCommands.commands
-                and self.get_user_confirmation(command)
-                or command_list[1] in SafeCommands.commands
+                not self._needs_confirmation(command, confirm_all)
+                or self.get_user_confirmation(command)
             ):
                 try:
                     self.logger.info(f"Executing: {command}")
                     print(f"Executing: {command}")
-                    result = subprocess.check_output(
-                        command_list,
-                        cwd=".",
-                        universal_newlines=True,
-                        stderr=subprocess.STDOUT,
-                    )
-                    self.logger.debug(f"Result: {result}")
-                    # self.console.print(result)
-                    print(result)
-                except subprocess.CalledProcessError as e:
-                    self.logger.error(
-                        f"Command '{e.cmd}' failed with return code {e.returncode}"
-                    )
-                    self.logger.error(f"Output:\n{e.output}")
-                    break
+                    return_code, tail = self._run_command(command_list)
+                    self.logger.debug(f"Result (last lines):\n{tail}")
+                    if return_code:
+                        self.logger.error(
+                            f"Command '{command}' failed with return code {return_code}"
+                        )
+                        self.logger.error(f"Output:\n{tail}")
+                        return False
+                    executed = True
                 except Exception as e:
                     self.logger.error(f"Error: {e}")
-                    break
+                    return False
             else:
                 self.logger.info("Aborting...")
-                return
+                return False
+        return executed
+
+    def _needs_confirmation(self, command, confirm_all=False):
+        """
+        Check whether a command is a git command that is not whitelisted
+        :param command: command
+        :param confirm_all: whitelisted git commands need a confirmation too
+        :return: True if the user has to confirm it
+        """
+        command_list = command.split()
+        return (
+            len(command_list) > 1
+            and command_list[0] == self.GIT_PREFIX
+            and (confirm_all or command_list[1] not in SafeCommands.commands)
+        )
+
+    def _prefetch_explanations(self, commands, confirm_all=False):
+        """
+        Start explaining the commands the user will be asked to confirm
+        Commands with placeholders are explained on demand, after sanitizing.
+        :param commands: list of commands
+        :param confirm_all: whitelisted git commands need a confirmation too
+        :return: None
+        """
+        for command in commands:
+            if self._needs_confirmation(command, confirm_all) and not re.search(
+                r"<.*?>", command
+            ):
+                self.explanations[command] = self.explainer.submit(
+                    self._explain, command
+                )
+
+    def _run_command(self, command_list):
+        """
+        Run a command and stream its output as it is produced
+        The output of read-only git commands goes through a pager when printed
+        to a terminal, other commands print directly. Only a bounded tail is
+        kept in memory, for the logs.
+
+        :param command_list: command and its arguments
+        :return: return code, last lines of the output
+        """
+        tail = deque(maxlen=OutputLimits.LOG_TAIL_LINES)
+        sys.stdout.flush()  # "Executing" comes before the output
+        pager = self._open_pager() if self._pages_output(command_list) else None
+        output = pager.stdin if pager else sys.stdout
+        process = subprocess.Popen(
+            command_list,
+            cwd=".",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            errors="replace",
+        )
+        closed = False  # the user quit the pager before the end of the output
+        try:
+            for line in process.stdout:
+                tail.append(line)
+                try:
+                    output.write(line)
+                except BrokenPipeError:
+                    closed = True
+                    process.terminate()
+                    break
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+            if pager:
+                try:
+                    pager.stdin.close()
+                except BrokenPipeError:
+                    pass
+                pager.wait()
+        return 0 if closed else return_code, "".join(tail)
+
+    def _pages_output(self, command_list):
+        """
+        Check whether a command is paged, like git only pages the commands
+        that show something. Commands that change the repository may prompt
+        for credentials or open an editor, which the pager would block.
+
+        :param command_list: command and its arguments
+        :return: True for read-only git commands
+        """
+        return (
+            len(command_list) > 1
+            and command_list[0] == self.GIT_PREFIX
+            and command_list[1] in SafeCommands.commands
+        )
+
+    def _open_pager(self):
+        """
+        Start the pager of git (GIT_PAGER, PAGER or less) for a terminal
+        :return: pager process, None if the output is not a terminal
+        """
+        if not sys.stdout.isatty():
+            return None
+        pager = os.getenv("GIT_PAGER") or os.getenv("PAGER") or OutputLimits.PAGER
+        if pager == "cat":
+            return None
+        try:
+            return subprocess.Popen(
+                shlex.split(pager),
+                stdin=subprocess.PIPE,
+                universal_newlines=True,
+                errors="replace",
+            )
+        except OSError as e:
+            self.logger.error(f"Could not start the pager '{pager}': {e}")
+            return None
 
     def print_comments(self, commands):
         """
@@ -171,38 +335,63 @@ class CommandHandler:
             # handle explanations
             if answer == "Explain":
                 self._print_explanation(command)
+        if future := self.explanations.pop(command, None):
+            future.cancel()  # not needed anymore, if it has not started yet
         return answer == "Yes"
 
     def _print_explanation(self, command):
         """
         Called when user chooses "explain" in the confirmation prompt
         Should explain the command and return to the confirmation prompt
+        Uses the prefetched explanation if there is one
         :param command:
         :return:
         """
+        future = self.explanations.get(command)
+        explanation = future.result() if future else None
+        if explanation is None:  # not prefetched, or the request failed
+            explanation = self._explain(command)
+            self.explanations.pop(command, None)
+        print(f"Explanation: {explanation}")
 
+    def _explain(self, command):
+        """
+        Ask the model to explain a command
+        :param command: git command
+        :return: explanation, None if the request failed
+        """
         content = ExplainCommandPrompt.template.format(command=command)
         message = self.openai_client.create_message(user_prompt=content)
-        print(f"Explanation: {self.openai_client.ask_llm(message)}")
+        return self.openai_client.ask_llm(message)
 
     def _get_clarification(self, answer, line):
         """
         Ask the user for clarification.
-        Recursively seek clarification until the answer contains commands.
-        :param answer:
-        :param line:
-        :return:
+        Seek clarification until the answer contains commands, for at most
+        ConversationLimits.MAX_CLARIFICATIONS rounds. Only the latest
+        exchanges are sent back with the original prompt.
+        :param answer: answer of the LLM asking for clarification
+        :param line: original prompt
+        :return: list of commands, [] if the intent stays unclear
         """
-
-        clarification = re.search(self.CLARIFICATION_PATTERN, answer)
-        question = Questions.GET_CLARIFICATION
-        question[0]["message"] = clarification[1]
-        answer = prompt(question)["clarification"]
-        conversation = f"Prompt: {line}\n Clarification: {clarification[1]}\n  {answer}"
-        line = ClarificationPrompt.template.format(conversation=conversation)
-        message = self.openai_client.create_message(user_prompt=line)
-        answer = self.openai_client.ask_llm(message)
-        if commands := self.extract_commands(answer):
-            return commands
-        else:
-            return self._get_clarification(answer, conversation)
+        exchanges = deque(maxlen=ConversationLimits.CLARIFICATION_HISTORY)
+        for _ in range(ConversationLimits.MAX_CLARIFICATIONS):
+            clarification = re.search(self.CLARIFICATION_PATTERN, answer)
+            if not clarification:
+                self.logger.error(f"No commands or clarification in: {answer}")
+                return []
+            question = Questions.GET_CLARIFICATION
+            question[0]["message"] = clarification[1]
+            exchanges.append((clarification[1], prompt(question)["clarification"]))
+            conversation = f"Prompt: {line}\n" + "".join(
+                f" Clarification: {asked}\n  {answered}\n"
+                for asked, answered in exchanges
+            )
+            _prompt = ClarificationPrompt.template.format(conversation=conversation)
+            message = self.openai_client.create_message(user_prompt=_prompt)
+            answer = self.openai_client.ask_llm(message)
+            if commands := self.extract_commands(answer):
+                return commands
+        print("The instruction is still unclear, please rephrase it.")
+        self.logger.info("Giving up after too many clarifications")
+        return []
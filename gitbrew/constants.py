@@ -137,3 +137,177 @@ class IgnoredFiles:
     """
 
     FILE_TYPES = {"git", "github", "png", "jpg", "jpeg", "gif", "gitignore", "txt"}
+
+
+class SummaryLimits:
+    """
+    Limits for the files that are summarized for a readme
+    """
+
+    MAX_FILE_SIZE = 1_000_000  # bytes read from a local file
+    README_TOKEN_BUDGET = 60000  # tokens of summaries in the final readme prompt
+    DIRECTORY_TOKEN_BUDGET = 12000  # tokens of summaries per directory summary call
+    FILE_TOKEN_BUDGET = 6000  # tokens of file content per summary call
+    MAX_CHUNKS = 4  # summary calls per file, the rest of larger files is dropped
+    WORKERS = 8  # files summarized concurrently
+    CALLS_PER_MINUTE = 120  # LLM calls shared by all summarization workers
+
+
+class IntentCacheLimits:
+    """
+    Defaults for the cache of natural language git commands
+    """
+
+    THRESHOLD = 0.9  # cosine similarity for an intent to count as a repeat
+    MAX_ENTRIES = 500  # least recently used intents are evicted beyond this
+    DIMENSIONS = 1024  # size of the hashed n-gram vectors
+
+
+class ConversationLimits:
+    """
+    Bounds of the state kept by the natural language git command line
+    """
+
+    MAX_CLARIFICATIONS = 5  # clarification rounds before the intent is dropped
+    CLARIFICATION_HISTORY = 4  # latest exchanges sent back to the LLM
+    COMMAND_HISTORY = 50  # latest extracted command lists kept
+
+
+class RepoContextLimits:
+    """
+    Repository context given to the LLM with natural language git commands
+    """
+
+    MAX_AGE = 30  # seconds, for working tree changes that leave the index alone
+    MAX_FILES = 20  # changed files listed, the rest are counted
+    RECENT_BRANCHES = 5  # branches listed, most recently committed first
+
+
+class OutputLimits:
+    """
+    Output of the git commands run for the natural language command line
+    """
+
+    PAGER = "less -FRX"  # used if GIT_PAGER and PAGER are not set
+    LOG_TAIL_LINES = 200  # only the last lines of an output are logged
+
+
+class RankingSignals:
+    """
+    File names that are most informative for a readme
+    """
+
+    MANIFESTS = {
+        "pyproject.toml",
+        "setup.py",
+        "setup.cfg",
+        "requirements.txt",
+        "Pipfile",
+        "package.json",
+        "Cargo.toml",
+        "go.mod",
+        "Gemfile",
+        "pom.xml",
+        "build.gradle",
+        "composer.json",
+        "CMakeLists.txt",
+        "Makefile",
+        "Dockerfile",
+        "docker-compose.yml",
+    }
+
+    ENTRY_POINTS = {
+        "__main__.py",
+        "main.py",
+        "cli.py",
+        "app.py",
+        "manage.py",
+        "index.js",
+        "index.ts",
+        "main.js",
+        "main.ts",
+        "server.js",
+        "main.go",
+        "main.rs",
+        "lib.rs",
+    }
+
+    PACKAGE_ROOTS = {"__init__.py", "mod.rs", "index.js", "index.ts"}
+
+    LOW_VALUE_DIRECTORIES = {
+        "test",
+        "tests",
+        "__tests__",
+        "spec",
+        "examples",
+        "example",
+        "docs",
+        "fixtures",
+        "migrations",
+    }
+
+
+class ReviewFilters:
+    """
+    Defaults for the pull request review pre-filter.
+    Patterns follow .gitattributes semantics: a pattern without a slash
+    matches the file name at any depth, otherwise it matches the full path.
+    """
+
+    GENERATED_PATTERNS = (
+        "*.min.js",
+        "*.min.css",
+        "*.map",
+        "*.bundle.js",
+        "*_pb2.py",
+        "*_pb2_grpc.py",
+        "*.pb.go",
+        "*.pb.cc",
+        "*.pb.h",
+        "*.pb.swift",
+        "*.g.dart",
+        "*.generated.*",
+        "*.designer.cs",
+        "*.snap",
+        "**/__snapshots__/**",
+        "package-lock.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "poetry.lock",
+        "Cargo.lock",
+        "go.sum",
+    )
+
+    VENDORED_PATTERNS = (
+        "**/vendor/**",
+        "**/vendors/**",
+        "**/third_party/**",
+        "**/third-party/**",
+        "**/node_modules/**",
+        "**/bower_components/**",
+        "**/dist/**",
+    )
+
+    BINARY_FILES = {
+        ".png",
+        ".jpg",
+        ".jpeg",
+        ".gif",
+        ".ico",
+        ".pdf",
+        ".zip",
+        ".gz",
+        ".tar",
+        ".jar",
+        ".so",
+        ".dll",
+        ".exe",
+        ".woff",
+        ".woff2",
+        ".ttf",
+        ".pyc",
+    }
+
+    MAX_PATCH_SIZE = 40000  # characters
+    MAX_LINE_LENGTH = 500  # characters, longer lines usually mean minified code
+    MAX_LONG_LINE_RATIO = 0.5  # share of added lines over MAX_LINE_LENGTH
@@ -0,0 +1,329 @@
+"""
+Background gitbrew process for the non-interactive subcommands
+
+The daemon imports the subcommands and their libraries once and keeps the
+logger and the process-wide caches, such as the tokenizer, between requests.
+The handlers and their GitHub and OpenAI clients are still built for every
+request. The gitbrew client forwards subcommands to it over a Unix domain
+socket and streams the output back, so that repeated calls from scripts and
+editors skip the interpreter and import startup.
+
+Requests are handled one at a time, in the working directory of the
+client and with the settings of its environment and .env, so that the
+tokens and GITBREW_* options of the caller are used rather than those the
+daemon was started with. The protocol is JSON lines: the client sends
+{"argv": [...], "cwd": "...", "env": {...}}, the daemon answers with
+{"stdout": "..."} and {"stderr": "..."} messages and a final {"exit": code}.
+"""
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+# subcommands that finish on their own, the others are never forwarded
+FORWARDED_COMMANDS = frozenset(
+    {"review", "review-all", "issues-dedupe", "issues-similar", "readme"}
+)
+
+# settings read by the subcommands, sent by the client with every request,
+# along with every GITBREW_* variable
+FORWARDED_VARIABLES = frozenset(
+    {"GITHUB_TOKEN", "OPENAI_API_KEY", "PINECONE_API_KEY", "XDG_CACHE_HOME"}
+)
+
+# imported when the daemon starts, so that the first request is warm
+WARM_MODULES = (
+    "gitbrew.cli",
+    "gitbrew.generate_readme",
+    "gitbrew.issue_manager",
+    "gensim.parsing.preprocessing",
+    "sklearn.metrics.pairwise",
+    "tiktoken",
+)
+
+
+def socket_path():
+    """
+    Path of the daemon socket, GITBREW_SOCKET or the gitbrew cache
+    The cache directory is resolved like utilities.cache_dir, which is not
+    imported so that the client stays fast.
+
+    :return: path of the Unix socket
+    """
+    if path := os.getenv("GITBREW_SOCKET"):
+        return path
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "gitbrew", "daemon.sock")
+
+
+def _forwarded(name):
+    """
+    :param name: name of an environment variable
+    :return: True if the variable is sent to the daemon
+    """
+    return name in FORWARDED_VARIABLES or name.startswith("GITBREW_")
+
+
+def client_environment():
+    """
+    Settings of the client, from its environment and the .env file that the
+    subcommands would load. Variables that are not set are sent as None, so
+    that the daemon does not fall back to its own values.
+
+    :return: dict of name: value or None
+    """
+    from dotenv import dotenv_values, find_dotenv  # only needed to forward
+
+    environment = dict.fromkeys(FORWARDED_VARIABLES)
+    if path := find_dotenv(usecwd=True):
+        environment.update(
+            (name, value)
+            for name, value in dotenv_values(path).items()
+            if _forwarded(name) and value is not None
+        )
+    # like load_dotenv, the environment takes precedence over .env
+    environment.update(
+        (name, value) for name, value in os.environ.items() if _forwarded(name)
+    )
+    return environment
+
+
+@contextmanager
+def _environment(environment):
+    """
+    Apply the settings of a client while a request runs
+    The forwarded variables of the daemon are restored afterwards.
+
+    :param environment: dict of name: value or None from client_environment,
+        None to keep the environment of the daemon
+    :return: context manager
+    """
+    if environment is None:
+        yield
+        return
+    names = {name for name in os.environ if _forwarded(name)} | set(environment)
+    previous = {name: os.environ.get(name) for name in names}
+
+    def apply(values):
+        for name in names:
+            if values.get(name) is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = values[name]
+
+    apply(environment)
+    try:
+        yield
+    finally:
+        apply(previous)
+
+
+def request(message, path=None, stdout=None, stderr=None):
+    """
+    Send a message to the daemon and stream its output
+    :param message: JSON serializable request
+    :param path: path of the socket, socket_path() by default
+    :param stdout: stream for the output, sys.stdout by default
+    :param stderr: stream for the errors, sys.stderr by default
+    :return: final message with the exit code, None if no daemon is listening
+    """
+    path = path or socket_path()
+    streams = {"stdout": stdout or sys.stdout, "stderr": stderr or sys.stderr}
+    if not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:  # stale socket of a daemon that is gone
+        connection.close()
+        return None
+    with connection, connection.makefile("r", encoding="utf-8") as answers:
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        for line in answers:
+            answer = json.loads(line)
+            if "exit" in answer:
+                return answer
+            for name, stream in streams.items():
+                if name in answer:
+                    stream.write(answer[name])
+                    stream.flush()
+    streams["stderr"].write("Lost the connection to the gitbrew daemon\n")
+    return {"exit": 1}
+
+
+def forward(argv, path=None):
+    """
+    Run a subcommand in the daemon if one is running
+    Set GITBREW_NO_DAEMON to always run in the current process.
+
+    :param argv: command line arguments without the program name
+    :param path: path of the socket, socket_path() by default
+    :return: exit code, None if the subcommand has to run in this process
+    """
+    if not argv or argv[0] not in FORWARDED_COMMANDS:
+        return None
+    if os.getenv("GITBREW_NO_DAEMON"):
+        return None
+    try:
+        message = {"argv": argv, "cwd": os.getcwd(), "env": client_environment()}
+        answer = request(message, path)
+    except KeyboardInterrupt:
+        return 130
+    return None if answer is None else answer["exit"]
+
+
+class _Stream(io.TextIOBase):
+    """
+    Text stream that sends what is written to the client
+    """
+
+    def __init__(self, handler, name):
+        """
+        :param handler: request handler of the client
+        :param name: "stdout" or "stderr"
+        """
+        super().__init__()
+        self.handler = handler
+        self.name = name
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self.handler.send({self.name: text})
+        return len(text)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one client connection
+    """
+
+    def setup(self):
+        super().setup()
+        self.lock = threading.Lock()  # subcommands print from worker threads
+
+    def send(self, message):
+        """
+        Send a JSON line to the client
+        :param message: JSON serializable message
+        :return: None
+        """
+        with self.lock:
+            self.wfile.write(json.dumps(message).encode() + b"\n")
+            self.wfile.flush()
+
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline() or "{}")
+        except ValueError:
+            message = {}
+        try:
+            if message.get("stop"):
+                self.send({"exit": 0, "pid": os.getpid()})
+                # shutdown waits for serve_forever, which runs this handler
+                threading.Thread(target=self.server.shutdown).start()
+            elif message.get("ping"):
+                self.send({"exit": 0, "pid": os.getpid()})
+            elif "argv" in message:
+                with _environment(message.get("env")):
+                    code = self.server.runner.run(
+                        message["argv"],
+                        message.get("cwd"),
+                        _Stream(self, "stdout"),
+                        _Stream(self, "stderr"),
+                    )
+                self.send({"exit": code})
+            else:
+                self.send({"stderr": "Invalid request\n"})
+                self.send({"exit": 2})
+        except OSError as e:  # the client went away
+            self.server.runner.logger.info(f"Client disconnected: {e}")
+
+
+class Daemon:
+    """
+    Serves the non-interactive subcommands over a Unix domain socket
+    """
+
+    def __init__(self, logger, path=None, warm_modules=WARM_MODULES):
+        """
+        :param logger: Logger shared by all requests
+        :param path: path of the socket, socket_path() by default
+        :param warm_modules: modules imported before accepting requests
+        """
+        self.logger = logger
+        self.path = path or socket_path()
+        self.warm_modules = warm_modules
+        self.server = None
+
+    def serve(self):
+        """
+        Import the subcommands and serve requests until stopped
+        :return: exit code, 1 if another daemon is listening on the socket
+        """
+        for module in self.warm_modules:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                self.logger.info(f"Could not preload {module}: {e}")
+        if request({"ping": True}, self.path):
+            print(f"A gitbrew daemon is already listening on {self.path}")
+            return 1
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left by a daemon that did not stop cleanly
+        umask = os.umask(0o177)  # only the user may connect
+        try:
+            self.server = socketserver.UnixStreamServer(self.path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        self.server.runner = self
+        self.logger.info(f"gitbrew daemon {os.getpid()} listening on {self.path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.logger.info("gitbrew daemon stopped")
+        return 0
+
+    def run(self, argv, cwd, stdout, stderr):
+        """
+        Run a subcommand in the working directory of the client
+        :param argv: command line arguments without the program name
+        :param cwd: working directory of the client
+        :param stdout: stream for the output
+        :param stderr: stream for the errors
+        :return: exit code
+        """
+        from .cli import build_parser
+
+        self.logger.info(f"Running {argv} in {cwd}")
+        previous = os.getcwd()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                os.chdir(cwd or previous)
+                args = build_parser().parse_args(argv)
+                if args.command not in FORWARDED_COMMANDS:
+                    print(f"{args.command} cannot run in the daemon", file=stderr)
+                    return 2
+                return args.handler(args, self.logger) or 0
+            except SystemExit as e:  # argparse errors and --help
+                return e.code if isinstance(e.code, int) else int(e.code is not None)
+            except Exception as e:
+                self.logger.error(f"Error running {argv}: {e}")
+                traceback.print_exc()
+                return 1
+            finally:
+                os.chdir(previous)
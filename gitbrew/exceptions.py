@@ -13,3 +13,19 @@ class InvalidRepositoryException(Exception):
     """
 
     pass
+
+
+class BinaryFileException(Exception):
+    """
+    Raised when a file with binary content is summarized
+    """
+
+    pass
+
+
+class IncompleteAnswerException(Exception):
+    """
+    Raised when a streamed answer stops before it is complete
+    """
+
+    pass
@@ -0,0 +1,201 @@
+"""
+Importance ranking of repository files for readme generation
+
+Files are scored from cheap, local signals so that the most informative
+files of large repositories are summarized first: manifests, entry points,
+package roots, modules imported by many other files, and shallow paths.
+"""
+import math
+import posixpath
+import re
+from collections import defaultdict
+
+from .constants import RankingSignals, SummaryLimits
+
+PYTHON_IMPORT = re.compile(
+    r"^\s*(?:from\s+(\.*[\w.]*)\s+import|import\s+([\w., ]+))", re.M
+)
+JS_IMPORT = re.compile(
+    r"""(?:\bfrom\s+|\brequire\(\s*|\bimport\s*\(?\s*)['"](\.{1,2}/[^'"]+)['"]"""
+)
+JS_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+
+
+class FileRanker:
+    """
+    Ranks files by their expected value for a readme
+    Only contents that are available without network requests are parsed
+    for imports, remote files are ranked by their path and size alone.
+    """
+
+    def __init__(self, logger, max_read=SummaryLimits.MAX_FILE_SIZE):
+        """
+        :param logger: Logger
+        :param max_read: files larger than this are not parsed for imports
+        """
+        self.logger = logger
+        self.max_read = max_read
+
+    @staticmethod
+    def estimate_tokens(file):
+        """
+        Rough number of prompt tokens needed to summarize a file
+        Uses the size, so that files do not have to be read or tokenized.
+
+        :param file: RepoFile object
+        :return: estimated tokens
+        """
+        limit = SummaryLimits.FILE_TOKEN_BUDGET * SummaryLimits.MAX_CHUNKS
+        return min((file.size or 0) // 4, limit) + 200  # 200 for the prompt itself
+
+    def rank(self, files):
+        """
+        Sort files by score, the most important first
+        All files are kept until they are sorted, pass files that load their
+        content lazily so that the contents are not held in memory.
+
+        :param files: iterable of RepoFile objects
+        :return: list of RepoFile objects
+        """
+        files = list(files)
+        in_degree = self.import_counts(files)
+        scores = {file.path: self.score(file, in_degree[file.path]) for file in files}
+        ranked = sorted(files, key=lambda file: (-scores[file.path], file.path))
+        self.logger.info(
+            "Ranked files: "
+            + ", ".join(
+                f"{file.path} ({scores[file.path]:.1f})" for file in ranked[:20]
+            )
+        )
+        return ranked
+
+    def score(self, file, in_degree=0):
+        """
+        Score a file from its path, size and how often it is imported
+
+        :param file: RepoFile object
+        :param in_degree: number of files importing the file
+        :return: score, higher is more important
+        """
+        directories = (
+            posixpath.dirname(file.path).split("/") if "/" in file.path else []
+        )
+        score = 0.0
+        if file.name in RankingSignals.MANIFESTS:
+            score += 10
+        if file.name in RankingSignals.ENTRY_POINTS:
+            score += 6
+        if file.name in RankingSignals.PACKAGE_ROOTS:
+            score += 3
+        if file.name.lower().startswith("readme"):
+            score += 4
+        score += 3 * math.log2(1 + in_degree)
+        score -= 0.75 * len(directories)
+        if RankingSignals.LOW_VALUE_DIRECTORIES & {d.lower() for d in directories}:
+            score -= 5
+        size = file.size or 0
+        if size < 100:
+            score -= 2  # empty modules and stubs say little
+        elif size > 100_000:
+            score -= math.log2(size / 100_000)  # large files are costly and often data
+        return score
+
+    def import_counts(self, files):
+        """
+        Count how many files import each file, for Python and JavaScript sources
+
+        :param files: list of RepoFile objects
+        :return: dict of path: number of importing files
+        """
+        modules = self._module_index(files)
+        paths = {file.path for file in files}
+        importers = defaultdict(set)
+        for file in files:
+            if not file.local or (file.size or 0) > self.max_read:
+                continue
+            extension = posixpath.splitext(file.path)[1]
+            if extension != ".py" and extension not in JS_EXTENSIONS:
+                continue
+            try:
+                text = file.read().decode("utf-8", errors="replace")
+            except Exception as e:
+                self.logger.error(f"Could not read {file.path} for ranking: {e}")
+                continue
+            if extension == ".py":
+                targets = self._python_targets(file.path, text, modules)
+            else:
+                targets = self._js_targets(file.path, text, paths)
+            for target in targets - {file.path}:
+                importers[target].add(file.path)
+        return defaultdict(int, {path: len(s) for path, s in importers.items()})
+
+    @staticmethod
+    def _module_index(files):
+        """
+        Map dotted module names to Python files
+        Every suffix of the module path is indexed, so that packages below
+        a source directory (src/pkg/mod.py) are found as pkg.mod.
+
+        :param files: list of RepoFile objects
+        :return: dict of module name: path
+        """
+        modules = {}
+        for file in files:
+            if not file.path.endswith(".py"):
+                continue
+            parts = file.path[: -len(".py")].split("/")
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            for start in range(len(parts)):
+                modules.setdefault(".".join(parts[start:]), file.path)
+        return modules
+
+    @staticmethod
+    def _python_targets(path, text, modules):
+        """
+        Files imported by a Python module
+
+        :param path: path of the module
+        :param text: source code
+        :param modules: module index from _module_index
+        :return: set of paths
+        """
+        package = posixpath.dirname(path).replace("/", ".")
+        names = []
+        for from_name, import_names in PYTHON_IMPORT.findall(text):
+            if import_names:
+                names += [n.split(" as ")[0].strip() for n in import_names.split(",")]
+            elif from_name.startswith("."):
+                level = len(from_name) - len(from_name.lstrip("."))
+                base = package.split(".")[: len(package.split(".")) - level + 1]
+                names.append(".".join(filter(None, base + [from_name.lstrip(".")])))
+            else:
+                names.append(from_name)
+        targets = set()
+        for name in names:
+            while name and name not in modules:  # from pkg.mod import function
+                name = name.rpartition(".")[0]
+            if name:
+                targets.add(modules[name])
+        return targets
+
+    @staticmethod
+    def _js_targets(path, text, paths):
+        """
+        Files imported through relative imports by a JavaScript or TypeScript file
+
+        :param path: path of the file
+        :param text: source code
+        :param paths: set of all paths
+        :return: set of paths
+        """
+        targets = set()
+        for specifier in JS_IMPORT.findall(text):
+            base = posixpath.normpath(
+                posixpath.join(posixpath.dirname(path), specifier)
+            )
+            candidates = [base]
+            candidates += [base + extension for extension in JS_EXTENSIONS]
+            candidates += [f"{base}/index{extension}" for extension in JS_EXTENSIONS]
+            targets.update(candidate for candidate in candidates if candidate in paths)
+        return targets
@@ -1,19 +1,31 @@
 """
 Generates readme from a github repository
 """
-import base64
+import hashlib
 import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from PyInquirer import prompt
 from tqdm import tqdm
 
 from . import utilities
-from .constants import FILE_TYPES
+from .constants import FILE_TYPES, SummaryLimits
+from .exceptions import BinaryFileException
+from .file_ranking import FileRanker
 from .gitpy import GitPy
 from .llms.openai import OpenAI
+from .local_repository import LocalRepository
 from .prompts.generate_readme_prompt import GenerateReadmePrompt
 from .prompts.summarize_file_prompt import SummarizeFilePrompt
 from .questions import Questions
+from .readme_updater import ReadmeUpdater
+from .summary_cache import SummaryCache
+from .summary_reducer import SummaryReducer
+from .text_processing import is_binary, split_text
+from .utilities import RateLimiter
 
 
 class ReadmeGenerator:
@@ -21,7 +33,27 @@ class ReadmeGenerator:
     Generates readme from a GitHub repository
     """
 
-    def __init__(self, logger):
+    CONTENT_SOURCES = ("archive", "tree")
+
+    def __init__(
+        self,
+        logger,
+        content_source=None,
+        workers=SummaryLimits.WORKERS,
+        calls_per_minute=SummaryLimits.CALLS_PER_MINUTE,
+    ):
+        """
+        :param logger: Logger
+        :param content_source: "archive" downloads the repository tarball once,
+            "tree" lists the tree and fetches every file through the API
+        :param workers: number of files summarized concurrently
+        :param calls_per_minute: limit for LLM calls shared by all workers
+        """
+        self.content_source = content_source or os.getenv(
+            "GITBREW_README_SOURCE", "archive"
+        )
+        if self.content_source not in self.CONTENT_SOURCES:
+            raise ValueError(f"Invalid content source: {self.content_source}")
         self.git_helper = GitPy(os.getenv("GITHUB_TOKEN"), logger=logger)
         self.openai_agent = OpenAI(
             os.getenv("OPENAI_API_KEY"),
@@ -31,6 +63,23 @@ class ReadmeGenerator:
             max_tokens=8000,
         )
         self.logger = logger
+        self.workers = workers
+        self.rate_limiter = RateLimiter(calls_per_minute)
+        self.failed = {}  # path: error of the files that could not be summarized
+        self.over_budget = []  # paths left out by the token or time budget
+        self.file_ranker = FileRanker(logger)
+        self.head_sha = None  # commit the files were read from
+        # path: blob sha of the uncommitted files read from a local checkout
+        self.uncommitted = None
+        self.readme_updater = ReadmeUpdater(self, logger)
+        self.summary_cache = SummaryCache(logger)
+        self.summary_reducer = SummaryReducer(
+            self.openai_agent,
+            logger,
+            workers=workers,
+            summary_cache=self.summary_cache,
+            rate_limiter=self.rate_limiter,
+        )
 
     def handle(self):
         """
@@ -41,86 +90,306 @@ class ReadmeGenerator:
         """
         _prompt = Questions.README_INPUT_URL
         repo_url = prompt(_prompt)["repo_url"].strip()
-        self.logger.info(f"Generating readme for {repo_url}")
+        _prompt = Questions.README_FILE_NAME
+        file_name = self._process_file_name(prompt(_prompt)["file_name"].strip())
+        if self.readme_updater.load_state(repo_url, file_name):
+            _prompt = Questions.README_UPDATE
+            if prompt(_prompt)["choice"] == Questions.UPDATE_README:
+                try:
+                    if self.readme_updater.update(repo_url, file_name):
+                        return
+                except Exception as e:
+                    self.logger.error(f"Error updating readme: {e}")
+                print("gitbrew> Could not update the readme, regenerating it.")
+        budget = prompt(Questions.README_BUDGET)
+        token_budget = self._parse_budget(budget["token_budget"])
+        time_budget = self._parse_budget(budget["time_budget"])
+        self.logger.info(f"Generating readme for {repo_url} into {file_name}")
         try:
-            readme_content = self.generate_readme(repo_url)
+            self.write_readme(
+                repo_url, file_name, token_budget=token_budget, time_budget=time_budget
+            )
+        except KeyboardInterrupt:
+            print(f"\ngitbrew> Interrupted, partial readme kept in {file_name}.partial")
         except Exception as e:
             self.logger.error(f"Error generating readme: {e}")
             print(
-                "gitbrew> Error generating readme. Please try again with a valid url."
+                "gitbrew> Error generating readme. "
+                "Please try again with a valid url or path."
             )
-            return
-        _prompt = Questions.README_FILE_NAME
-        file_name = prompt(_prompt)["file_name"].strip()
-        self._process_file_name(file_name)
-        self.logger.info(f"Writing readme to {file_name}")
-        self._write_readme(file_name, readme_content)
+            if os.path.exists(f"{file_name}.partial"):
+                print(f"gitbrew> Partial readme kept in {file_name}.partial")
+
+    def write_readme(self, repo_url, file_name, token_budget=None, time_budget=None):
+        """
+        Generate the readme and stream it into a file and the terminal
+        :param repo_url: html url of the repository or path of a local checkout
+        :param file_name: output file
+        :param token_budget: estimated tokens to spend on file summaries
+        :param time_budget: seconds to spend on file summaries
+        :return: None
+        """
+        message = self._readme_message(repo_url, token_budget, time_budget)
+        self._write_readme(file_name, self.openai_agent.stream_llm(message))
+        self.readme_updater.save_state(
+            repo_url, file_name, self.head_sha, self.uncommitted
+        )
 
     @staticmethod
     def _write_readme(file_name, readme_content):
         """
-        Writes the readme content to a file "README.md"
-        in the current directory.
-        If a file with the same name exists, it will be overwritten.
-        :param readme_content: markdown content
+        Writes the readme content to a file, "README.md" by default.
+        Content is written to "<file_name>.partial" section by section
+        as it arrives and echoed to the terminal. The partial file replaces
+        the target once complete, so an existing file is only overwritten
+        by a finished readme. If the stream is interrupted or raises, the
+        error propagates and the partial file is left next to the target.
+
+        :param file_name: output file
+        :param readme_content: iterable of markdown pieces, such as a stream
         :return:
         """
-        with open(file_name, "w") as f:
-            f.write(readme_content)
+        partial_name = f"{file_name}.partial"
+        pending, empty = "", True
+        with open(partial_name, "w") as f:
+            try:
+                for piece in readme_content:
+                    print(piece, end="", flush=True)
+                    pending += piece
+                    empty = empty and not piece.strip()
+                    section = pending.rfind("\n#")  # flush the completed sections
+                    if section > 0:
+                        f.write(pending[: section + 1])
+                        f.flush()
+                        pending = pending[section + 1 :]
+            finally:  # keeps the partial readme when interrupted
+                f.write(pending.rstrip() + "\n")
+                print()
+        if empty:
+            os.remove(partial_name)
+            raise ValueError("The readme is empty")
+        os.replace(partial_name, file_name)
 
-    def summarize_files(self, files):
+    @staticmethod
+    def _parse_budget(value):
         """
-        Summarizes files
-        :param files:
-        :return:
+        Parse a budget entered by the user
+        :param value: input string
+        :return: positive integer, None for no limit
         """
-        return [
-            f"File: {file}. \n Summary: {self._summarize_file(file)}"
-            for file in tqdm(files)
-            if self._to_summarize(file)
-        ]
+        try:
+            return int(value) if int(value) > 0 else None
+        except (TypeError, ValueError):
+            return None
+
+    def summarize_files(self, files, token_budget=None, time_budget=None):
+        """
+        Summarizes files concurrently
+        Files are handed to a pool of workers as they are received, with a bounded
+        number of files in flight. Summaries keep the order of the files.
+        Files that fail are logged in self.failed and left out.
+
+        With a budget, files are ranked by importance first and summarized
+        in rank order until the budget runs out. Files that do not fit
+        are logged in self.over_budget.
+
+        :param files: iterable of RepoFile objects
+        :param token_budget: estimated prompt tokens to spend, None for no limit
+        :param time_budget: seconds after which no new file is started
+        :return: dict of path: summary
+        """
+        self.failed = {}
+        self.over_budget = []
+        files = (file for file in files if self._to_summarize(file))
+        if token_budget or time_budget:
+            files = self.file_ranker.rank(files)
+        deadline = time.monotonic() + time_budget if time_budget else None
+        spent = 0
+        in_flight = threading.BoundedSemaphore(self.workers * 2)
+        futures = {}
+        with tqdm() as progress, ThreadPoolExecutor(self.workers) as executor:
+
+            def done(_):
+                in_flight.release()
+                progress.update()
+
+            for file in files:
+                tokens = self.file_ranker.estimate_tokens(file)
+                if token_budget and spent + tokens > token_budget:
+                    self.over_budget.append(file.path)
+                    continue  # smaller files further down may still fit
+                in_flight.acquire()
+                if deadline and time.monotonic() > deadline:
+                    in_flight.release()
+                    self.over_budget.append(file.path)
+                    continue
+                spent += tokens
+                future = executor.submit(self._summarize_file, file)
+                future.add_done_callback(done)
+                futures[file.path] = future
+        summaries = {}
+        for path, future in futures.items():
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary, self.failed[path] = None, str(e)
+            if summary:
+                summaries[path] = summary
+            else:
+                self.failed.setdefault(path, "empty summary")
+                self.logger.error(f"Could not summarize {path}: {self.failed[path]}")
+        return summaries
 
     @staticmethod
     def _to_summarize(file):
         """
         Returns true if the file should be summarized
-        :param file:
+        :param file: RepoFile or path
         :return:
         """
-        return any(file.name.endswith(_type) for _type in FILE_TYPES.FILE_TYPES)
+        name = posixpath.basename(str(file))
+        return any(name.endswith(_type) for _type in FILE_TYPES.FILE_TYPES)
 
     def _summarize_file(self, file):
         """
         Summarizes a file using SummarizeFilePrompt
-        and the openai agent chat endpoint
-        :param file: GitHub file object
+        and the openai agent chat endpoint.
+        Summaries are reused from the cache if the file did not change.
+        The prompt names the file, so the path is part of the cache key.
+        :param file: RepoFile object
         :return: summary of the file
         """
-        system_prompt = SummarizeFilePrompt.system_prompt
-        user_prompt = SummarizeFilePrompt.user_prompt.format(
-            filename=file, content=base64.b64decode(file.content).decode("utf-8")
+        return self.summary_cache.get_or_create(
+            hashlib.sha1(f"{file.path}\0{file.sha}".encode()).hexdigest(),
+            SummarizeFilePrompt.version,
+            self.openai_agent.chat_model,
+            lambda: self._ask_summary(file),
+        )
+
+    def _ask_summary(self, file):
+        """
+        Ask the LLM for the summary of a file
+        Binary files are rejected. Files over the token budget are summarized
+        in chunks, at most SummaryLimits.MAX_CHUNKS, and the summaries are merged.
+
+        :param file: RepoFile object
+        :return: summary of the file
+        """
+        data = file.read()
+        if is_binary(data):
+            raise BinaryFileException(f"{file} is a binary file")
+        chunks, truncated = split_text(
+            data, SummaryLimits.FILE_TOKEN_BUDGET, SummaryLimits.MAX_CHUNKS
+        )
+        if len(chunks) <= 1:
+            user_prompt = SummarizeFilePrompt.user_prompt.format(
+                filename=file, content="".join(chunks)
+            )
+            return self._ask_llm(file, user_prompt)
+        self.logger.info(f"Summarizing {file} in {len(chunks)} parts")
+        summaries = [
+            self._ask_llm(
+                file,
+                SummarizeFilePrompt.chunk_user_prompt.format(
+                    filename=file, part=part, parts=len(chunks), content=chunk
+                ),
+            )
+            for part, chunk in enumerate(chunks, start=1)
+        ]
+        if not all(summaries):
+            return None
+        summary = "\n".join(
+            f"Part {part}: {summary}" for part, summary in enumerate(summaries, 1)
         )
+        if truncated:
+            summary += f"\n(Only the first {len(chunks)} parts of the file were read.)"
+        return summary
+
+    def _ask_llm(self, file, user_prompt):
+        """
+        Ask the LLM with the SummarizeFilePrompt system prompt
+        :param file: RepoFile object
+        :param user_prompt: user prompt
+        :return: answer
+        """
+        system_prompt = SummarizeFilePrompt.system_prompt
         message = self.openai_agent.create_message(system_prompt, user_prompt)
         self.logger.info(f"Summarization prompt for {file}: {message[25:]}...")
+        self.rate_limiter.acquire()
         return self.openai_agent.ask_llm(message)
 
-    def generate_readme(self, repo_url):
+    def get_files(self, repo_url, ranked=False):
         """
-        Generate the markdown content for the readme file
-        :param repo_url: html url of the repository
-        :return: markdown content as a string
+        Get the files of a repository
+        A path to a local checkout is read from the filesystem,
+        a GitHub url is read through the configured content source.
+
+        :param repo_url: html url of the repository or path of a local checkout
+        :param ranked: True if the files are ranked before they are read
+        :return: iterable of RepoFile objects
         """
-        # generate summaries for all files in the repo
+        if os.path.isdir(repo_url):
+            local_repository = LocalRepository(repo_url, self.logger)
+            self.head_sha = local_repository.head()
+            self.uncommitted = local_repository.uncommitted_files()
+            return local_repository.get_content(include=self._to_summarize)
         self.git_helper.set_repo(utilities.extract_repo(repo_url))
         repo = self.git_helper.get_repo()
-        files = self.git_helper.get_content(repo)
-        summaries = self.summarize_files(files)
+        self.head_sha = self.git_helper.get_head_sha(repo)
+        self.uncommitted = None
+        # ranking needs every file at once, which would hold the whole archive
+        # in memory. The tree is ranked on path and size instead, and only the
+        # selected files are fetched.
+        if self.content_source == "archive" and not ranked:
+            return self.git_helper.get_archive_content(
+                repo, self.head_sha, include=self._to_summarize
+            )
+        return self.git_helper.get_content(repo, self.head_sha)
+
+    def generate_readme(self, repo_url, token_budget=None, time_budget=None):
+        """
+        Generate the markdown content for the readme file
+        :param repo_url: html url of the repository or path of a local checkout
+        :param token_budget: estimated tokens to spend on file summaries
+        :param time_budget: seconds to spend on file summaries
+        :return: markdown content as a string
+        """
+        message = self._readme_message(repo_url, token_budget, time_budget)
+        return self.openai_agent.ask_llm(message)
+
+    def _readme_message(self, repo_url, token_budget=None, time_budget=None):
+        """
+        Summarize the repository and build the readme prompt
+        :param repo_url: html url of the repository or path of a local checkout
+        :param token_budget: estimated tokens to spend on file summaries
+        :param time_budget: seconds to spend on file summaries
+        :return: chat messages
+        """
+        # generate summaries for all files in the repo, or the most important
+        # ones that fit the budget
+        self.summary_cache.reset_stats()
+        summaries = self.summarize_files(
+            self.get_files(repo_url, ranked=bool(token_budget or time_budget)),
+            token_budget,
+            time_budget,
+        )
+        # roll summaries up into directory summaries until they fit the prompt
+        summaries = self.summary_reducer.reduce(summaries)
+        report = self.summary_cache.report()
+        if self.failed:
+            report += f". Could not summarize {len(self.failed)} file(s)"
+        if self.over_budget:
+            report += f". Left out {len(self.over_budget)} file(s) over the budget"
+        self.logger.info(report)
+        print(report)
         system_prompt = GenerateReadmePrompt.system_prompt
         user_prompt = GenerateReadmePrompt.user_prompt.format(
-            summaries="\n\n".join(summaries)
+            summaries="\n\n".join(
+                SummaryReducer.format_entry(path, summary)
+                for path, summary in summaries.items()
+            )
         )
-        message = self.openai_agent.create_message(system_prompt, user_prompt)
-        return self.openai_agent.ask_llm(message)
+        return self.openai_agent.create_message(system_prompt, user_prompt)
 
     def _post_readme(self, repo_url, readme_content):
         """
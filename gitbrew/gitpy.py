@@ -2,10 +2,16 @@
 Wrappers for the GitHub API
 """
 
-from github import Github
+import base64
+import tarfile
+from functools import partial
+from urllib import request as urllib_request
+
+from github import Github, UnknownObjectException
 
 from . import utilities
-from .constants import IgnoredFiles
+from .constants import SummaryLimits
+from .repo_file import RepoFile
 
 
 class GitPy:
@@ -81,30 +87,139 @@ class GitPy:
             self.repo = self.github.get_repo(self.repo_name)
         return self.repo
 
-    def get_content(self, repo):
+    def get_content(self, repo, ref=None):
         """
-        Gets the contents of a repository
+        Gets the files of a repository
+        Lists the whole tree with a single recursive Git Trees API call
+        and filters the paths locally.
+        Files are yielded as they are listed and their content is fetched lazily.
         Feature: Readme generation
         :param repo: Repository object
-        :return: List of contents as ContentFile objects
+        :param ref: branch, tag or commit sha, the default branch if None
+        :return: generator of RepoFile objects
         """
-        content = []
-        contents = repo.get_contents("")
-        while contents:
-            file_content = contents.pop(0)
-            if file_content.path.split(".")[-1] in IgnoredFiles.FILE_TYPES:
-                self.logger.info(
-                    f"Skipping {file_content.path} while gathering repository contents."
-                )
-                continue
-            if file_content.type == "dir":
-                contents.extend(repo.get_contents(file_content.path))
-            else:
+        for path, element in self._list_tree(repo, ref or repo.default_branch):
+            self.logger.info(f"Adding {path} while gathering repository contents.")
+            yield RepoFile(
+                path,
+                sha=element.sha,
+                size=element.size,
+                loader=partial(self._read_blob, repo, element.sha),
+                local=False,
+            )
+
+    def get_archive_content(
+        self, repo, ref=None, include=None, max_file_size=SummaryLimits.MAX_FILE_SIZE
+    ):
+        """
+        Gets the files of a repository from its tarball
+        The archive is downloaded with a single request and extracted as a stream.
+        Only files accepted by `include` are read, one at a time, and yielded
+        as soon as they are extracted.
+        Feature: Readme generation
+        :param repo: Repository object
+        :param ref: branch, tag or commit sha, the default branch if None
+        :param include: callable taking a path, returns True to keep the file
+        :param max_file_size: maximum number of bytes read from a file
+        :return: generator of RepoFile objects with their content
+        """
+        url = repo.get_archive_link("tarball", ref or repo.default_branch)
+        self.logger.info(f"Downloading archive of {repo.full_name}")
+        with urllib_request.urlopen(url) as response, tarfile.open(
+            fileobj=response, mode="r|gz"
+        ) as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                path = member.name.split("/", 1)[-1]  # strip the <acc>-<repo>-<sha>/
+                if utilities.is_ignored(path) or (include and not include(path)):
+                    self.logger.info(f"Skipping {path} while extracting the archive.")
+                    continue
+                self.logger.info(f"Extracting {path} from the archive.")
+                content = archive.extractfile(member).read(max_file_size)
+                yield RepoFile(path, size=member.size, content=content)
+
+    @staticmethod
+    def get_head_sha(repo, ref=None):
+        """
+        Gets the latest commit of a branch
+        :param repo: Repository object
+        :param ref: branch name, the default branch if None
+        :return: commit sha
+        """
+        return repo.get_branch(ref or repo.default_branch).commit.sha
+
+    @staticmethod
+    def get_changed_files(repo, base, head):
+        """
+        Gets the files changed between two commits with the compare API
+        Renamed files are listed with their old and new path.
+        Feature: Incremental readme updates
+        :param repo: Repository object
+        :param base: base commit sha
+        :param head: head commit sha
+        :return: list of paths, None if the comparison is truncated
+        """
+        files = repo.compare(base, head).files
+        if len(files) >= 300:  # the compare API lists at most 300 files
+            return None
+        paths = [file.filename for file in files]
+        paths += [file.previous_filename for file in files if file.previous_filename]
+        return paths
+
+    def get_file(self, repo, path, ref=None):
+        """
+        Gets a single file of a repository
+        :param repo: Repository object
+        :param path: path of the file
+        :param ref: branch, tag or commit sha, the default branch if None
+        :return: RepoFile object, None if the file does not exist
+        """
+        try:
+            content = repo.get_contents(path, ref=ref or repo.default_branch)
+        except UnknownObjectException:
+            return None
+        if isinstance(content, list):  # a directory
+            return None
+        return RepoFile(path, sha=content.sha, content=content.decoded_content)
+
+    def _list_tree(self, repo, sha, prefix=""):
+        """
+        List the blobs of a tree recursively, skipping ignored paths
+        GitHub truncates very large recursive listings. In that case the
+        subtrees are listed one by one, each with its own recursive call.
+
+        :param repo: Repository object
+        :param sha: tree sha or ref
+        :param prefix: path of the tree in the repository
+        :return: generator of (path, GitTreeElement)
+        """
+        tree = repo.get_git_tree(sha, recursive=True)
+        truncated = tree.truncated
+        if truncated:
+            self.logger.info(f"Tree listing of '{prefix}' truncated, listing subtrees.")
+            tree = repo.get_git_tree(sha)
+        for element in tree.tree:
+            path = prefix + element.path
+            if utilities.is_ignored(path):
                 self.logger.info(
-                    f"Adding {file_content.path} while gathering repository contents."
+                    f"Skipping {path} while gathering repository contents."
                 )
-                content.append(file_content)
-        return content
+            elif element.type == "blob":
+                yield path, element
+            elif element.type == "tree" and truncated:
+                yield from self._list_tree(repo, element.sha, f"{path}/")
+
+    @staticmethod
+    def _read_blob(repo, sha):
+        """
+        Fetch the content of a blob
+        The blob API also serves files larger than 1 MB
+        :param repo: Repository object
+        :param sha: blob sha
+        :return: content as bytes
+        """
+        return base64.b64decode(repo.get_git_blob(sha).content)
 
     def create_issue(self, *kwargs):
         """
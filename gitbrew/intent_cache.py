@@ -0,0 +1,193 @@
+"""
+Local cache of natural language git commands
+
+Answers of the LLM are stored with a vector of the intent that produced
+them. An intent close enough to a stored one, in the same repository,
+is answered from the cache without a network round trip.
+"""
+import json
+import math
+import os
+import re
+import zlib
+from collections import OrderedDict
+
+from .constants import IntentCacheLimits
+from .utilities import cache_dir
+
+# function words that do not decide what a command does, every other word of
+# an intent (actions, local or remote, staged or not, branch names, messages,
+# paths) is specific to it and has to match exactly
+INTENT_WORDS = frozenset(
+    """
+    a about also am an and any are as at be been by can could did do does for
+    git has have how i in into is it its me my of on please repo repository that
+    the them these this those to us was we were what whats which who with would
+    you your
+    """.split()
+)
+
+# words that do not change the meaning of an intent, left out of the vectors
+FILLER_WORDS = frozenset(
+    "a an are can could for i just me my please some the us would you your".split()
+)
+
+
+class IntentCache:
+    """
+    Semantic cache of intent to command resolutions
+    Intents are embedded locally as hashed word and character n-gram vectors.
+    Entries are scoped per repository and evicted least recently used first.
+    """
+
+    def __init__(
+        self,
+        logger,
+        path=None,
+        threshold=IntentCacheLimits.THRESHOLD,
+        max_entries=IntentCacheLimits.MAX_ENTRIES,
+        dimensions=IntentCacheLimits.DIMENSIONS,
+    ):
+        """
+        :param logger: Logger
+        :param path: JSON file of the cache, in the gitbrew cache by default
+        :param threshold: minimum cosine similarity of a cached intent
+        :param max_entries: maximum number of cached intents
+        :param dimensions: size of the intent vectors
+        """
+        self.logger = logger
+        self.path = path or os.path.join(cache_dir(), "intents.json")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self.entries = OrderedDict()  # "scope\0intent": entry, most recent last
+        self._load()
+
+    def _load(self):
+        """
+        Load the cache from disk, starting empty if it is missing or invalid
+        :return: None
+        """
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("dimensions") != self.dimensions:
+            return  # vectors of another size cannot be compared
+        for key, entry in state.get("entries", []):
+            entry["vector"] = {int(i): value for i, value in entry["vector"].items()}
+            self.entries[key] = entry
+
+    def save(self):
+        """
+        Write the cache to disk
+        :return: None
+        """
+        state = {"dimensions": self.dimensions, "entries": list(self.entries.items())}
+        partial_name = f"{self.path}.partial"
+        with open(partial_name, "w") as f:
+            json.dump(state, f)
+        os.replace(partial_name, self.path)
+
+    @staticmethod
+    def tokenize(intent):
+        """
+        Split an intent into lowercase words, quoted strings are kept whole
+        :param intent: natural language intent
+        :return: list of tokens
+        """
+        tokens = re.findall(r"""["']([^"']*)["']|([\w./:@~^-]+)""", intent)
+        return [quoted or word.rstrip(".:").lower() for quoted, word in tokens]
+
+    def specifics(self, intent):
+        """
+        Tokens of an intent that are not generic intent words
+        Two intents with different specifics never share an answer.
+
+        :param intent: natural language intent
+        :return: sorted list of tokens
+        """
+        return sorted(
+            {token for token in self.tokenize(intent) if token not in INTENT_WORDS}
+            - {""}
+        )
+
+    def embed(self, intent):
+        """
+        Embed an intent as a normalized sparse vector of hashed features
+        Features are the words and the character trigrams of the intent.
+
+        :param intent: natural language intent
+        :return: dict of index: weight
+        """
+        words = [word for word in self.tokenize(intent) if word not in FILLER_WORDS]
+        features = [(word, 1.0) for word in words]
+        text = f" {' '.join(words)} "
+        features += [(text[i : i + 3], 0.5) for i in range(len(text) - 2)]
+        vector = {}
+        for feature, weight in features:
+            index = zlib.crc32(feature.encode()) % self.dimensions
+            vector[index] = vector.get(index, 0.0) + weight
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {index: value / norm for index, value in vector.items()}
+
+    @staticmethod
+    def similarity(first, second):
+        """
+        Cosine similarity of two normalized sparse vectors
+        :param first: dict of index: weight
+        :param second: dict of index: weight
+        :return: similarity between 0 and 1
+        """
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(value * second.get(index, 0.0) for index, value in first.items())
+
+    def get(self, intent, scope):
+        """
+        Answer of the most similar cached intent
+        :param intent: natural language intent
+        :param scope: repository the intent applies to
+        :return: cached answer, None on a miss
+        """
+        vector, specifics = self.embed(intent), self.specifics(intent)
+        best, best_similarity = None, self.threshold
+        for key, entry in self.entries.items():
+            if entry["scope"] != scope or entry["specifics"] != specifics:
+                continue
+            similarity = self.similarity(vector, entry["vector"])
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        if best is None:
+            return None
+        self.entries.move_to_end(best)
+        self.logger.info(
+            f"Intent cache hit for '{intent}': '{self.entries[best]['intent']}' "
+            f"({best_similarity:.2f})"
+        )
+        return self.entries[best]["answer"]
+
+    def set(self, intent, scope, answer):
+        """
+        Cache the answer for an intent and save the cache
+        :param intent: natural language intent
+        :param scope: repository the intent applies to
+        :param answer: answer of the LLM
+        :return: None
+        """
+        key = f"{scope}\0{' '.join(self.tokenize(intent))}"
+        self.entries[key] = {
+            "intent": intent,
+            "scope": scope,
+            "specifics": self.specifics(intent),
+            "vector": self.embed(intent),
+            "answer": answer,
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        try:
+            self.save()
+        except OSError as e:
+            self.logger.error(f"Could not save the intent cache: {e}")
@@ -0,0 +1,180 @@
+"""
+Rule based parser for common git intents
+
+Intents that map to a single well known command are answered locally,
+without the LLM. Every rule has a pattern and the words it explains;
+the confidence of a match is the share of the intent it explains, so
+intents with extra details (targets, options, other actions) fall
+through to the LLM.
+"""
+import re
+
+# words that do not change the meaning of an intent
+FILLER_WORDS = frozenset(
+    """
+    a an and are can could display do get git give i in is it me my of on please see
+    show tell the this to us what whats which would you
+    """.split()
+)
+
+
+class IntentRule:
+    """
+    A pattern for an intent and the commands it maps to
+    """
+
+    def __init__(self, name, pattern, commands, words):
+        """
+        :param name: name of the rule, for logging
+        :param pattern: regular expression matched against the intent
+        :param commands: list of command templates, formatted with the named groups
+        :param words: words explained by the rule, besides the filler words
+        """
+        self.name = name
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.commands = commands
+        self.words = frozenset(words.split())
+
+    def match(self, words, intent):
+        """
+        Match the rule against an intent
+        :param words: lowercase words of the intent
+        :param intent: intent as typed
+        :return: (confidence between 0 and 1, commands), confidence 0 if no match
+        """
+        if not words or not (match := self.pattern.search(intent)):
+            return 0.0, []
+        groups = {key: value for key, value in match.groupdict().items() if value}
+        explained = [
+            word
+            for word in words
+            if word in self.words or word in FILLER_WORDS or word in groups.values()
+        ]
+        commands = [command.format(**groups) for command in self.commands]
+        return len(explained) / len(words), commands
+
+
+class IntentParser:
+    """
+    Answers common git intents in the <START>...<SEP>...<END> format of the LLM
+    """
+
+    RULES = [
+        IntentRule(
+            "status",
+            r"\bstatus\b|\bwhat(?:'s| has| have)? changed\b|\buncommitted\b"
+            r"|\bmodified files\b|\bworking (?:tree|directory)\b",
+            ["git status"],
+            "status current changed has have uncommitted modified files working tree "
+            "directory state repo repository",
+        ),
+        IntentRule(
+            "log",
+            r"\b(?:log|history|commits)\b",
+            ["git log --oneline -n 10"],
+            "log history commit commits recent last latest few oneline",
+        ),
+        IntentRule(
+            "log_count",
+            r"\b(?:last|latest|recent)\s+(?P<count>\d+)\s+commits?\b",
+            ["git log --oneline -n {count}"],
+            "log history commit commits recent last latest",
+        ),
+        IntentRule(
+            "last_commit",
+            r"\b(?:last|latest|most recent|previous|head)\s+commit\b",
+            ["git show HEAD"],
+            "last latest most recent previous head commit changes details",
+        ),
+        IntentRule(
+            "diff",
+            r"\b(?:diff|unstaged changes|changes not staged)\b",
+            ["git diff"],
+            "diff unstaged changes not staged current local",
+        ),
+        IntentRule(
+            "staged_diff",
+            r"\b(?:staged|cached) (?:changes|diff)\b|\bdiff (?:of )?(?:the )?staged\b",
+            ["git diff --staged"],
+            "staged cached changes diff",
+        ),
+        IntentRule(
+            "current_branch",
+            r"\b(?:current|which|what) branch\b|\bbranch am i\b",
+            ["git branch --show-current"],
+            "current branch am on name",
+        ),
+        IntentRule(
+            "list_branches",
+            r"\b(?:list|all|show|local)\s+(?:the\s+|all\s+)?branches\b",
+            ["git branch"],
+            "list all branches local",
+        ),
+        IntentRule(
+            "remotes",
+            r"\bremotes?\b",
+            ["git remote -v"],
+            "remote remotes list urls url repositories configured",
+        ),
+        IntentRule(
+            "push",
+            r"\bpush\b",
+            ["git push origin HEAD"],
+            # other remote names (upstream in forks) are left to the LLM
+            "push current branch changes commits remote origin",
+        ),
+        IntentRule(
+            "pull",
+            r"\bpull\b",
+            ["git pull"],
+            "pull latest changes from remote",
+        ),
+        IntentRule(
+            "fetch",
+            r"\bfetch\b",
+            ["git fetch"],
+            "fetch latest changes from remote",
+        ),
+    ]
+
+    def __init__(self, logger, threshold=0.9):
+        """
+        :param logger: Logger
+        :param threshold: minimum confidence to answer without the LLM
+        """
+        self.logger = logger
+        self.threshold = threshold
+
+    @staticmethod
+    def tokenize(intent):
+        """
+        Split an intent into lowercase words
+        :param intent: natural language intent
+        :return: list of words
+        """
+        return re.findall(r"[\w./:@~^'-]+", intent.lower().replace("'s", ""))
+
+    def parse(self, intent):
+        """
+        Answer an intent if exactly one rule explains it with enough confidence
+        Quoted text is a detail only the LLM can handle.
+
+        :param intent: natural language intent
+        :return: answer in the LLM format, None if the parser is unsure
+        """
+        if re.search(r"[\"`]", intent):
+            return None
+        words = self.tokenize(intent)
+        matches = []
+        for rule in self.RULES:
+            confidence, commands = rule.match(words, intent)
+            if confidence >= self.threshold:
+                matches.append((confidence, rule.name, commands))
+        commands = {tuple(match[2]) for match in matches}
+        if len(commands) != 1:  # no rule, or rules that disagree
+            if matches:
+                self.logger.info(f"Ambiguous intent '{intent}': {matches}")
+            return None
+        confidence, name, commands = max(matches)
+        self.logger.info(f"Parsed '{intent}' as {name} ({confidence:.2f})")
+        return f"<START>{'<SEP>'.join(commands)}<END>"
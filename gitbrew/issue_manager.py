@@ -2,13 +2,10 @@
 Handler for issues
 """
 import os
+import threading
 
 import github.PaginatedList
-import pinecone
-from gensim.parsing.preprocessing import remove_stopwords
-from gensim.utils import simple_preprocess
 from PyInquirer import prompt
-from sklearn.metrics.pairwise import cosine_similarity
 from tqdm import tqdm
 
 from . import utilities
@@ -39,8 +36,11 @@ class IssueManager:
         self.logger = logger
 
         self.git_helper = GitPy(os.getenv("GITHUB_TOKEN"), logger=logger)
-        pinecone.init(api_key=os.getenv("PINECONE_API_KEY"), environment="us-east1-gcp")
-        self.pinecone_index = pinecone.Index("gitbrew")
+        # pinecone is only needed for similar and duplicate issues,
+        # it is initialized in the background while the user picks an action
+        self._pinecone_index = None
+        self._pinecone_ready = threading.Thread(target=self._init_pinecone, daemon=True)
+        self._pinecone_ready.start()
         self.actions = {
             "List Issues": self._list_issues,
             "Create an Issue": self._create_issue,
@@ -50,6 +50,33 @@ class IssueManager:
         }
         self.issue_template = "Title: {title}\n Body: {body}"
 
+    def _init_pinecone(self):
+        """
+        Initialize the pinecone client
+        :return: None
+        """
+        try:
+            import pinecone  # slow to import, loaded in the background
+
+            pinecone.init(
+                api_key=os.getenv("PINECONE_API_KEY"), environment="us-east1-gcp"
+            )
+        except Exception as e:
+            self.logger.error(f"Could not initialize pinecone: {e}")
+
+    @property
+    def pinecone_index(self):
+        """
+        Pinecone index, waits for the background initialization
+        :return: pinecone.Index
+        """
+        if self._pinecone_index is None:
+            self._pinecone_ready.join()
+            import pinecone
+
+            self._pinecone_index = pinecone.Index("gitbrew")
+        return self._pinecone_index
+
     def __del__(self):
         pass
 
@@ -117,39 +144,77 @@ class IssueManager:
 
         :return: None
         """
+        groups = {
+            entry["title"]: [
+                (duplicate["title"], duplicate["url"], duplicate["similarity"])
+                for duplicate in entry["duplicates"]
+            ]
+            for entry in self.find_duplicate_issues(threshold)
+        }
+        utilities.print_dictionary(groups, headers=["Title", "URL", "Similarity"])
+
+    def find_duplicate_issues(self, threshold=0.8):
+        """
+        Find the open issues that have likely duplicates
+        Without user interaction, used by the shell and the command line
 
-        all_issues = self.git_helper.fetch_issues(state="open")
+        :param threshold: threshold for cosine similarity
+        :return: list of dicts with the number, title, url and duplicates of an issue
+        """
+        issues = {
+            issue.number: issue for issue in self.git_helper.fetch_issues(state="open")
+        }
         all_embeddings = {
-            issue.number: self.openai_agent.create_embedding(
+            number: self.openai_agent.create_embedding(
                 self.issue_template.format(title=issue.title, body=issue.body)
             )["data"][0]["embedding"]
-            for issue in tqdm(all_issues)
+            for number, issue in tqdm(issues.items())
         }
-        groups = self._generate_similarity_groups(all_embeddings, threshold)
-        utilities.print_dictionary(groups, headers=["Title", "URL", "Similarity"])
+        return self._generate_similarity_groups(all_embeddings, threshold, issues)
 
-    def _generate_similarity_groups(self, all_embeddings, threshold):
+    def _generate_similarity_groups(self, all_embeddings, threshold, issues):
         """
         Generate similarity groups for duplicate issues
-        :param all_embeddings: mapping of issue id to embeddings
+        Similarities of all pairs are computed at once.
+
+        :param all_embeddings: mapping of issue number to embeddings
         :param threshold: threshold for cosine similarity
-        :return:
+        :param issues: mapping of issue number to issue
+        :return: list of dicts with the number, title, url and duplicates of an issue
         """
-        groups = {}
-        items = all_embeddings.items()
-        for issue_id, embed in tqdm(items):
-            similar_issues = []
-            for other_issue_id, other_embed in items:
-                if issue_id == other_issue_id:
-                    continue
-                similarity = cosine_similarity([embed], [other_embed])[0][0]
-                if similarity > threshold:
-                    issue = self.git_helper.get_issue(other_issue_id)
-                    similar_issues.append((issue.title, issue.html_url, similarity))
-            similar_issues.sort(key=lambda x: x[2], reverse=True)
-            groups[self.git_helper.get_issue(int(issue_id)).title] = similar_issues
+        if not all_embeddings:
+            return []
+        # deferred, slow to import
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        numbers = list(all_embeddings)
+        similarities = cosine_similarity([all_embeddings[n] for n in numbers])
+        groups = []
+        for i, number in enumerate(numbers):
+            duplicates = [
+                {
+                    **self._issue_entry(issues[other]),
+                    "similarity": float(similarities[i][j]),
+                }
+                for j, other in enumerate(numbers)
+                if other != number and similarities[i][j] > threshold
+            ]
+            if duplicates:
+                duplicates.sort(key=lambda x: x["similarity"], reverse=True)
+                groups.append(
+                    {**self._issue_entry(issues[number]), "duplicates": duplicates}
+                )
         return groups
 
+    @staticmethod
+    def _issue_entry(issue):
+        """
+        JSON serializable summary of an issue
+        :param issue: GitHub Issue object
+        :return: dict with the number, title and url
+        """
+        return {"number": issue.number, "title": issue.title, "url": issue.html_url}
+
     def _find_similar_issues(self, n=10):
         """
         Finds similar issues that have been raised in the repository.
@@ -159,29 +224,44 @@ class IssueManager:
 
         :return: None
         """
-        new_issue_embedding = self.get_new_issue_embedding()
+        title, body = self._get_issue_description()
+        similar_issues = self.find_similar_issues(title, body, n)
+        if not similar_issues:
+            print("--- There are no open issues in this repository. ---")
+            self.logger.info("No issues found. Exiting...")
+            return
+        data = [(issue["title"], issue["url"]) for issue in similar_issues]
+        utilities.print_table(data, headers=["Title", "URL"], show_index=True)
+
+    def find_similar_issues(self, title, body, n=10):
+        """
+        Find the open issues most similar to a new issue
+        Without user interaction, used by the shell and the command line
+
+        :param title: title of the new issue
+        :param body: description of the new issue
+        :param n: number of similar issues to return
+        :return: list of dicts with the number, title, url and score of an issue
+        """
+        new_issue_embedding = self.get_issue_embedding(title, body)
         issues: github.PaginatedList.PaginatedList = self.git_helper.fetch_issues(
             state="open"
         )
         if not issues.totalCount:
-            print("--- There are no open issues in this repository. ---")
-            self.logger.info("No issues found. Exiting...")
-            return
+            return []
         last_opened_issue_number = max((issue.number for issue in issues))
         matches = self.generate_matches_from_pinecone(
             last_opened_issue_number, n, new_issue_embedding, issues
         )
-        repo = self.git_helper.github.get_repo(self.git_helper.repo_name)
-
-        data = [
-            (
-                repo.get_issue(int(id_["id"])).title,
-                repo.get_issue(int(id_["id"])).html_url,
-            )
-            for id_ in tqdm(sorted(matches, key=lambda x: x["score"], reverse=True))
-            if id_["id"] != "LAST"
-        ]
-        utilities.print_table(data, headers=["Title", "URL"], show_index=True)
+        repo = self.git_helper.get_repo()
+        similar_issues = []
+        for match in sorted(matches or [], key=lambda x: x["score"], reverse=True):
+            if match["id"] != "LAST":
+                issue = repo.get_issue(int(match["id"]))
+                similar_issues.append(
+                    {**self._issue_entry(issue), "score": match["score"]}
+                )
+        return similar_issues
 
     def generate_matches_from_pinecone(
         self, last_opened_issue_number, n, new_issue_embedding, issues
@@ -215,18 +295,31 @@ class IssueManager:
         matches: list = self.query_db(embedding=new_issue_embedding, n=n)
         return matches
 
-    def get_new_issue_embedding(self):
+    def get_issue_embedding(self, title, body):
         """
-        Prompts the user for the issue title and description
-        Returns the embeddings for the issue text
+        Returns the embeddings for the text of a new issue
 
+        :param title: title of the issue
+        :param body: description of the issue
         :return: Embeddings for the issue text
         """
-        title, body = self._get_issue_description()
         issue_text = self.issue_template.format(title=title, body=body)
-        issue_text = simple_preprocess(remove_stopwords(issue_text), deacc=True)
+        issue_text = self._preprocess(issue_text)
         return self.openai_agent.create_embedding(issue_text)["data"][0]["embedding"]
 
+    @staticmethod
+    def _preprocess(issue_text):
+        """
+        Remove stopwords and tokenize an issue text for embedding
+        :param issue_text: issue text
+        :return: list of tokens
+        """
+        # deferred, slow to import
+        from gensim.parsing.preprocessing import remove_stopwords
+        from gensim.utils import simple_preprocess
+
+        return simple_preprocess(remove_stopwords(issue_text), deacc=True)
+
     @staticmethod
     def _get_issue_description():
         """
@@ -247,6 +340,8 @@ class IssueManager:
         :param n: number of similar issues to return
         :return: list of "matches" dicts with id, score, values etc
         """
+        import pinecone
+
         try:
             response = self.pinecone_index.query(
                 namespace=self.git_helper.repo_name,
@@ -270,6 +365,8 @@ class IssueManager:
 
         :return: None
         """
+        import pinecone
+
         try:
             self.pinecone_index.upsert(
                 vectors=vectors,
@@ -305,5 +402,5 @@ class IssueManager:
         :return: Embeddings for the issue text
         """
         issue_text = self.issue_template.format(title=issue.title, body=issue.body)
-        issue_text = simple_preprocess(remove_stopwords(issue_text), deacc=True)
+        issue_text = self._preprocess(issue_text)
         return self.openai_agent.create_embedding(issue_text)["data"][0]["embedding"]
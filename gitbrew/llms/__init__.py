@@ -1,2 +1,15 @@
-from .cohere import Cohere
-from .openai import OpenAI
+"""
+LLM wrappers, imported on first use since their clients are slow to import
+"""
+
+
+def __getattr__(name):
+    if name == "Cohere":
+        from .cohere import Cohere
+
+        return Cohere
+    if name == "OpenAI":
+        from .openai import OpenAI
+
+        return OpenAI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,8 @@ import os
 
 import openai
 
+from ..exceptions import IncompleteAnswerException
+
 
 class OpenAI:
     # set defaults
@@ -66,6 +68,29 @@ class OpenAI:
 
         return response.choices[0]["message"]["content"].strip()
 
+    def stream_llm(self, prompt):
+        """
+        Uses the openai ChatCompletion API with streaming
+        to yield the response as it is generated
+        Errors are raised instead of ending the stream, so that a partial
+        answer is never taken for a complete one.
+        :param prompt:
+        :return: generator of text deltas
+        :raises IncompleteAnswerException: if the answer hits the token limit
+        """
+        response = openai.ChatCompletion.create(
+            model=self.chat_model,
+            messages=prompt,
+            temperature=self.temperature,
+            stream=True,
+        )
+        for chunk in response:
+            choice = chunk.choices[0]
+            if content := choice["delta"].get("content"):
+                yield content
+            if choice.get("finish_reason") == "length":
+                raise IncompleteAnswerException("The answer reached the token limit")
+
     def create_embedding(self, text):
         """
         Uses the openai EmbeddingCreate API to generate an embedding
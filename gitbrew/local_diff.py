@@ -0,0 +1,224 @@
+"""
+Local diff source for pull request reviews
+
+Fetches the pull request into a cached bare clone and computes the diff
+with git, so large pull requests are not limited by the pagination,
+file count and patch size limits of the GitHub files API.
+"""
+import base64
+import os
+import subprocess
+import threading
+
+from .utilities import cache_dir
+
+
+class DiffFile:
+    """
+    A changed file computed from a local diff.
+    Has the attributes of the github File object used by the reviewer.
+    """
+
+    STATUSES = {
+        "A": "added",
+        "C": "copied",
+        "D": "removed",
+        "M": "modified",
+        "R": "renamed",
+        "T": "changed",
+    }
+
+    def __init__(self, filename, status, patch, previous_filename=None):
+        """
+        :param filename: path of the file in the pull request head
+        :param status: git status letter (A, D, M, R, ...)
+        :param patch: unified diff hunks, None for binary files
+        :param previous_filename: path before a rename or copy
+        """
+        self.filename = filename
+        self.status = self.STATUSES.get(status[0], "modified")
+        self.patch = patch
+        self.previous_filename = previous_filename
+        lines = patch.splitlines() if patch else []
+        self.additions = sum(
+            line.startswith("+") and not line.startswith("+++") for line in lines
+        )
+        self.deletions = sum(
+            line.startswith("-") and not line.startswith("---") for line in lines
+        )
+        self.changes = self.additions + self.deletions
+
+    def __repr__(self):
+        return f"DiffFile(filename={self.filename}, status={self.status})"
+
+
+class LocalDiffSource:
+    """
+    Computes pull request diffs from cached bare clones
+    Clones are kept in the gitbrew cache and reused across runs
+    """
+
+    GITHUB_URL = "https://github.com/{repo}.git"
+    REF = "refs/gitbrew/pull/{number}/{side}"
+
+    def __init__(self, token, logger):
+        """
+        :param token: GitHub token, used for private repositories
+        :param logger: Logger
+        """
+        self.token = token
+        self.logger = logger
+        self._locks = {}  # one lock per clone, fetches into a clone are serialized
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, path):
+        """
+        Lock for a clone path
+        :param path: clone path
+        :return: threading.Lock
+        """
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _env(self):
+        """
+        Environment for git commands
+        The token is passed as an HTTP header through the environment,
+        so it is neither stored in the clone config nor visible in the process list
+        :return: environment dict
+        """
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if self.token:
+            credentials = base64.b64encode(
+                f"x-access-token:{self.token}".encode()
+            ).decode()
+            env.update(
+                GIT_CONFIG_COUNT="1",
+                GIT_CONFIG_KEY_0="http.https://github.com/.extraheader",
+                GIT_CONFIG_VALUE_0=f"AUTHORIZATION: basic {credentials}",
+            )
+        return env
+
+    def _git(self, path, *args):
+        """
+        Run a git command in a clone
+        :param path: clone path
+        :param args: git arguments
+        :return: stdout as a string
+        """
+        result = subprocess.run(
+            ["git", "--git-dir", path, *args],
+            env=self._env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        return result.stdout.decode("utf-8", errors="replace")
+
+    def _has_commits(self, path, *shas):
+        """
+        Check whether all commits are present in the clone
+        :param path: clone path
+        :param shas: commit shas
+        :return: True if all commits exist
+        """
+        try:
+            for sha in shas:
+                self._git(path, "cat-file", "-e", f"{sha}^{{commit}}")
+        except subprocess.CalledProcessError:
+            return False
+        return True
+
+    def _clone(self, repo_name):
+        """
+        Create the bare clone for a repository if it does not exist yet
+        :param repo_name: repository string (acc/repo)
+        :return: clone path
+        """
+        owner, name = repo_name.split("/")
+        path = os.path.join(cache_dir("repos", owner), f"{name}.git")
+        if not os.path.isdir(path):
+            self.logger.info(f"Creating bare clone for {repo_name} in {path}")
+            subprocess.run(["git", "init", "--quiet", "--bare", path], check=True)
+            self._git(
+                path, "remote", "add", "origin", self.GITHUB_URL.format(repo=repo_name)
+            )
+        return path
+
+    def fetch(self, pr):
+        """
+        Fetch the head and base of a pull request into the cached clone
+        Skips the fetch if both commits are already present
+
+        :param pr: pull request object
+        :return: clone path
+        """
+        path = self._clone(pr.base.repo.full_name)
+        with self._lock(path):
+            if self._has_commits(path, pr.base.sha, pr.head.sha):
+                self.logger.info(f"Using cached clone for PR #{pr.number}")
+                return path
+            self.logger.info(f"Fetching PR #{pr.number} into {path}")
+            self._git(
+                path,
+                "fetch",
+                "--quiet",
+                "--no-tags",
+                "origin",
+                f"+refs/pull/{pr.number}/head:"
+                + self.REF.format(number=pr.number, side="head"),
+                f"+refs/heads/{pr.base.ref}:"
+                + self.REF.format(number=pr.number, side="base"),
+            )
+        return path
+
+    def get_files(self, pr):
+        """
+        Compute the changed files of a pull request with git diff
+        Uses the merge base like GitHub does (base...head)
+
+        :param pr: pull request object
+        :return: list of DiffFile objects
+        """
+        path = self.fetch(pr)
+        revisions = f"{pr.base.sha}...{pr.head.sha}"
+        options = ["--no-color", "--no-ext-diff", "--find-renames"]
+        entries = self._git(path, "diff", "--name-status", "-z", *options, revisions)
+        patches = self._split_patches(
+            self._git(path, "diff", "--patch", *options, revisions)
+        )
+        files = []
+        fields = entries.split("\0")
+        index = 0
+        while index < len(fields) - 1:
+            status = fields[index]
+            if status[0] in "RC":  # renames and copies have two paths
+                previous, filename = fields[index + 1], fields[index + 2]
+                index += 3
+            else:
+                previous, filename = None, fields[index + 1]
+                index += 2
+            patch = patches[len(files)] if len(files) < len(patches) else ""
+            files.append(DiffFile(filename, status, patch, previous))
+        self.logger.info(f"Computed local diff for {len(files)} file(s)")
+        return files
+
+    @staticmethod
+    def _split_patches(diff):
+        """
+        Split the output of git diff into per-file patches.
+        Headers are dropped to match the `patch` field of the GitHub API.
+
+        :param diff: output of git diff
+        :return: list of patches, None for binary files
+        """
+        patches = []
+        for block in diff.split("\ndiff --git ") if diff else []:
+            header, hunk_start, hunks = block.partition("\n@@")
+            if hunk_start:
+                patches.append("@@" + hunks.rstrip("\n"))
+            elif "\nBinary files " in header or "GIT binary patch" in header:
+                patches.append(None)
+            else:  # renames or mode changes without content changes
+                patches.append("")
+        return patches
@@ -0,0 +1,168 @@
+"""
+Reads the files of a local checkout for readme generation
+"""
+import mmap
+import os
+import subprocess
+from functools import partial
+
+from . import utilities
+from .constants import SummaryLimits
+from .repo_file import RepoFile
+
+
+class LocalRepository:
+    """
+    Local working copy of a repository
+    Files are read from the filesystem, without any GitHub traffic.
+    """
+
+    def __init__(self, path, logger, max_file_size=SummaryLimits.MAX_FILE_SIZE):
+        """
+        :param path: path of the checkout
+        :param logger: Logger
+        :param max_file_size: maximum number of bytes read from a file
+        """
+        self.path = os.path.abspath(path)
+        self.logger = logger
+        self.max_file_size = max_file_size
+
+    def __repr__(self):
+        return f"LocalRepository(path={self.path})"
+
+    def list_files(self):
+        """
+        List the tracked and untracked files that are not ignored by .gitignore
+        Falls back to walking the directory if it is not a git repository
+
+        :return: list of paths relative to the checkout
+        """
+        output = self._git(
+            "ls-files", "-z", "--cached", "--others", "--exclude-standard"
+        )
+        if output is None:
+            self.logger.info(f"{self.path} is not a git repository, walking it.")
+            return self._walk()
+        return sorted(set(output.split("\0")[:-1]))
+
+    def _git(self, *args):
+        """
+        Run a git command in the checkout
+        :param args: git arguments
+        :return: stdout as a string, None if the command fails
+        """
+        try:
+            output = subprocess.check_output(
+                ["git", *args], cwd=self.path, stderr=subprocess.DEVNULL
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return output.decode("utf-8", errors="replace")
+
+    def head(self):
+        """
+        Commit checked out in the working copy
+        :return: commit sha, None if it is not a git repository
+        """
+        output = self._git("rev-parse", "HEAD")
+        return output.strip() if output else None
+
+    def changed_files(self, base, head=None):
+        """
+        List the files changed between two commits, or between a commit and
+        the working tree including untracked files
+        Renamed files are listed with their old and new path.
+        :param base: base commit sha
+        :param head: head commit, None for the working tree
+        :return: list of paths, None if a commit is unknown
+        """
+        revisions = [base, head] if head else [base]
+        output = self._git("diff", "--name-only", "--no-renames", "-z", *revisions)
+        if output is None:
+            return None
+        changed = output.split("\0")[:-1]
+        if not head:
+            untracked = self._git("ls-files", "-z", "--others", "--exclude-standard")
+            changed += untracked.split("\0")[:-1] if untracked else []
+        return changed
+
+    def uncommitted_files(self):
+        """
+        Files of the working tree that differ from HEAD: modified, deleted
+        and untracked files
+        :return: dict of path: blob sha of the working tree file, None for
+            deleted files; None if it is not a git repository
+        """
+        changed = self.changed_files("HEAD")
+        return None if changed is None else self.blob_shas(changed)
+
+    def blob_shas(self, paths):
+        """
+        Blob shas of files of the working tree
+        :param paths: paths relative to the checkout
+        :return: dict of path: sha, None for files that do not exist
+        """
+        shas = {}
+        for path in paths:
+            file = self.get_file(path)
+            shas[path] = file.sha if file else None
+        return shas
+
+    def get_file(self, path):
+        """
+        Gets a single file of the checkout
+        :param path: path relative to the checkout
+        :return: RepoFile object, None if the file does not exist
+        """
+        full_path = os.path.join(self.path, path)
+        if os.path.islink(full_path) or not os.path.isfile(full_path):
+            return None
+        return RepoFile(
+            path, size=os.path.getsize(full_path), loader=partial(self._read, full_path)
+        )
+
+    def _walk(self):
+        """
+        List the files below the checkout, skipping hidden directories
+        :return: list of paths relative to the checkout
+        """
+        paths = []
+        for root, directories, files in os.walk(self.path):
+            directories[:] = sorted(d for d in directories if not d.startswith("."))
+            relative = os.path.relpath(root, self.path)
+            for name in sorted(files):
+                path = name if relative == "." else os.path.join(relative, name)
+                paths.append(path.replace(os.sep, "/"))
+        return paths
+
+    def get_content(self, include=None):
+        """
+        Gets the files of the checkout
+        :param include: callable taking a path, returns True to keep the file
+        :return: generator of RepoFile objects, read lazily
+        """
+        for path in self.list_files():
+            full_path = os.path.join(self.path, path)
+            if utilities.is_ignored(path) or (include and not include(path)):
+                self.logger.info(f"Skipping {path} while reading the checkout.")
+                continue
+            if os.path.islink(full_path) or not os.path.isfile(full_path):
+                continue  # symlinks and files deleted from the working tree
+            self.logger.info(f"Adding {path} while reading the checkout.")
+            yield RepoFile(
+                path,
+                size=os.path.getsize(full_path),
+                loader=partial(self._read, full_path),
+            )
+
+    def _read(self, path):
+        """
+        Read a file through a memory map, up to max_file_size bytes
+        :param path: absolute path of the file
+        :return: content as bytes
+        """
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""  # empty files cannot be mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[: self.max_file_size]
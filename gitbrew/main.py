@@ -1,9 +1,19 @@
 __package__ = "gitbrew"
 
-from .shell import Shell
+import sys
 
 
 def main():
+    if len(sys.argv) > 1:  # non-interactive subcommands
+        from . import daemon
+
+        if (code := daemon.forward(sys.argv[1:])) is not None:  # warm daemon
+            sys.exit(code)
+        from . import cli
+
+        sys.exit(cli.main(sys.argv[1:]))
+    from .shell import Shell
+
     shell = Shell()
     shell.cmdloop()
 
@@ -62,5 +62,9 @@ class GenerateCommandPrompt:
     
     
     
+    {repository_context}
+    Use the repository context above, if any, for branch names, remotes and files instead of asking for them.
+    Only ask for clarification when the intention is ambiguous or needs information the context does not give.
+    
     This is the user intention in English: {user_intention}
     """
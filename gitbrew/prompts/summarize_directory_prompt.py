@@ -0,0 +1,14 @@
+class SummarizeDirectoryPrompt:
+    version = 1  # bump when the prompt changes to invalidate cached summaries
+
+    system_prompt = """
+    You are an AI assistant expert in understanding code bases.
+    You will be given the summaries of the files and subdirectories of a directory.
+    Combine them into a single summary of the directory. Keep the purpose of the directory, 
+    entry points, public interfaces, commands, configuration and dependencies 
+    that could be useful to generate a readme file. Drop repeated or minor details."""
+
+    user_prompt = """
+    The end goal is for an LLM to generate a Readme for a Github repository based on summaries of its directories.
+    To achieve this, summarize the directory named {directory} from the summaries of its contents: {summaries}
+    """
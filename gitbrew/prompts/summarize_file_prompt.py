@@ -1,4 +1,6 @@
 class SummarizeFilePrompt:
+    version = 1  # bump when the prompt changes to invalidate cached summaries
+
     system_prompt = """
     You are an AI assistant expert in understanding and summarizing code files.
     You summarize them without removing important parts of the file that can be used to generate a readme file.
@@ -10,3 +12,9 @@ class SummarizeFilePrompt:
     The end goal is for an LLM to generate a Readme for a Github repository based on individual summaries of code files.
     To achieve this, summarize the following file named {filename}: {content}. 
     """
+
+    chunk_user_prompt = """
+    The end goal is for an LLM to generate a Readme for a Github repository based on individual summaries of code files.
+    The file named {filename} is too large to summarize at once.
+    To achieve this, summarize part {part} of {parts} of the file: {content}. 
+    """
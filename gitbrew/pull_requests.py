@@ -4,15 +4,22 @@ Handler class for pull request reviews
 
 
 import os
+import queue
 import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
+from github import GithubException
 from PyInquirer import prompt
 from tqdm import tqdm
 
+from .batch_review import BatchReviewer
 from .gitpy import GitPy
 from .llms import OpenAI
+from .local_diff import LocalDiffSource
 from .prompts.pull_request_review_prompt import PullRequestReviewPrompt
 from .questions import Questions
+from .review_filter import ReviewFilter
 from .utilities import print_table
 
 
@@ -21,12 +28,15 @@ class PullRequestReviewer:
     Pull request reviewer class
     """
 
-    def __init__(self, logger):
+    DIFF_SOURCES = ("api", "local")
+
+    def __init__(self, logger, diff_source=None):
         """
         Initialize the pull request reviewer
         openai_agent: OpenAI agent
         git_helper: GitPy object
         actions: Actions that can be performed on user selection
+        diff_source: "api" (GitHub files API) or "local" (git diff in a cached clone)
         """
         self.openai_agent = OpenAI(
             os.getenv("OPENAI_API_KEY"),
@@ -36,9 +46,14 @@ class PullRequestReviewer:
             max_tokens=64000,
         )
         self.git_helper = GitPy(os.getenv("GITHUB_TOKEN"), logger=logger)
+        self.diff_source = diff_source or os.getenv("GITBREW_DIFF_SOURCE", "api")
+        if self.diff_source not in self.DIFF_SOURCES:
+            raise ValueError(f"Invalid diff source: {self.diff_source}")
+        self.local_diff = LocalDiffSource(os.getenv("GITHUB_TOKEN"), logger)
         self.actions = {
             "List pull requests": self._list_pull_requests,
             "Review a pull request": self._review_pull_request,
+            "Review all open pull requests": self._review_all_pull_requests,
             "Exit": self._exit,
         }
         self.logger = logger
@@ -52,6 +67,8 @@ class PullRequestReviewer:
             ".yml",
             ".yaml",
         )
+        self.rate_limiter = None  # optional RateLimiter shared by concurrent reviews
+        self.review_filter = ReviewFilter(logger, non_code_files=self.NON_CODE_FILES)
         self.PULL_REQUEST_PATTERN = r"github.com/([\w-]+)/([\w-]+)/pull/(\d+)"
         self.HEADER = (
             "# [GITBREW]: This is an auto-generated review for {filename}. \n\n"
@@ -116,10 +133,35 @@ class PullRequestReviewer:
             return
         self.git_helper.repo_name = f"{match[1]}/{match[2]}"
         pull_request = self.git_helper.get_pull_request(int(match[3]))
+        if prompt(Questions.REVIEW_MODE)["mode"] == Questions.PIPELINED_REVIEW:
+            posted, skipped = self.review_and_post(pull_request)
+            self._report_skipped(skipped)
+            print(f"Posted {len(posted)} review(s).")
+            return
         reviews = self.review(pull_request)  # reviews is a dict of filename: review
         self.logger.info(f"Review generated successfully.\n\n. {reviews}")
         self._post_review_with_confirmation(pull_request, reviews)
 
+    def _review_all_pull_requests(self):
+        """
+        Review all open pull requests of a repository that match
+        the filters given by the user and write a JSON report
+        :return: None
+        """
+        answers = prompt(Questions.BATCH_REVIEW_QUESTIONS)
+        self.git_helper.set_repo(answers["repo_name"].strip())
+        batch_reviewer = BatchReviewer(
+            self, post=answers["post"] == "Yes", logger=self.logger
+        )
+        pull_requests = batch_reviewer.select(
+            labels=answers["labels"].split(),
+            author=answers["author"].strip() or None,
+            since=answers["since"].strip() or None,
+        )
+        report = batch_reviewer.run(pull_requests)
+        batch_reviewer.write_report(report, answers["report"].strip())
+        print(f"Reviewed {len(report)} pull request(s).")
+
     def _post_review_with_confirmation(self, pull_request, reviews):
         """
         Ask user for confirmation before posting the review
@@ -141,18 +183,85 @@ class PullRequestReviewer:
         :return:
         """
 
-        title, body, diff = pr.title, pr.body, pr.get_files()
-        self.logger.info("Reviewing PR: ", title)
-        reviews = {}
-        for file in diff:  # Get review for each file separately
-            # Skip files non-code files
-            if file.filename.endswith(self.NON_CODE_FILES):
-                self.logger.info("Skipping file: ", file.filename)
-                continue
-            self.create_review(body, file, reviews, title)
+        reviews, skipped = self.review_files(pr)
+        self._report_skipped(skipped)
         return reviews
 
-    def create_review(self, body, file, reviews, title):
+    def review_files(self, pr, rate_limiter=None):
+        """
+        Review every reviewable file of a pull request
+
+        :param pr: pull request object
+        :param rate_limiter: RateLimiter for this run, self.rate_limiter if None
+        :return: dict of filename: review, dict of skipped filename: reason
+        """
+        title, body = pr.title, pr.body
+        self.logger.info(f"Reviewing PR: {title}")
+        files, skipped = self.filter_files(pr)
+        reviews = {}
+        for file in files:  # Get review for each file separately
+            self.create_review(body, file, reviews, title, rate_limiter)
+        return reviews, skipped
+
+    def filter_files(self, pr):
+        """
+        Classify the files of a pull request before any LLM call.
+        Rules from the .gitattributes file of the PR head are applied
+        on top of the default filters.
+
+        :param pr: pull request object
+        :return: list of files to review, dict of skipped filename: reason
+        """
+        review_filter = self.review_filter
+        if gitattributes := self._get_gitattributes(pr):
+            review_filter = ReviewFilter(
+                self.logger, non_code_files=self.NON_CODE_FILES
+            )
+            review_filter.load_gitattributes(gitattributes)
+        return review_filter.partition(self.get_files(pr))
+
+    def get_files(self, pr):
+        """
+        Get the changed files of a pull request from the configured diff source
+        Falls back to the GitHub API if the local diff fails
+
+        :param pr: pull request object
+        :return: iterable of files with filename and patch
+        """
+        if self.diff_source == "local":
+            try:
+                return self.local_diff.get_files(pr)
+            except (OSError, subprocess.CalledProcessError) as e:
+                self.logger.error(f"Local diff failed, using the GitHub API: {e}")
+        return pr.get_files()
+
+    def _get_gitattributes(self, pr):
+        """
+        Fetch the .gitattributes file at the head of the pull request
+
+        :param pr: pull request object
+        :return: content of the file, None if it does not exist
+        """
+        repo = pr.head.repo or pr.base.repo
+        try:
+            content = repo.get_contents(".gitattributes", ref=pr.head.sha)
+        except GithubException:
+            return None
+        return content.decoded_content.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _report_skipped(skipped):
+        """
+        Print the files that were not reviewed and why
+
+        :param skipped: dict of filename: reason
+        :return: None
+        """
+        if skipped:
+            print(f"Skipping {len(skipped)} file(s) that cannot be reviewed:")
+            print_table(list(skipped.items()), headers=["File", "Reason"])
+
+    def create_review(self, body, file, reviews, title, rate_limiter=None):
         """
         Create a review for a file and add them to reviews dictionary.
 
@@ -160,14 +269,80 @@ class PullRequestReviewer:
         :param file:
         :param reviews:
         :param title:
+        :param rate_limiter: RateLimiter for this run, self.rate_limiter if None
         :return:
         """
+        reviews[file.filename] = self.generate_review(body, file, title, rate_limiter)
+
+    def generate_review(self, body, file, title, rate_limiter=None):
+        """
+        Generate the review for a file
+
+        :param body: pull request body
+        :param file: file with filename and patch
+        :param title: pull request title
+        :param rate_limiter: RateLimiter for this run, self.rate_limiter if None
+        :return: review as a list of lines
+        """
         content = file.patch
-        self.logger.info("Reviewing file: ", file.filename)
+        self.logger.info(f"Reviewing file: {file.filename}")
         _prompt = self.create_prompt(body, content, title)
+        if rate_limiter := rate_limiter or self.rate_limiter:
+            rate_limiter.acquire()
         review = self.openai_agent.ask_llm(_prompt).replace("\n", "<br>")
-        review = review.split("<br>")
-        reviews[file.filename] = review
+        return review.split("<br>")
+
+    def review_and_post(self, pr, workers=4, queue_size=8):
+        """
+        Review a pull request and post every review as soon as it is generated.
+        Reviews are generated by a pool of workers and handed to the posting
+        stage through a bounded queue, so at most queue_size + workers reviews
+        are held in memory. Posting is pre-authorized by the caller.
+
+        :param pr: pull request object
+        :param workers: number of files reviewed concurrently
+        :param queue_size: maximum number of reviews waiting to be posted
+        :return: list of posted filenames, dict of skipped filename: reason
+            (files that could not be reviewed or posted)
+        """
+        files, skipped = self.filter_files(pr)
+        generated = queue.Queue(maxsize=queue_size)
+
+        def generate(file):
+            try:
+                review = self.generate_review(pr.body, file, pr.title)
+            except Exception as e:
+                review = e
+            generated.put((file.filename, review))  # blocks while the queue is full
+
+        posted = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(generate, file) for file in files]
+            try:
+                for _ in tqdm(range(len(files))):
+                    filename, review = generated.get()
+                    if isinstance(review, Exception):
+                        self.logger.error(f"Error reviewing {filename}: {review}")
+                        skipped[filename] = f"review failed ({review})"
+                        continue
+                    try:
+                        self.post_file_review(pr, filename, review)
+                    except Exception as e:  # rate limits, permissions
+                        self.logger.error(f"Error posting review of {filename}: {e}")
+                        skipped[filename] = f"posting failed ({e})"
+                        continue
+                    posted.append(filename)
+            finally:
+                # workers blocked on the full queue would keep the executor
+                # from shutting down if the loop is interrupted
+                for future in futures:
+                    future.cancel()
+                while not all(future.done() for future in futures):
+                    try:
+                        generated.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+        return posted, skipped
 
     @staticmethod
     def create_prompt(body, content, title):
@@ -198,8 +373,19 @@ class PullRequestReviewer:
         :return: None
         """
         for file, review in tqdm(reviews.items()):
-            review = "\n".join(review)
-            pull_request.create_review(
-                body=f"{self.HEADER.format(filename=file)}{review}", event="COMMENT"
-            )
-            self.logger.info(f"Review posted successfully for {file}.")
+            self.post_file_review(pull_request, file, review)
+
+    def post_file_review(self, pull_request, file, review):
+        """
+        Post the review of a single file to the pull request
+
+        :param pull_request: The pull request object
+        :param file: filename
+        :param review: review as a list of lines
+        :return: None
+        """
+        review = "\n".join(review)
+        pull_request.create_review(
+            body=f"{self.HEADER.format(filename=file)}{review}", event="COMMENT"
+        )
+        self.logger.info(f"Review posted successfully for {file}.")
@@ -1,6 +1,19 @@
 """
 Questions prompts for pyinquirer
 """
+from datetime import datetime
+
+
+def _optional_date(text):
+    """
+    Validate an optional ISO date, pyinquirer asks again until it is valid
+    :param text: answer of the user
+    :return: True if valid, otherwise the error message
+    """
+    try:
+        return not text.strip() or bool(datetime.fromisoformat(text.strip()))
+    except ValueError:
+        return "Enter a date as YYYY-MM-DD or leave it empty"
 
 
 class Questions:
@@ -78,11 +91,22 @@ class Questions:
             "choices": [
                 "List pull requests",
                 "Review a pull request",
+                "Review all open pull requests",
                 "Exit",
             ],
         }
     ]
 
+    PIPELINED_REVIEW = "Post each review as soon as it is generated"
+    REVIEW_MODE = [
+        {
+            "type": "list",
+            "name": "mode",
+            "message": "How should the review be posted?",
+            "choices": [PIPELINED_REVIEW, "Confirm after all files are reviewed"],
+        }
+    ]
+
     REVIEW_CONFIRMATION = [
         {
             "type": "list",
@@ -92,15 +116,74 @@ class Questions:
         }
     ]
 
+    BATCH_REVIEW_QUESTIONS = [
+        {
+            "type": "input",
+            "name": "repo_name",
+            "message": "Enter the repository (user/repo): ",
+        },
+        {
+            "type": "input",
+            "name": "labels",
+            "message": "Only review pull requests with one of these labels (space separated, optional): ",
+        },
+        {
+            "type": "input",
+            "name": "author",
+            "message": "Only review pull requests by this author (optional): ",
+        },
+        {
+            "type": "input",
+            "name": "since",
+            "message": "Only review pull requests updated since (YYYY-MM-DD, optional): ",
+            "validate": _optional_date,
+        },
+        {
+            "type": "list",
+            "name": "post",
+            "message": "Post the reviews to the pull requests?",
+            "choices": ["No", "Yes"],
+        },
+        {
+            "type": "input",
+            "name": "report",
+            "message": "Where should the JSON report be saved? ",
+            "default": "gitbrew_review_report.json",
+        },
+    ]
+
     # Readme input URL
     README_INPUT_URL = [
         {
             "type": "input",
             "name": "repo_url",
-            "message": "Enter the repository url: ",
+            "message": "Enter the repository url or the path of a local checkout: ",
         }
     ]
 
+    UPDATE_README = "Update the sections affected by new commits"
+    README_UPDATE = [
+        {
+            "type": "list",
+            "name": "choice",
+            "message": "This readme was generated by gitbrew before. What would you like to do?",
+            "choices": [UPDATE_README, "Regenerate the readme"],
+        }
+    ]
+
+    README_BUDGET = [
+        {
+            "type": "input",
+            "name": "token_budget",
+            "message": "Token budget for file summaries (empty for no limit): ",
+        },
+        {
+            "type": "input",
+            "name": "time_budget",
+            "message": "Time budget in seconds (empty for no limit): ",
+        },
+    ]
+
     # check whether the user wants to review the readme or post it
     README_FILE_NAME = [
         {
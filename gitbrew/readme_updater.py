@@ -0,0 +1,333 @@
+"""
+Incremental readme updates
+
+The commit a readme was generated from is recorded in the gitbrew cache,
+with the uncommitted files of a local checkout that were read along with it.
+On the next run only the files changed since then are summarized, and only
+the readme sections they affect are rewritten. All other sections
+are kept byte for byte.
+"""
+import hashlib
+import json
+import os
+import re
+
+from . import utilities
+from .local_repository import LocalRepository
+from .prompts.update_readme_prompt import UpdateReadmePrompt
+from .summary_reducer import SummaryReducer
+
+
+class ReadmeUpdater:
+    """
+    Updates a generated readme with the changes since it was generated
+    """
+
+    MARKER = re.compile(r"^<<<SECTION (\d+)>>>[ \t]*\r?\n?", re.M)
+
+    def __init__(self, readme_generator, logger):
+        """
+        :param readme_generator: ReadmeGenerator used to summarize the changed files
+        :param logger: Logger
+        """
+        self.readme_generator = readme_generator
+        self.logger = logger
+
+    @staticmethod
+    def _state_path(repo_url, file_name):
+        """
+        Path of the state of a readme in the gitbrew cache
+        :param repo_url: html url of the repository or path of a local checkout
+        :param file_name: readme file
+        :return: path of the state file
+        """
+        if os.path.isdir(repo_url):
+            repo = os.path.abspath(repo_url)
+        else:
+            repo = utilities.extract_repo(repo_url)
+        key = f"{repo}\0{os.path.abspath(file_name)}"
+        return os.path.join(
+            utilities.cache_dir("readmes"),
+            f"{hashlib.sha1(key.encode()).hexdigest()}.json",
+        )
+
+    def load_state(self, repo_url, file_name):
+        """
+        State of a previously generated readme
+        :param repo_url: html url of the repository or path of a local checkout
+        :param file_name: readme file
+        :return: dict with the commit, None if there is no readme to update
+        """
+        path = self._state_path(repo_url, file_name)
+        if not os.path.isfile(file_name) or not os.path.isfile(path):
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except ValueError as e:
+            self.logger.error(f"Ignoring invalid readme state {path}: {e}")
+            return None
+
+    def save_state(self, repo_url, file_name, commit, uncommitted=None):
+        """
+        Record the commit a readme was generated from
+        :param repo_url: html url of the repository or path of a local checkout
+        :param file_name: readme file
+        :param commit: commit sha, nothing is recorded if None
+        :param uncommitted: dict of path: blob sha of the files of a local
+            checkout that differed from the commit when they were read
+        :return: None
+        """
+        if not commit:
+            return
+        state = {"repo": repo_url, "file": os.path.abspath(file_name), "commit": commit}
+        if uncommitted:
+            state["uncommitted"] = uncommitted
+        with open(self._state_path(repo_url, file_name), "w") as f:
+            json.dump(state, f, indent=2)
+
+    @staticmethod
+    def split_sections(text):
+        """
+        Split markdown into sections starting at headings
+        Lines starting with # inside code blocks are not headings.
+        Joining the sections gives back the text unchanged.
+
+        :param text: markdown
+        :return: list of sections
+        """
+        sections, start, offset, fenced = [], 0, 0, False
+        for line in text.splitlines(keepends=True):
+            if line.lstrip().startswith("```"):
+                fenced = not fenced
+            elif line.startswith("#") and not fenced and offset > start:
+                sections.append(text[start:offset])
+                start = offset
+            offset += len(line)
+        sections.append(text[start:])
+        return sections
+
+    def update(self, repo_url, file_name):
+        """
+        Update a readme with the changes since it was generated
+
+        :param repo_url: html url of the repository or path of a local checkout
+        :param file_name: readme file
+        :return: True if the readme is up to date, False if it must be regenerated
+            (the recorded commit only advances when every change was applied)
+        """
+        state = self.load_state(repo_url, file_name)
+        if not state:
+            return False
+        head, changed, uncommitted = self._changes(repo_url, state)
+        if head is None or changed is None:
+            self.logger.info(f"Cannot compare {repo_url} with {state['commit']}")
+            return False
+        paths = [
+            path
+            for path in dict.fromkeys(changed)
+            if self.readme_generator._to_summarize(path)
+            and not utilities.is_ignored(path)
+            and not self._is_readme(repo_url, path, file_name)
+        ]
+        self.logger.info(f"Files changed since {state['commit']}: {paths}")
+        updated = {}
+        if paths:
+            files = self._read_files(repo_url, paths, head)
+            removed = sorted(set(paths) - {file.path for file in files})
+            summaries = self.readme_generator.summarize_files(files)
+            if self.readme_generator.failed:
+                self.logger.error(
+                    f"Could not summarize {sorted(self.readme_generator.failed)}"
+                )
+                return False
+            updated = self._update_sections(file_name, summaries, removed)
+            if updated is None:
+                return False
+        print(
+            f"Updated {len(updated)} readme section(s) "
+            f"from {len(paths)} changed file(s)"
+        )
+        self.save_state(repo_url, file_name, head, uncommitted)
+        return True
+
+    @staticmethod
+    def _is_readme(repo_url, path, file_name):
+        """
+        Check whether a changed path is the readme itself
+        :param repo_url: html url of the repository or path of a local checkout
+        :param path: changed path
+        :param file_name: readme file
+        :return: True if the path is the readme in a local checkout
+        """
+        if not os.path.isdir(repo_url):
+            return False
+        readme = os.path.relpath(os.path.abspath(file_name), os.path.abspath(repo_url))
+        return readme.replace(os.sep, "/") == path
+
+    def _changes(self, repo_url, state):
+        """
+        Current commit and changed files since a readme was generated
+        A local checkout is compared with its working tree, including
+        uncommitted and untracked files. Uncommitted files recorded with the
+        state are left out while their content is the same. A GitHub
+        repository is compared with the compare API.
+
+        :param repo_url: html url of the repository or path of a local checkout
+        :param state: state of the readme from load_state
+        :return: head commit, list of changed paths (None if unknown),
+            dict of uncommitted path: blob sha (None for a GitHub repository)
+        """
+        base = state["commit"]
+        if os.path.isdir(repo_url):
+            local_repository = LocalRepository(repo_url, self.logger)
+            head = local_repository.head()
+            if head is None:
+                return None, None, None
+            # recorded before the files are read, so that later edits are seen
+            uncommitted = local_repository.uncommitted_files()
+            changed = local_repository.changed_files(base)
+            if changed is None or uncommitted is None:
+                return head, None, None
+            recorded = state.get("uncommitted", {})
+            current = local_repository.blob_shas(recorded)
+            changed = [
+                path
+                for path in dict.fromkeys([*changed, *recorded])
+                if path not in recorded or current[path] != recorded[path]
+            ]
+            return head, changed, uncommitted
+        git_helper = self.readme_generator.git_helper
+        git_helper.set_repo(utilities.extract_repo(repo_url))
+        repo = git_helper.get_repo()
+        head = git_helper.get_head_sha(repo)
+        if head == base:
+            return head, [], None
+        return head, git_helper.get_changed_files(repo, base, head), None
+
+    def _read_files(self, repo_url, paths, head):
+        """
+        Read the changed files that still exist
+        :param repo_url: html url of the repository or path of a local checkout
+        :param paths: changed paths
+        :param head: current commit
+        :return: list of RepoFile objects
+        """
+        if os.path.isdir(repo_url):
+            local_repository = LocalRepository(repo_url, self.logger)
+            files = [local_repository.get_file(path) for path in paths]
+        else:
+            git_helper = self.readme_generator.git_helper
+            repo = git_helper.get_repo()
+            files = [git_helper.get_file(repo, path, head) for path in paths]
+        return [file for file in files if file]
+
+    def _update_sections(self, file_name, summaries, removed):
+        """
+        Rewrite the sections of a readme affected by the changes
+
+        :param file_name: readme file
+        :param summaries: dict of path: summary of the changed files
+        :param removed: list of removed paths
+        :return: dict of section index: updated section, None if the LLM
+            failed and the readme was left unchanged
+        """
+        if not summaries and not removed:
+            return {}
+        # changes of large pull requests are rolled up like a full generation
+        summaries = self.readme_generator.summary_reducer.reduce(summaries)
+        changes = "\n\n".join(
+            SummaryReducer.format_entry(path, summary)
+            for path, summary in summaries.items()
+        )
+        with open(file_name, newline="") as f:
+            sections = self.split_sections(f.read())
+        selected = self._select_sections(sections, changes, removed)
+        if selected is None:
+            return None
+        if not selected:
+            return {}
+        updated = self._rewrite_sections(sections, selected, changes, removed)
+        if updated is None:
+            return None
+        for index, section in updated.items():
+            self.logger.info(f"Updated readme section: {section.splitlines()[0]}")
+            sections[index] = section
+        partial_name = f"{file_name}.partial"
+        with open(partial_name, "w", newline="") as f:
+            f.write("".join(sections))
+        os.replace(partial_name, file_name)
+        return updated
+
+    def _select_sections(self, sections, changes, removed):
+        """
+        Ask the LLM which sections are affected by the changes
+        :param sections: list of sections
+        :param changes: formatted summaries of the changed files
+        :param removed: list of removed paths
+        :return: sorted list of section indices, None if the LLM failed
+        """
+        headings = "\n".join(
+            f"[{index}] {section.strip().splitlines()[0] if section.strip() else ''}"
+            for index, section in enumerate(sections)
+        )
+        answer = self._ask(
+            UpdateReadmePrompt.select_system_prompt,
+            UpdateReadmePrompt.select_user_prompt.format(
+                sections=headings, changes=changes, removed=removed or "none"
+            ),
+        )
+        if answer is None:
+            self.logger.error("Could not select the readme sections to update")
+            return None
+        indices = {int(number) for number in re.findall(r"\d+", answer)}
+        return sorted(indices & set(range(len(sections))))
+
+    def _rewrite_sections(self, sections, selected, changes, removed):
+        """
+        Ask the LLM to rewrite the selected sections
+        Every selected section has to be in the answer.
+
+        :param sections: list of sections
+        :param selected: indices of the sections to rewrite
+        :param changes: formatted summaries of the changed files
+        :param removed: list of removed paths
+        :return: dict of section index: updated section, None if the LLM failed
+        """
+        answer = self._ask(
+            UpdateReadmePrompt.system_prompt,
+            UpdateReadmePrompt.user_prompt.format(
+                changes=changes,
+                removed=removed or "none",
+                sections="\n".join(
+                    f"<<<SECTION {index}>>>\n{sections[index]}" for index in selected
+                ),
+            ),
+        )
+        parts = self.MARKER.split(answer or "")
+        updated = {}
+        for index, body in zip(map(int, parts[1::2]), parts[2::2]):
+            if index not in selected or not body.strip():
+                continue
+            original = sections[index]
+            body = body.strip("\n").rstrip() + original[len(original.rstrip()) :]
+            if "\r\n" in original:
+                body = body.replace("\r\n", "\n").replace("\n", "\r\n")
+            updated[index] = body
+        if missing := sorted(set(selected) - set(updated)):
+            self.logger.error(f"Readme sections missing from the answer: {missing}")
+            return None
+        return updated
+
+    def _ask(self, system_prompt, user_prompt):
+        """
+        Ask the LLM, respecting the rate limit of the readme generator
+        :param system_prompt: system prompt
+        :param user_prompt: user prompt
+        :return: answer
+        """
+        openai_agent = self.readme_generator.openai_agent
+        self.readme_generator.rate_limiter.acquire()
+        return openai_agent.ask_llm(
+            openai_agent.create_message(system_prompt, user_prompt)
+        )
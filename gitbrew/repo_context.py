@@ -0,0 +1,201 @@
+"""
+State of the local repository for the natural language git command line
+
+The current branch, its upstream, the changed files and the recent
+branches are given to the LLM with every intent, so that it fills in
+branch names and paths instead of asking for them. The state is cached
+until HEAD, the index or the refs change on disk.
+"""
+import os
+import re
+import subprocess
+import time
+
+from .constants import RepoContextLimits
+
+BRANCH_HEADER = re.compile(
+    r"(?P<branch>.+?)(?:\.\.\.(?P<upstream>\S+))?(?: \[(?P<ab>.+)\])?$"
+)
+
+
+class RepoContext:
+    """
+    Cached description of the repository in the current directory
+    """
+
+    def __init__(
+        self,
+        logger,
+        path=".",
+        max_age=RepoContextLimits.MAX_AGE,
+        max_files=RepoContextLimits.MAX_FILES,
+        max_branches=RepoContextLimits.RECENT_BRANCHES,
+    ):
+        """
+        :param logger: Logger
+        :param path: directory the git commands run in
+        :param max_age: seconds after which the state is gathered again, for
+            changes to the working tree that do not touch the index
+        :param max_files: maximum number of changed files listed
+        :param max_branches: number of recent branches listed
+        """
+        self.logger = logger
+        self.path = path
+        self.max_age = max_age
+        self.max_files = max_files
+        self.max_branches = max_branches
+        self.root = None  # top level of the working tree, None outside a repository
+        self.branch = None  # current branch, None if detached
+        self._git_dirs = None  # (git dir, common dir) of the located directory
+        self._located = None  # directory the repository was located from
+        self._fingerprint = None
+        self._gathered_at = 0.0
+        self._description = ""
+
+    def _git(self, *args):
+        """
+        Run a git command without taking optional locks
+        :param args: git arguments
+        :return: stdout as a string, None if the command fails
+        """
+        try:
+            output = subprocess.check_output(
+                ["git", "--no-optional-locks", *args],
+                cwd=self.path,
+                stderr=subprocess.DEVNULL,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return output.decode("utf-8", errors="replace")
+
+    def _locate(self):
+        """
+        Find the git directories of the repository, once per directory
+        :return: (git dir, common dir), None outside a repository
+        """
+        directory = os.path.abspath(self.path)
+        if self._located != directory:
+            output = self._git(
+                "rev-parse", "--absolute-git-dir", "--git-common-dir", "--show-toplevel"
+            )
+            lines = output.splitlines() if output else []
+            if len(lines) == 3:
+                git_dir, common_dir, self.root = lines
+                self._git_dirs = git_dir, os.path.join(directory, common_dir)
+            else:
+                self.root, self._git_dirs = None, None
+            self._located, self._fingerprint = directory, None
+        return self._git_dirs
+
+    def fingerprint(self):
+        """
+        Modification times of HEAD, the index and the refs
+        Refs are updated by renaming lock files, which changes the
+        modification time of their directory.
+
+        :return: tuple of (path, mtime), None outside a repository
+        """
+        if not (git_dirs := self._locate()):
+            return None
+        git_dir, common_dir = git_dirs
+        paths = [
+            os.path.join(git_dir, "HEAD"),
+            os.path.join(git_dir, "index"),
+            os.path.join(common_dir, "packed-refs"),
+        ]
+        for refs in ("heads", "remotes"):
+            for directory, _, _ in os.walk(os.path.join(common_dir, "refs", refs)):
+                paths.append(directory)
+        return tuple((path, self._mtime(path)) for path in paths)
+
+    @staticmethod
+    def _mtime(path):
+        """
+        :param path: path of a file or directory
+        :return: modification time in nanoseconds, None if it does not exist
+        """
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def describe(self):
+        """
+        Compact description of the repository for the prompt
+        :return: description, empty outside a repository
+        """
+        fingerprint = self.fingerprint()
+        if fingerprint is None:
+            self.branch, self._description = None, ""
+            return ""
+        age = time.monotonic() - self._gathered_at
+        if fingerprint != self._fingerprint or age > self.max_age:
+            self._description = self._gather()
+            self._fingerprint, self._gathered_at = fingerprint, time.monotonic()
+        return self._description
+
+    def scope(self):
+        """
+        Repository and branch the commands run on, answers are cached per scope
+        :return: "root@branch", or the current directory outside a repository
+        """
+        self.describe()
+        if not self.root:
+            return os.path.abspath(self.path)
+        return f"{self.root}@{self.branch or 'HEAD'}"
+
+    def _gather(self):
+        """
+        Read the state of the repository with git
+        :return: description
+        """
+        status = self._git("status", "--porcelain", "--branch", "-z")
+        if status is None:
+            self.branch = None
+            return ""
+        header, *entries = status.split("\0")
+        lines = [f"Current branch: {self._parse_branch(header[3:])}"]
+        changed, skip = [], False
+        for entry in filter(None, entries):
+            if not skip:
+                changed.append(entry)
+            skip = not skip and entry[0] in "RC"  # the next entry is the old path
+        if changed:
+            shown = ", ".join(changed[: self.max_files])
+            more = len(changed) - self.max_files
+            lines.append(
+                f"Changed files ({len(changed)}): {shown}"
+                + (f" and {more} more" if more > 0 else "")
+            )
+        else:
+            lines.append("Changed files: none")
+        branches = self._git(
+            "for-each-ref",
+            "--sort=-committerdate",
+            f"--count={self.max_branches}",
+            "--format=%(refname:short)",
+            "refs/heads",
+        )
+        if branches and branches.split():
+            lines.append(f"Recent branches: {', '.join(branches.split())}")
+        self.logger.debug(f"Repository context: {lines}")
+        return "\n".join(lines)
+
+    def _parse_branch(self, header):
+        """
+        Parse the branch header of git status
+        :param header: header without the leading "## "
+        :return: description of the branch and its upstream
+        """
+        if header.startswith("HEAD (no branch)"):
+            self.branch = None
+            return "none (detached HEAD)"
+        if header.startswith(("No commits yet on ", "Initial commit on ")):
+            self.branch = header.split(" on ", 1)[1]
+            return f"{self.branch} (no commits yet)"
+        match = BRANCH_HEADER.match(header)
+        self.branch = match["branch"]
+        if not match["upstream"]:
+            return f"{self.branch} (no upstream)"
+        tracking = f"{self.branch}, tracking {match['upstream']}"
+        return f"{tracking} ({match['ab']})" if match["ab"] else tracking
@@ -0,0 +1,66 @@
+"""
+Repository files for readme generation
+"""
+import hashlib
+import posixpath
+
+
+class RepoFile:
+    """
+    A file of a repository, independent of where its content comes from
+    (GitHub API, archive or local checkout).
+    The content is given up front or loaded lazily by `loader`.
+    """
+
+    def __init__(
+        self, path, sha=None, size=None, content=None, loader=None, local=True
+    ):
+        """
+        :param path: path relative to the repository root
+        :param sha: git blob sha, computed from the content if None
+        :param size: size in bytes
+        :param content: content as bytes
+        :param loader: callable returning the content as bytes
+        :param local: False if reading the content needs a network request
+        """
+        self.path = path
+        self.name = posixpath.basename(path)
+        self._sha = sha
+        self._content = content
+        self._loader = loader
+        self.local = local or content is not None
+        self.size = len(content) if size is None and content is not None else size
+
+    def __repr__(self):
+        return f"RepoFile(path={self.path})"
+
+    def __str__(self):
+        return self.path
+
+    def read(self):
+        """
+        Content of the file
+        :return: bytes
+        """
+        if self._content is not None:
+            return self._content
+        return self._loader()
+
+    @property
+    def sha(self):
+        """
+        Git blob sha of the file
+        :return: hex digest
+        """
+        if self._sha is None:
+            self._sha = self.blob_sha(self.read())
+        return self._sha
+
+    @staticmethod
+    def blob_sha(data):
+        """
+        Compute the git blob sha of some content, like `git hash-object`
+        :param data: bytes
+        :return: hex digest
+        """
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
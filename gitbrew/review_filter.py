@@ -0,0 +1,206 @@
+"""
+Pre-filter for pull request reviews
+
+Classifies the files of a pull request before any LLM call is made
+and skips files that cannot be reviewed meaningfully: generated or
+vendored code, binaries, huge or minified patches and whitespace-only changes.
+"""
+import posixpath
+from fnmatch import fnmatchcase
+
+from .constants import ReviewFilters
+
+
+class ReviewFilter:
+    """
+    Classifies pull request files as reviewable or not
+    """
+
+    GENERATED = "linguist-generated"
+    VENDORED = "linguist-vendored"
+
+    def __init__(
+        self,
+        logger=None,
+        non_code_files=(),
+        generated_patterns=ReviewFilters.GENERATED_PATTERNS,
+        vendored_patterns=ReviewFilters.VENDORED_PATTERNS,
+        binary_files=ReviewFilters.BINARY_FILES,
+        max_patch_size=ReviewFilters.MAX_PATCH_SIZE,
+        max_line_length=ReviewFilters.MAX_LINE_LENGTH,
+        max_long_line_ratio=ReviewFilters.MAX_LONG_LINE_RATIO,
+    ):
+        """
+        Initialize the filter
+
+        :param logger: Logger
+        :param non_code_files: file name suffixes that are never reviewed
+        :param generated_patterns: globs for generated files
+        :param vendored_patterns: globs for vendored files
+        :param binary_files: suffixes of binary files
+        :param max_patch_size: maximum patch size in characters
+        :param max_line_length: length of an added line that counts as long
+        :param max_long_line_ratio: maximum share of long added lines, patches
+            with more are minified code
+        """
+        self.logger = logger
+        self.non_code_files = tuple(non_code_files)
+        self.binary_files = tuple(binary_files)
+        self.max_patch_size = max_patch_size
+        self.max_line_length = max_line_length
+        self.max_long_line_ratio = max_long_line_ratio
+        # ordered (pattern, attribute, value) rules, the last match wins
+        self.rules = [(pattern, self.GENERATED, True) for pattern in generated_patterns]
+        self.rules.extend(
+            (pattern, self.VENDORED, True) for pattern in vendored_patterns
+        )
+
+    def load_gitattributes(self, text):
+        """
+        Add linguist-generated and linguist-vendored rules from
+        the content of a .gitattributes file.
+        Rules from the file take precedence over the defaults.
+
+        :param text: content of a .gitattributes file
+        :return: None
+        """
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            pattern, *attributes = line.split()
+            for attribute in attributes:
+                name, value = self._parse_attribute(attribute)
+                if name in (self.GENERATED, self.VENDORED):
+                    self.rules.append((pattern, name, value))
+
+    @staticmethod
+    def _parse_attribute(attribute):
+        """
+        Parse a gitattributes attribute into (name, value)
+        `attr`, `attr=true` are set, `-attr`, `!attr`, `attr=false` are unset
+
+        :param attribute: attribute string
+        :return: name, value
+        """
+        if attribute.startswith(("-", "!")):
+            return attribute[1:], False
+        name, _, value = attribute.partition("=")
+        return name, value.lower() not in ("false", "0")
+
+    @staticmethod
+    def path_matches(path, pattern):
+        """
+        Match a path against a gitattributes-style glob
+
+        :param path: file path relative to the repository root
+        :param pattern: glob pattern
+        :return: True if the path matches
+        """
+        if pattern.endswith("/"):
+            pattern += "**"
+        if "/" not in pattern:
+            return fnmatchcase(posixpath.basename(path), pattern)
+        pattern = pattern.lstrip("/")
+        if pattern.startswith("**/"):
+            return fnmatchcase(path, pattern) or fnmatchcase(path, pattern[3:])
+        return fnmatchcase(path, pattern)
+
+    def _attribute(self, path, name):
+        """
+        Resolve a linguist attribute for a path, the last matching rule wins
+
+        :param path: file path
+        :param name: attribute name
+        :return: True if the attribute is set
+        """
+        value = False
+        for pattern, attribute, rule_value in self.rules:
+            if attribute == name and self.path_matches(path, pattern):
+                value = rule_value
+        return value
+
+    def classify(self, file):
+        """
+        Classify a pull request file
+
+        :param file: file with filename and patch (github File object)
+        :return: reason for skipping the file, None if it should be reviewed
+        """
+        filename, patch = file.filename, file.patch
+        if filename.endswith(self.non_code_files):
+            return "non-code file"
+        if self._attribute(filename, self.VENDORED):
+            return "vendored"
+        if self._attribute(filename, self.GENERATED):
+            return "generated"
+        if filename.lower().endswith(self.binary_files):
+            return "binary"
+        if patch is None:
+            return "binary or too large (no patch available)"
+        if "\x00" in patch or patch.startswith("Binary files"):
+            return "binary"
+        if len(patch) > self.max_patch_size:
+            return f"patch too large ({len(patch)} > {self.max_patch_size} characters)"
+        hunks = self._changed_lines(patch)
+        added = [line for hunk_added, _ in hunks for line in hunk_added]
+        if not added and not any(removed for _, removed in hunks):
+            return "no content changes"
+        long_lines = sum(len(line) > self.max_line_length for line in added)
+        if added and long_lines / len(added) > self.max_long_line_ratio:
+            return f"minified (lines over {self.max_line_length} characters)"
+        if all(
+            self._normalize(added) == self._normalize(removed)
+            for added, removed in hunks
+        ):
+            return "whitespace-only changes"
+        return None
+
+    @staticmethod
+    def _changed_lines(patch):
+        """
+        Split a unified diff into the added and removed lines of each hunk
+        Lines before the first hunk are file headers (local diffs), the
+        patch field of the GitHub API starts at the first hunk.
+
+        :param patch: unified diff
+        :return: list of (added lines, removed lines) per hunk
+        """
+        hunks = []
+        for line in patch.splitlines():
+            if line.startswith("@@"):
+                hunks.append(([], []))
+            elif hunks and line.startswith("+"):
+                hunks[-1][0].append(line[1:])
+            elif hunks and line.startswith("-"):
+                hunks[-1][1].append(line[1:])
+        return hunks
+
+    @staticmethod
+    def _normalize(lines):
+        """
+        Remove all whitespace from lines, keeping their order
+        Lines re-wrapped or re-indented normalize to the same text,
+        reordered lines do not.
+
+        :param lines: list of lines
+        :return: non-whitespace characters of the lines, in order
+        """
+        return "".join("".join(line.split()) for line in lines)
+
+    def partition(self, files):
+        """
+        Split files into the ones to review and the ones to skip
+
+        :param files: iterable of pull request files
+        :return: list of files to review, dict of skipped filename: reason
+        """
+        to_review, skipped = [], {}
+        for file in files:
+            if reason := self.classify(file):
+                if self.logger:
+                    self.logger.info(f"Skipping file: {file.filename} ({reason})")
+                skipped[file.filename] = reason
+            else:
+                to_review.append(file)
+        return to_review, skipped
@@ -1,14 +1,11 @@
 import cmd
 import os.path
 import sys
+from functools import cached_property
 
+from dotenv import find_dotenv, load_dotenv
 from PyInquirer import prompt
-from rich.console import Console
 
-from .command_handler import CommandHandler
-from .generate_readme import ReadmeGenerator
-from .issue_manager import IssueManager
-from .pull_requests import PullRequestReviewer
 from .questions import Questions
 from .utilities import setup_logger
 
@@ -48,6 +45,10 @@ class Shell(cmd.Cmd):
     """
 
     prompt = "gitbrew> "
+    # states of the dispatch loop
+    MENU = "menu"  # choosing a utility
+    GIT = "git"  # reading natural language git commands
+    EXIT = "exit"
     exit_keywords = ["exit", "quit"]
     MESSAGE = "Welcome to gitbrew!\nEnter `help` for documentation. \nEnter `quit` or `exit` to exit the application.`cancel` to exit command line.\n"
     ENV_FILE = ".env"
@@ -60,14 +61,9 @@ class Shell(cmd.Cmd):
     def __init__(self):
         super().__init__()
         self.logger = setup_logger(save_logs=True, print_logs=False)
+        self.state = self.MENU
         self.setup()
-        self.command_handler = CommandHandler(self.logger)  # git command handler
-        self.pull_request_reviewer = PullRequestReviewer(
-            self.logger
-        )  # pull request reviewer handler
-        self.readme_generator = ReadmeGenerator(self.logger)  # readme generator handler
-        self.issue_manager = IssueManager(self.logger)  # issue manager handler
-        self.console = Console()
+        load_dotenv(find_dotenv(usecwd=True))  # handlers read their keys from it
         self.UTILITIES = {
             "Generate a Readme": self._readme_generation_handler,
             "Work with github issues": self._issue_manager_handler,
@@ -77,6 +73,54 @@ class Shell(cmd.Cmd):
             "Exit": self.do_exit,
         }
 
+    # handlers, their modules and API clients are loaded on first use of each
+    # utility, the libraries behind them take seconds to import
+
+    @cached_property
+    def command_handler(self):
+        """
+        Git command handler
+        """
+        from .command_handler import CommandHandler
+
+        return CommandHandler(self.logger)
+
+    @cached_property
+    def pull_request_reviewer(self):
+        """
+        Pull request reviewer handler
+        """
+        from .pull_requests import PullRequestReviewer
+
+        return PullRequestReviewer(self.logger)
+
+    @cached_property
+    def readme_generator(self):
+        """
+        Readme generator handler
+        """
+        from .generate_readme import ReadmeGenerator
+
+        return ReadmeGenerator(self.logger)
+
+    @cached_property
+    def issue_manager(self):
+        """
+        Issue manager handler
+        """
+        from .issue_manager import IssueManager
+
+        return IssueManager(self.logger)
+
+    @cached_property
+    def console(self):
+        """
+        Rich console for the help text
+        """
+        from rich.console import Console
+
+        return Console()
+
     def do_exit(self, arg=None):
         """
         Handler for "exit" keyword
@@ -84,7 +128,8 @@ class Shell(cmd.Cmd):
         :return: True
         """
         self.logger.info("Exiting...")
-        sys.exit(0)
+        self.state = self.EXIT
+        return True
 
     def do_quit(self, arg=None):
         """
@@ -92,8 +137,7 @@ class Shell(cmd.Cmd):
         :param arg: Optional args
         :return: True
         """
-        self.logger.info("Exiting...")
-        sys.exit(0)
+        return self.do_exit(arg)
 
     def do_cancel(self, arg=None):
         """
@@ -102,21 +146,30 @@ class Shell(cmd.Cmd):
         :return: True
         """
         self.logger.info("Exiting command line")
-        self.preloop()
+        self.state = self.MENU
+        return True
 
     def cmdloop(self, intro=None):
         """
-        Create a command line loop
+        Dispatch loop of the application
+        Every utility returns here when it finishes, so that the stack does
+        not grow with the number of interactions. The git command line is
+        a cmd.Cmd loop that returns on "cancel", "help" or "exit".
+
         :param intro: Intro
         :return: None
         """
         if intro:
-            self.intro = intro
+            print(intro)
         try:
-            super().cmdloop()
+            while self.state != self.EXIT:
+                if self.state == self.MENU:
+                    self._choose_utility()
+                else:
+                    super().cmdloop(intro="")
         except KeyboardInterrupt:
             print("\nExiting...")
-            sys.exit(0)
+        sys.exit(0)
 
     def do_help(self, arg: str = ""):
         """
@@ -126,7 +179,9 @@ class Shell(cmd.Cmd):
         """
         if not arg:
             self.console.print(self.__doc__)
-        self.cmdloop(intro=self.MESSAGE)
+        print(self.MESSAGE)
+        self.state = self.MENU
+        return True
 
     def setup(self):
         """
@@ -167,9 +222,6 @@ class Shell(cmd.Cmd):
         """
         self._git_command_handler(line)
 
-    def preloop(self) -> None:
-        self._choose_utility()
-
     def _choose_utility(self, line=None):
         """
         Choose utility based on user input
@@ -182,7 +234,8 @@ class Shell(cmd.Cmd):
         if line:
             print(f"I don't understand what you mean by: {line}.\n")
         questions = Questions.CHOOSE_UTILITY
-        self.UTILITIES.get(prompt(questions)["utility"])()
+        utility = prompt(questions).get("utility")  # empty if interrupted
+        self.UTILITIES.get(utility, self.do_exit)()
 
     def _pull_request_handler(self):
         """
@@ -191,7 +244,6 @@ class Shell(cmd.Cmd):
         """
         self.logger.info("Calling pull request reviewer...")
         self.pull_request_reviewer.handle()
-        self.preloop()
 
     def _readme_generation_handler(self):
         """
@@ -200,20 +252,20 @@ class Shell(cmd.Cmd):
         """
         self.logger.info("Calling readme generator...")
         self.readme_generator.handle()
-        self.preloop()
 
     def _git_command_handler(self, line=None):
         """
         Handler for git commands
         :param line: git command
-        :return: None
+        :return: True to leave the command line loop
         """
-        if not line:  # called by preloop
+        if not line:  # chosen in the menu
+            self.state = self.GIT
             return
         line = line.strip()
         if line in self.exit_keywords:  # exit
             self.logger.info("Exiting from git command handler...")
-            self.do_exit()
+            return self.do_exit()
         self.logger.info("Calling git command handler...")
         self.command_handler.handle(line)  # handle git command
 
@@ -224,4 +276,3 @@ class Shell(cmd.Cmd):
         """
         self.logger.info("Calling issue manager handler...")
         self.issue_manager.handle()
-        self.preloop()
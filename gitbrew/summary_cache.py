@@ -0,0 +1,104 @@
+"""
+Persistent cache of file and directory summaries
+
+Summaries are keyed by a sha of what the prompt is built from (the path and
+content of a file, the entries of a directory), the prompt version and the
+model, so a regenerated readme only summarizes what changed.
+"""
+import os
+import sqlite3
+import threading
+
+from .utilities import cache_dir
+
+
+class SummaryCache:
+    """
+    Summary store backed by sqlite in the gitbrew cache directory
+    """
+
+    def __init__(self, logger, path=None):
+        """
+        :param logger: Logger
+        :param path: path of the sqlite database
+        """
+        self.logger = logger
+        self.path = path or os.path.join(cache_dir(), "summaries.sqlite3")
+        self._lock = threading.Lock()  # the connection is shared by worker threads
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "sha TEXT, prompt_version TEXT, model TEXT, summary TEXT, "
+                "PRIMARY KEY (sha, prompt_version, model))"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha, prompt_version, model):
+        """
+        Get a stored summary
+        :param sha: sha of the summarized content
+        :param prompt_version: version of the summarization prompt
+        :param model: model that generated the summary
+        :return: summary, None if it is not stored
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT summary FROM summaries "
+                "WHERE sha = ? AND prompt_version = ? AND model = ?",
+                (sha, str(prompt_version), model),
+            ).fetchone()
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def set(self, sha, prompt_version, model, summary):
+        """
+        Store a summary
+        :param sha: sha of the summarized content
+        :param prompt_version: version of the summarization prompt
+        :param model: model that generated the summary
+        :param summary: summary text
+        :return: None
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (sha, str(prompt_version), model, summary),
+            )
+
+    def get_or_create(self, sha, prompt_version, model, create):
+        """
+        Get a stored summary or create and store it
+        Empty summaries (failed LLM calls) are not stored.
+
+        :param sha: sha of the summarized content
+        :param prompt_version: version of the summarization prompt
+        :param model: model that generates the summary
+        :param create: callable returning the summary
+        :return: summary
+        """
+        if (summary := self.get(sha, prompt_version, model)) is not None:
+            return summary
+        if summary := create():
+            self.set(sha, prompt_version, model, summary)
+        return summary
+
+    def reset_stats(self):
+        """
+        Reset the hit and miss counters
+        :return: None
+        """
+        self.hits = self.misses = 0
+
+    def report(self):
+        """
+        Hit ratio of the cache since the last reset
+        :return: report string
+        """
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0
+        return f"Reused {self.hits}/{total} cached summaries ({ratio:.0%} hit ratio)"
@@ -0,0 +1,190 @@
+"""
+Hierarchical reduction of file summaries for readme generation
+
+Summaries that do not fit the final readme prompt are rolled up into
+directory summaries, level by level from the deepest directories,
+until everything fits the token budget.
+"""
+import hashlib
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import SummaryLimits
+from .prompts.summarize_directory_prompt import SummarizeDirectoryPrompt
+from .utilities import count_tokens
+
+
+class SummaryReducer:
+    """
+    Rolls file summaries up into directory and package summaries
+    Directory entries are keyed by their path with a trailing slash.
+    """
+
+    def __init__(
+        self,
+        openai_agent,
+        logger,
+        token_budget=SummaryLimits.README_TOKEN_BUDGET,
+        group_budget=SummaryLimits.DIRECTORY_TOKEN_BUDGET,
+        workers=4,
+        summary_cache=None,
+        rate_limiter=None,
+    ):
+        """
+        :param openai_agent: OpenAI agent
+        :param logger: Logger
+        :param token_budget: maximum tokens of all summaries together
+        :param group_budget: maximum tokens of summaries per LLM call
+        :param workers: number of directories summarized concurrently
+        :param summary_cache: optional SummaryCache for directory summaries
+        :param rate_limiter: optional RateLimiter shared with other LLM callers
+        """
+        self.openai_agent = openai_agent
+        self.logger = logger
+        self.token_budget = token_budget
+        self.group_budget = group_budget
+        self.workers = workers
+        self.summary_cache = summary_cache
+        self.rate_limiter = rate_limiter
+
+    @staticmethod
+    def format_entry(path, summary):
+        """
+        Format a file or directory summary for a prompt
+        :param path: file path, or directory path with a trailing slash
+        :param summary: summary text
+        :return: formatted summary
+        """
+        kind = "Directory" if path.endswith("/") else "File"
+        return f"{kind}: {path}. \n Summary: {summary}"
+
+    def _tokens(self, entries):
+        """
+        Tokens of formatted entries
+        :param entries: dict of path: summary
+        :return: number of tokens
+        """
+        return sum(
+            count_tokens(self.format_entry(path, summary))
+            for path, summary in entries.items()
+        )
+
+    @staticmethod
+    def _depth(path):
+        """
+        Depth of a path, 0 for entries in the repository root
+        :param path: file or directory path
+        :return: depth
+        """
+        return path.rstrip("/").count("/")
+
+    def reduce(self, summaries):
+        """
+        Reduce summaries until they fit the token budget
+
+        :param summaries: dict of file path: summary
+        :return: dict of path: summary, directories have a trailing slash
+        """
+        entries = dict(summaries)
+        while (tokens := self._tokens(entries)) > self.token_budget:
+            depth = max(map(self._depth, entries))
+            self.logger.info(
+                f"Summaries use {tokens} tokens (budget {self.token_budget}), "
+                f"reducing level {depth}"
+            )
+            if depth == 0:
+                reduced = {"./": self._summarize_directory("./", entries)}
+                if self._tokens(reduced) >= tokens:
+                    break  # cannot shrink any further
+                entries = reduced
+            else:
+                entries = self._reduce_level(entries, depth)
+        return entries
+
+    def _reduce_level(self, entries, depth):
+        """
+        Replace the entries at a depth by summaries of their parent directories
+        Directories are summarized concurrently.
+
+        :param entries: dict of path: summary
+        :param depth: depth of the entries to roll up
+        :return: dict of path: summary
+        """
+        groups, remaining = {}, {}
+        for path, summary in entries.items():
+            if self._depth(path) == depth:
+                directory = posixpath.dirname(path.rstrip("/")) + "/"
+                groups.setdefault(directory, {})[path] = summary
+            else:
+                remaining[path] = summary
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            reduced = executor.map(
+                lambda item: self._summarize_directory(*item), groups.items()
+            )
+            remaining.update(zip(groups, reduced))
+        return dict(sorted(remaining.items()))
+
+    def _summarize_directory(self, directory, entries):
+        """
+        Summarize a directory from the summaries of its contents.
+        Contents larger than the group budget are summarized in chunks.
+
+        :param directory: directory path with a trailing slash
+        :param entries: dict of path: summary
+        :return: summary of the directory
+        """
+        self.logger.info(f"Summarizing directory {directory}")
+        return "\n".join(self._ask(directory, chunk) for chunk in self._chunks(entries))
+
+    def _chunks(self, entries):
+        """
+        Split formatted entries into chunks that fit the group budget
+        :param entries: dict of path: summary
+        :return: generator of lists of formatted entries
+        """
+        chunk, tokens = [], 0
+        for path, summary in entries.items():
+            entry = self.format_entry(path, summary)
+            entry_tokens = count_tokens(entry)
+            if chunk and tokens + entry_tokens > self.group_budget:
+                yield chunk
+                chunk, tokens = [], 0
+            chunk.append(entry)
+            tokens += entry_tokens
+        if chunk:
+            yield chunk
+
+    def _ask(self, directory, chunk):
+        """
+        Ask the LLM for the summary of a chunk of a directory
+        :param directory: directory path
+        :param chunk: list of formatted entries
+        :return: summary
+        """
+        user_prompt = SummarizeDirectoryPrompt.user_prompt.format(
+            directory=directory, summaries="\n\n".join(chunk)
+        )
+        message = self.openai_agent.create_message(
+            SummarizeDirectoryPrompt.system_prompt, user_prompt
+        )
+        if not self.summary_cache:
+            return self._ask_llm(message) or ""
+        return (
+            self.summary_cache.get_or_create(
+                hashlib.sha1(user_prompt.encode()).hexdigest(),
+                SummarizeDirectoryPrompt.version,
+                self.openai_agent.chat_model,
+                lambda: self._ask_llm(message),
+            )
+            or ""
+        )
+
+    def _ask_llm(self, message):
+        """
+        Ask the LLM, respecting the shared rate limit
+        :param message: chat messages
+        :return: answer
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return self.openai_agent.ask_llm(message)
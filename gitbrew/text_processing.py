@@ -0,0 +1,92 @@
+"""
+Pre-processing of file content before summarization
+
+Detects binary content, decodes text incrementally and splits
+large files into chunks that fit a token budget.
+"""
+import codecs
+
+from .utilities import count_tokens
+
+
+def is_binary(data, sample_size=8000):
+    """
+    Sniff binary content the way git does: a NUL byte in the first bytes
+    :param data: content as bytes
+    :param sample_size: number of bytes inspected
+    :return: True if the content looks binary
+    """
+    return b"\0" in data[:sample_size]
+
+
+def iter_text(data, block_size=64 * 1024, encoding="utf-8"):
+    """
+    Decode bytes incrementally, invalid sequences are replaced
+    :param data: content as bytes (or any bytes-like object such as a mmap)
+    :param block_size: number of bytes decoded at a time
+    :param encoding: text encoding
+    :return: generator of decoded text blocks
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    view = memoryview(data)
+    for start in range(0, len(view), block_size):
+        yield decoder.decode(view[start : start + block_size])
+    yield decoder.decode(b"", final=True)
+
+
+def _pieces(data, token_budget):
+    """
+    Split decoded text into lines, lines longer than the budget are split further
+    :param data: content as bytes
+    :param token_budget: maximum tokens of a piece
+    :return: generator of (text, tokens)
+    """
+    remainder = ""
+    for block in iter_text(data):
+        lines = (remainder + block).splitlines(keepends=True)
+        remainder = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        for line in lines:
+            yield from _split_line(line, token_budget)
+    if remainder:
+        yield from _split_line(remainder, token_budget)
+
+
+def _split_line(line, token_budget):
+    """
+    Split a line that does not fit the token budget, e.g. minified code
+    :param line: text
+    :param token_budget: maximum tokens of a piece
+    :return: generator of (text, tokens)
+    """
+    tokens = count_tokens(line)
+    if tokens <= token_budget:
+        yield line, tokens
+        return
+    size = max(1, len(line) * token_budget // tokens)
+    for start in range(0, len(line), size):
+        piece = line[start : start + size]
+        yield piece, count_tokens(piece)
+
+
+def split_text(data, token_budget, max_chunks):
+    """
+    Decode content and split it into chunks of at most token_budget tokens
+    Decoding stops after max_chunks chunks, so huge files cost bounded time.
+
+    :param data: content as bytes
+    :param token_budget: maximum tokens per chunk
+    :param max_chunks: maximum number of chunks
+    :return: list of chunks, True if the content was truncated
+    """
+    chunks, chunk, tokens = [], [], 0
+    for piece, piece_tokens in _pieces(data, token_budget):
+        if chunk and tokens + piece_tokens > token_budget:
+            chunks.append("".join(chunk))
+            chunk, tokens = [], 0
+            if len(chunks) == max_chunks:
+                return chunks, True
+        chunk.append(piece)
+        tokens += piece_tokens
+    if chunk:
+        chunks.append("".join(chunk))
+    return chunks, False
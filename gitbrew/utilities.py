@@ -1,13 +1,16 @@
 import logging
+import os
 import re
 import subprocess
 import sys
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 
 from PyInquirer import prompt
-from rich.logging import RichHandler
-from tabulate import tabulate
 
+from .constants import IgnoredFiles
 from .exceptions import InvalidRepositoryException
 from .questions import Questions
 
@@ -24,6 +27,8 @@ def print_table(data, headers, print_format="fancy_grid", show_index=False):
     :param print_format: Format to print the table in
     :return: None
     """
+    from tabulate import tabulate  # deferred, slow to import
+
     if isinstance(data, (tuple, list)):
         print(
             tabulate(data, headers=headers, tablefmt=print_format, showindex=show_index)
@@ -86,6 +91,70 @@ def extract_repo(url):
         return f"{match[1]}/{match[2]}"
 
 
+def is_ignored(path):
+    """
+    Check whether a path or one of its directories should be ignored
+    while reading the contents of a repository
+
+    :param path: path relative to the repository root
+    :return: True if the path should be skipped
+    """
+    return any(
+        part.split(".")[-1] in IgnoredFiles.FILE_TYPES for part in path.split("/")
+    )
+
+
+def cache_dir(*parts):
+    """
+    Returns a directory inside the gitbrew cache, creating it if needed
+    The cache lives in $XDG_CACHE_HOME/gitbrew (~/.cache/gitbrew by default)
+
+    :param parts: path components inside the cache
+    :return: absolute path of the directory
+    """
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    path = os.path.join(base, "gitbrew", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    """
+    Tokenizer for a model
+    The result is cached, including failures, so a missing tokenizer
+    is not downloaded again for every call.
+
+    :param model: model name
+    :return: tiktoken Encoding, None if the tokenizer data is not available
+    """
+    import tiktoken  # deferred, slow to import
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # the tokenizer data could not be downloaded
+        return None
+
+
+def count_tokens(text, model="gpt-4"):
+    """
+    Count the tokens of a text for a model
+    Estimates 4 characters per token if the tokenizer is not available
+
+    :param text: text
+    :param model: model name
+    :return: number of tokens
+    """
+    if encoding := _get_encoding(model):
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+
 def setup_logger(save_logs=False, print_logs=False):
     """
     Setup logger for the application with rich handler
@@ -100,6 +169,8 @@ def setup_logger(save_logs=False, print_logs=False):
     logger.setLevel(logging.DEBUG)
 
     if print_logs:
+        from rich.logging import RichHandler  # deferred, slow to import
+
         rich_handler = RichHandler(show_time=True, show_path=True, markup=True)
         rich_handler.setFormatter(logging.Formatter("%(message)s"))
         logger.addHandler(rich_handler)
@@ -114,3 +185,30 @@ def setup_logger(save_logs=False, print_logs=False):
         logger.addHandler(file_handler)
 
     return logger
+
+
+class RateLimiter:
+    """
+    Thread-safe rate limiter that spaces calls evenly
+    Shared by workers that call the same API concurrently
+    """
+
+    def __init__(self, calls_per_minute=None):
+        """
+        :param calls_per_minute: maximum calls per minute, None for no limit
+        """
+        self.interval = 60 / calls_per_minute if calls_per_minute else 0
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+    def acquire(self):
+        """
+        Block until the next call is allowed
+        :return: None
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,303 @@
+"""
+Webhook server for automatic pull request reviews
+
+Receives GitHub `pull_request` webhook payloads over HTTP and reviews the
+pull requests in background workers with a single, long-lived reviewer,
+so clients and caches are created once instead of for every review.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+from urllib.error import HTTPError
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler that forwards webhook deliveries to the WebhookServer
+    """
+
+    def do_POST(self):
+        """
+        Handle a webhook delivery
+        :return: None
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        status, message = self.server.webhook.handle_event(
+            self.headers.get("X-GitHub-Event"),
+            self.headers.get("X-Hub-Signature-256"),
+            self.rfile.read(length),
+        )
+        self._respond(status, {"message": message})
+
+    def do_GET(self):
+        """
+        Health check with the number of queued pull requests
+        :return: None
+        """
+        self._respond(200, {"queued": self.server.webhook.queue.qsize()})
+
+    def _respond(self, status, content):
+        """
+        Send a JSON response
+        :param status: HTTP status code
+        :param content: JSON serializable content
+        :return: None
+        """
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Route the access log to the gitbrew logger
+        """
+        self.server.webhook.logger.debug(format % args)
+
+
+class WebhookServer:
+    """
+    Long-lived service that reviews pull requests as they are opened or updated
+    """
+
+    ACTIONS = {"opened", "reopened", "synchronize", "ready_for_review"}
+
+    def __init__(
+        self,
+        reviewer,
+        logger,
+        secret=None,
+        host="127.0.0.1",
+        port=8080,
+        workers=2,
+        post=True,
+    ):
+        """
+        Initialize the server
+
+        :param reviewer: PullRequestReviewer shared by all workers
+        :param logger: Logger
+        :param secret: webhook secret used to verify X-Hub-Signature-256,
+            required unless the server only listens on a loopback interface
+        :param host: interface to listen on
+        :param port: port to listen on, 0 picks a free port
+        :param workers: number of concurrent reviews
+        :param post: post the reviews to the pull requests
+        """
+        if not secret and not self.is_loopback(host):
+            raise ValueError(
+                f"A webhook secret is required to listen on {host or 'all interfaces'}"
+            )
+        self.reviewer = reviewer
+        self.logger = logger
+        self.secret = secret.encode() if secret else None
+        self.workers = workers
+        self.post = post
+        self.queue = queue.Queue()
+        self._pending = {}  # (repo, number): head sha, coalesces repeated pushes
+        self._pending_lock = threading.Lock()
+        self._repos = {}  # warm repository objects by name
+        self._threads = []
+        self.httpd = ThreadingHTTPServer((host, port), WebhookRequestHandler)
+        self.httpd.webhook = self
+
+    @staticmethod
+    def is_loopback(host):
+        """
+        Returns true if only local clients can reach the host
+        :param host: interface to listen on
+        :return: bool
+        """
+        if host == "localhost":
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:  # a hostname or "" for all interfaces
+            return False
+
+    @property
+    def address(self):
+        """
+        Address the server is listening on
+        :return: (host, port)
+        """
+        return self.httpd.server_address[:2]
+
+    def verify_signature(self, signature, body):
+        """
+        Verify the HMAC SHA-256 signature of a delivery
+        :param signature: value of the X-Hub-Signature-256 header
+        :param body: raw request body
+        :return: True if the signature is valid, or no secret is configured
+            for a server that only listens on a loopback interface
+        """
+        if not self.secret:
+            return True
+        expected = "sha256=" + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    def handle_event(self, event, signature, body):
+        """
+        Validate a webhook delivery and queue the pull request for review
+
+        :param event: value of the X-GitHub-Event header
+        :param signature: value of the X-Hub-Signature-256 header
+        :param body: raw request body
+        :return: HTTP status code, message
+        """
+        if not self.verify_signature(signature, body):
+            self.logger.error("Rejected webhook delivery with an invalid signature")
+            return 401, "invalid signature"
+        if event == "ping":
+            return 200, "pong"
+        if event != "pull_request":
+            return 202, f"ignored event: {event}"
+        try:
+            payload = json.loads(body)
+            action = payload["action"]
+            pull_request = payload["pull_request"]
+            repo_name = payload["repository"]["full_name"]
+        except (ValueError, KeyError) as e:
+            return 400, f"invalid payload: {e}"
+        if action not in self.ACTIONS or pull_request.get("draft"):
+            return 202, f"ignored action: {action}"
+        self.enqueue(repo_name, pull_request["number"], pull_request["head"]["sha"])
+        return 202, "queued"
+
+    def enqueue(self, repo_name, number, head_sha):
+        """
+        Queue a pull request for review
+        A pull request that is already waiting is not queued twice,
+        it is reviewed once at its latest head.
+
+        :param repo_name: repository string (acc/repo)
+        :param number: pull request number
+        :param head_sha: head commit of the pull request
+        :return: None
+        """
+        key = (repo_name, number)
+        with self._pending_lock:
+            queued = key in self._pending
+            self._pending[key] = head_sha
+        if not queued:
+            self.logger.info(f"Queued {repo_name}#{number} for review")
+            self.queue.put(key)
+
+    def _work(self):
+        """
+        Worker loop, reviews queued pull requests until it receives None
+        :return: None
+        """
+        while (key := self.queue.get()) is not None:
+            with self._pending_lock:
+                head_sha = self._pending.pop(key, None)
+            try:
+                self.review(*key, head_sha)
+            except Exception as e:
+                self.logger.error(f"Error reviewing {key[0]}#{key[1]}: {e}")
+            finally:
+                self.queue.task_done()
+        self.queue.task_done()
+
+    def _get_repo(self, repo_name):
+        """
+        Repository object, cached across reviews
+        :param repo_name: repository string (acc/repo)
+        :return: Repository object
+        """
+        if repo_name not in self._repos:
+            self._repos[repo_name] = self.reviewer.git_helper.github.get_repo(repo_name)
+        return self._repos[repo_name]
+
+    def review(self, repo_name, number, head_sha=None):
+        """
+        Review a pull request and post the reviews
+
+        :param repo_name: repository string (acc/repo)
+        :param number: pull request number
+        :param head_sha: head commit from the webhook payload
+        :return: list of reviewed filenames
+        """
+        pr = self._get_repo(repo_name).get_pull(number)
+        self.logger.info(f"Reviewing {repo_name}#{number} at {head_sha or pr.head.sha}")
+        if self.post:  # reviews land on the pull request as they are generated
+            reviewed, skipped = self.reviewer.review_and_post(pr)
+        else:
+            reviews, skipped = self.reviewer.review_files(pr)
+            reviewed = list(reviews)
+        self.logger.info(
+            f"Reviewed {repo_name}#{number}: {len(reviewed)} file(s) reviewed, "
+            f"{len(skipped)} skipped"
+        )
+        return reviewed
+
+    def start(self):
+        """
+        Start the review workers and serve HTTP requests in a background thread
+        :return: None
+        """
+        for _ in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, daemon=True))
+        self._threads.append(
+            threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        )
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(f"Listening for webhooks on {self.address}")
+
+    def serve_forever(self):
+        """
+        Start the server and block until interrupted
+        :return: None
+        """
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            print("\nExiting...")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Stop serving and wait for the queued reviews to finish
+        :return: None
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for _ in range(self.workers):
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def replay(url, payload, event="pull_request", secret=None):
+    """
+    Post a recorded webhook payload to a running server
+    Stands in for GitHub when testing the server locally
+
+    :param url: webhook endpoint
+    :param payload: payload as a dict or raw bytes
+    :param event: value of the X-GitHub-Event header
+    :param secret: webhook secret used to sign the payload
+    :return: HTTP status code, response content
+    """
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json", "X-GitHub-Event": event}
+    if secret:
+        digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        headers["X-Hub-Signature-256"] = f"sha256={digest}"
+    _request = urllib_request.Request(url, data=body, headers=headers, method="POST")
+    try:
+        with urllib_request.urlopen(_request) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
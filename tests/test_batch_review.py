@@ -0,0 +1,52 @@
+import logging
+from types import SimpleNamespace
+
+from gitbrew.batch_review import BatchReviewer
+from gitbrew.questions import Questions
+
+
+class FakeReviewer:
+    """
+    Stands in for PullRequestReviewer, records the limiter of every review
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.rate_limiter = None
+        self.limiters = []
+
+    def review_files(self, pr, rate_limiter=None):
+        self.limiters.append(rate_limiter)
+        return {"app.py": ["Looks good."]}, {}
+
+
+def _pull_request(number):
+    return SimpleNamespace(
+        number=number,
+        title=f"PR {number}",
+        html_url=f"https://github.com/octocat/hello-world/pull/{number}",
+        user=SimpleNamespace(login="octocat"),
+    )
+
+
+def test_limiter_is_passed_per_run():
+    """
+    The batch limit applies to the reviews of the batch only, the shared
+    reviewer keeps its own limiter
+    """
+    reviewer = FakeReviewer()
+    batch_reviewer = BatchReviewer(reviewer, workers=2, calls_per_minute=30)
+    report = batch_reviewer.run([_pull_request(2), _pull_request(1)])
+    assert [entry["number"] for entry in report] == [1, 2]
+    assert reviewer.rate_limiter is None
+    assert reviewer.limiters == [batch_reviewer.rate_limiter] * 2
+
+
+def test_since_answer_is_validated():
+    """
+    The interactive menu asks again for dates that cannot be parsed
+    """
+    (question,) = [q for q in Questions.BATCH_REVIEW_QUESTIONS if q["name"] == "since"]
+    assert question["validate"]("") is True
+    assert question["validate"]("2024-05-01") is True
+    assert isinstance(question["validate"]("last week"), str)
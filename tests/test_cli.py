@@ -0,0 +1,227 @@
+import json
+import logging
+import sys
+import types
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from gitbrew import cli
+from gitbrew.batch_review import BatchReviewer
+from gitbrew.pull_requests import PullRequestReviewer
+
+
+def test_since_is_parsed_by_argparse(capsys):
+    """
+    Invalid dates are rejected before any client is built
+    """
+    args = cli.build_parser().parse_args(["review-all", "a/b", "--since", "2024-05-01"])
+    assert args.since == datetime(2024, 5, 1)
+    with pytest.raises(SystemExit) as error:
+        cli.build_parser().parse_args(["review-all", "a/b", "--since", "garbage"])
+    assert error.value.code == 2
+    assert "invalid date: garbage" in capsys.readouterr().err
+
+
+class FakeGitHelper:
+    def set_repo(self, repo):
+        if repo == "missing/repo":
+            raise RuntimeError("404 Not Found")
+
+
+class FakeBatchReviewer(BatchReviewer):
+    """
+    Reviews one pull request per repository without GitHub or an LLM
+    """
+
+    def select(self, labels=(), author=None, since=None):
+        return ["pr"]
+
+    def run(self, pull_requests):
+        return [{"number": 1, "error": None}]
+
+
+def test_review_all_reports_failed_repositories(tmp_path, monkeypatch):
+    """
+    A repository that fails is recorded in the report, the others are still
+    reviewed and the exit code is 1
+    """
+    report = tmp_path / "report.json"
+    args = cli.build_parser().parse_args(
+        ["review-all", "a/b", "missing/repo", "c/d", "--report", str(report)]
+    )
+    monkeypatch.setattr(
+        cli,
+        "PullRequestReviewer",
+        lambda logger, diff_source=None: SimpleNamespace(git_helper=FakeGitHelper()),
+    )
+    monkeypatch.setattr(cli, "BatchReviewer", FakeBatchReviewer)
+    assert args.handler(args, logging.getLogger()) == 1
+    assert json.loads(report.read_text()) == [
+        {"number": 1, "error": None, "repo": "a/b"},
+        {"repo": "missing/repo", "number": None, "error": "404 Not Found"},
+        {"number": 1, "error": None, "repo": "c/d"},
+    ]
+
+
+class FakeReviewer:
+    """
+    Stands in for PullRequestReviewer, prints like the real handlers do
+    """
+
+    DIFF_SOURCES = PullRequestReviewer.DIFF_SOURCES
+
+    def __init__(self, logger, diff_source=None):
+        self.rate_limiter = None
+        self.git_helper = SimpleNamespace(
+            github=SimpleNamespace(get_repo=self.get_repo)
+        )
+
+    @staticmethod
+    def get_repo(name):
+        def get_pull(number):
+            if number == 404:
+                raise RuntimeError("Not Found")
+            return SimpleNamespace(html_url=f"https://github.com/{name}/pull/{number}")
+
+        return SimpleNamespace(get_pull=get_pull)
+
+    def review_files(self, pr):
+        print(f"Reviewing {pr.html_url}")
+        return {"app.py": ["Looks", "good."]}, {"logo.png": "binary file"}
+
+
+def _run(argv):
+    args = cli.build_parser().parse_args(argv)
+    return args.handler(args, logging.getLogger())
+
+
+def test_review_prints_json_to_stdout(monkeypatch, capsys):
+    """
+    Results are printed as JSON in input order, what the handlers print goes
+    to stderr, and a failed target gives exit code 1
+    """
+    monkeypatch.setattr(cli, "PullRequestReviewer", FakeReviewer)
+    code = _run(["review", "octo/app#1", "octo/app#404", "not a pull request"])
+    captured = capsys.readouterr()
+    assert code == 1
+    assert json.loads(captured.out) == [
+        {
+            "target": "octo/app#1",
+            "result": {
+                "url": "https://github.com/octo/app/pull/1",
+                "reviews": {"app.py": "Looks\ngood."},
+                "skipped": {"logo.png": "binary file"},
+            },
+            "error": None,
+        },
+        {"target": "octo/app#404", "result": None, "error": "Not Found"},
+        {
+            "target": "not a pull request",
+            "result": None,
+            "error": "Invalid pull request: not a pull request",
+        },
+    ]
+    assert "Reviewing https://github.com/octo/app/pull/1" in captured.err
+
+
+def test_output_file_leaves_stdout_empty(monkeypatch, capsys, tmp_path):
+    """
+    With --output the results are written to the file and exit code 0 means
+    every target succeeded
+    """
+    monkeypatch.setattr(cli, "PullRequestReviewer", FakeReviewer)
+    output = tmp_path / "reviews.json"
+    assert _run(["review", "octo/app#1", "--output", str(output)]) == 0
+    assert capsys.readouterr().out == ""
+    assert [entry["target"] for entry in json.loads(output.read_text())] == [
+        "octo/app#1"
+    ]
+
+
+class FakeIssueManager:
+    """
+    Stands in for IssueManager, which needs Pinecone and the embedding models
+    """
+
+    def __init__(self, logger):
+        self.git_helper = SimpleNamespace(set_repo=self.set_repo)
+
+    def set_repo(self, repo):
+        if repo == "missing/repo":
+            raise RuntimeError("404 Not Found")
+        self.repo = repo
+
+    def find_duplicate_issues(self, threshold):
+        print("Embedding issues")
+        return [{"issues": [1, 2], "similarity": threshold}]
+
+    def find_similar_issues(self, title, body, top):
+        return [{"number": 3, "title": title, "top": top}]
+
+
+@pytest.fixture
+def issue_manager(monkeypatch):
+    module = types.ModuleType("gitbrew.issue_manager")
+    module.IssueManager = FakeIssueManager
+    monkeypatch.setitem(sys.modules, "gitbrew.issue_manager", module)
+
+
+def test_issue_subcommands(issue_manager, capsys):
+    """
+    issues-dedupe and issues-similar print one entry per repository,
+    a repository that fails is recorded and gives exit code 1
+    """
+    assert _run(["issues-dedupe", "octo/app", "--threshold", "0.9"]) == 0
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == [
+        {
+            "target": "octo/app",
+            "result": [{"issues": [1, 2], "similarity": 0.9}],
+            "error": None,
+        }
+    ]
+    assert "Embedding issues" in captured.err
+    code = _run(["issues-similar", "octo/app", "missing/repo", "--title", "Crash"])
+    assert code == 1
+    results = json.loads(capsys.readouterr().out)
+    assert results[0]["result"] == [{"number": 3, "title": "Crash", "top": 10}]
+    assert results[1] == {
+        "target": "missing/repo",
+        "result": None,
+        "error": "404 Not Found",
+    }
+
+
+class FakeReadmeGenerator:
+    """
+    Stands in for ReadmeGenerator, writes a fixed readme
+    """
+
+    def __init__(self, logger):
+        self.failed, self.over_budget = {}, []
+        self.readme_updater = SimpleNamespace(update=lambda repo_url, file: False)
+
+    def write_readme(self, repo_url, file_name, token_budget, time_budget):
+        with open(file_name, "w") as file:
+            file.write(f"# {repo_url}\n")
+
+
+def test_readme_files_are_named_after_the_repository(monkeypatch, capsys, tmp_path):
+    """
+    Readmes of GitHub urls are named user_repo.md, those of local checkouts
+    after the checkout directory
+    """
+    monkeypatch.setattr("gitbrew.generate_readme.ReadmeGenerator", FakeReadmeGenerator)
+    checkout = tmp_path / "my-checkout"
+    checkout.mkdir()
+    output_dir = tmp_path / "readmes"
+    url = "https://github.com/octo/hello-world"
+    assert _run(["readme", url, str(checkout), "--output-dir", str(output_dir)]) == 0
+    files = [entry["result"]["file"] for entry in json.loads(capsys.readouterr().out)]
+    assert files == [
+        str(output_dir / "octo_hello_world.md"),
+        str(output_dir / "my-checkout.md"),
+    ]
+    assert (output_dir / "octo_hello_world.md").read_text() == f"# {url}\n"
@@ -0,0 +1,67 @@
+import logging
+import os
+import threading
+import time
+
+from gitbrew import daemon
+
+
+def test_subcommands_are_forwarded_to_the_daemon(tmp_path, capsys):
+    """
+    A running daemon runs forwarded subcommands, streams their output and
+    exit code back and stops on request; without it nothing is forwarded
+    """
+    path = str(tmp_path / "daemon.sock")
+    assert daemon.forward(["review", "--help"], path) is None
+    server = daemon.Daemon(logging.getLogger(), path, warm_modules=())
+    thread = threading.Thread(target=server.serve)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not daemon.request({"ping": True}, path):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        cwd = os.getcwd()
+
+        assert daemon.forward(["review", "--help"], path) == 0
+        assert "pull_requests" in capsys.readouterr().out
+        assert daemon.forward(["review"], path) == 2  # missing arguments
+        assert "usage" in capsys.readouterr().err
+        assert daemon.forward(["serve"], path) is None  # long running, not forwarded
+        assert os.getcwd() == cwd
+    finally:
+        daemon.request({"stop": True}, path)
+        thread.join(10)
+    assert not thread.is_alive()
+    assert not os.path.exists(path)
+
+
+def test_client_settings_are_sent_and_applied(tmp_path, monkeypatch):
+    """
+    The client sends its environment and .env, the daemon applies them while
+    the request runs and restores its own settings afterwards
+    """
+    (tmp_path / ".env").write_text(
+        "OPENAI_API_KEY=from-dotenv\nGITHUB_TOKEN=from-dotenv\nOTHER=ignored\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GITHUB_TOKEN", "client-token")
+    monkeypatch.setenv("GITBREW_DIFF_SOURCE", "local")
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+    environment = daemon.client_environment()
+    assert environment["GITHUB_TOKEN"] == "client-token"
+    assert environment["OPENAI_API_KEY"] == "from-dotenv"
+    assert environment["GITBREW_DIFF_SOURCE"] == "local"
+    assert environment["PINECONE_API_KEY"] is None
+    assert "OTHER" not in environment
+
+    monkeypatch.setenv("GITHUB_TOKEN", "daemon-token")
+    monkeypatch.setenv("PINECONE_API_KEY", "daemon-key")
+    monkeypatch.setenv("GITBREW_README_SOURCE", "tree")
+    with daemon._environment(environment):
+        assert os.environ["GITHUB_TOKEN"] == "client-token"
+        assert "PINECONE_API_KEY" not in os.environ
+        assert "GITBREW_README_SOURCE" not in os.environ
+    assert os.environ["GITHUB_TOKEN"] == "daemon-token"
+    assert os.environ["PINECONE_API_KEY"] == "daemon-key"
+    assert os.environ["GITBREW_README_SOURCE"] == "tree"
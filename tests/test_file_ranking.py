@@ -0,0 +1,57 @@
+import logging
+
+from gitbrew.file_ranking import FileRanker
+from gitbrew.repo_file import RepoFile
+
+
+def _file(path, content):
+    return RepoFile(path, content=content.encode())
+
+
+def test_import_counts_python_and_js():
+    """
+    Absolute, relative and JavaScript relative imports are resolved to files
+    """
+    files = [
+        _file("src/pkg/__init__.py", "from .core import run\n"),
+        _file("src/pkg/core.py", "import os\nfrom pkg.util import helper\n"),
+        _file("src/pkg/util.py", "def helper(): pass\n"),
+        _file("src/pkg/cli.py", "from . import core\nfrom .util import helper\n"),
+        _file(
+            "web/app.js", "import { a } from './lib';\nconst b = require('./lib');\n"
+        ),
+        _file("web/lib/index.js", "export const a = 1;\n"),
+    ]
+    counts = FileRanker(logging.getLogger()).import_counts(files)
+    assert counts["src/pkg/util.py"] == 2
+    assert counts["src/pkg/core.py"] == 1
+    assert counts["web/lib/index.js"] == 1
+    assert counts["web/app.js"] == 0
+
+
+def test_rank_prefers_manifests_and_entry_points():
+    """
+    Manifests and entry points come first, tests and deep modules last
+    """
+    body = "x = 1\n" * 50
+    files = [
+        _file("tests/test_core.py", body),
+        _file("pkg/deep/nested/module.py", body),
+        _file("pyproject.toml", body),
+        _file("pkg/__main__.py", body),
+    ]
+    ranked = [file.path for file in FileRanker(logging.getLogger()).rank(files)]
+    assert ranked[:2] == ["pyproject.toml", "pkg/__main__.py"]
+    assert ranked[-1] == "tests/test_core.py"
+
+
+def test_remote_files_are_not_read():
+    """
+    Files that need a network request are ranked without reading them
+    """
+
+    def fail():
+        raise AssertionError("remote file was read")
+
+    files = [RepoFile("pkg/core.py", sha="0" * 40, size=10, loader=fail, local=False)]
+    assert FileRanker(logging.getLogger()).rank(files) == files
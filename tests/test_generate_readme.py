@@ -0,0 +1,160 @@
+import logging
+import time
+
+import pytest
+
+from gitbrew.exceptions import IncompleteAnswerException
+from gitbrew.generate_readme import ReadmeGenerator
+from gitbrew.llms.openai import OpenAI
+from gitbrew.repo_file import RepoFile
+
+
+def _stream(pieces, error=None):
+    """
+    Stands in for OpenAI.stream_llm, yields the pieces then raises the error
+    """
+    yield from pieces
+    if error:
+        raise error
+
+
+def test_complete_stream_replaces_the_readme(tmp_path):
+    """
+    A finished readme replaces the existing file and leaves no partial file
+    Unit test: _write_readme
+    """
+    readme = tmp_path / "README.md"
+    readme.write_text("old")
+    ReadmeGenerator._write_readme(str(readme), _stream(["# Tool\n", "## Usage\nrun"]))
+    assert readme.read_text() == "# Tool\n## Usage\nrun\n"
+    assert not (tmp_path / "README.md.partial").exists()
+
+
+def test_failed_stream_keeps_the_readme(tmp_path):
+    """
+    A stream that fails midway does not replace the existing readme,
+    the completed sections are kept in the partial file
+    Unit test: _write_readme
+    """
+    readme = tmp_path / "README.md"
+    readme.write_text("old")
+    stream = _stream(["# Tool\nintro\n", "## Usage\n", "ru"], RuntimeError("lost"))
+    with pytest.raises(RuntimeError):
+        ReadmeGenerator._write_readme(str(readme), stream)
+    assert readme.read_text() == "old"
+    assert (tmp_path / "README.md.partial").read_text().startswith("# Tool\nintro\n")
+
+
+def test_truncated_answer_is_an_error(monkeypatch):
+    """
+    An answer cut by the token limit raises instead of ending the stream
+    Unit test: stream_llm
+    """
+    chunks = [
+        {"choices": [{"delta": {"content": "# Tool"}, "finish_reason": None}]},
+        {"choices": [{"delta": {}, "finish_reason": "length"}]},
+    ]
+
+    class Chunk:
+        def __init__(self, chunk):
+            self.choices = chunk["choices"]
+
+    monkeypatch.setattr(
+        "openai.ChatCompletion.create", lambda **kwargs: map(Chunk, chunks)
+    )
+    stream = OpenAI("key").stream_llm([])
+    assert next(stream) == "# Tool"
+    with pytest.raises(IncompleteAnswerException):
+        next(stream)
+
+
+def test_ranked_archive_source_lists_the_tree(monkeypatch):
+    """
+    With a budget, the archive is not downloaded: the tree is ranked on path
+    and size and only the selected files are read
+    Unit test: get_files
+    """
+    generator = ReadmeGenerator(logging.getLogger(), content_source="archive")
+    calls = []
+    monkeypatch.setattr(generator.git_helper, "set_repo", lambda name: None)
+    monkeypatch.setattr(generator.git_helper, "get_repo", lambda: "repo")
+    monkeypatch.setattr(generator.git_helper, "get_head_sha", lambda repo: "0" * 40)
+    monkeypatch.setattr(
+        generator.git_helper,
+        "get_archive_content",
+        lambda repo, sha, include: calls.append("archive") or [],
+    )
+    monkeypatch.setattr(
+        generator.git_helper,
+        "get_content",
+        lambda repo, sha: calls.append("tree") or [],
+    )
+    url = "https://github.com/owner/name"
+    generator.get_files(url)
+    generator.get_files(url, ranked=True)
+    assert calls == ["archive", "tree"]
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """
+    ReadmeGenerator with a cache in a temporary directory and a summary
+    that fails for the files named in `generator.failing`
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    generator = ReadmeGenerator(logging.getLogger(), workers=4)
+    generator.failing = {"fails.py": RuntimeError("rate limited"), "empty.py": None}
+
+    def summarize(file):
+        time.sleep(0.05 if file.path.startswith("slow") else 0)
+        if file.path in generator.failing:
+            if error := generator.failing[file.path]:
+                raise error
+            return None
+        return f"summary of {file.path}"
+
+    monkeypatch.setattr(generator, "_summarize_file", summarize)
+    return generator
+
+
+def test_summaries_keep_the_file_order(generator):
+    """
+    Summaries finish out of order but are returned in the order of the files,
+    failed files are recorded and left out
+    Unit test: summarize_files
+    """
+    paths = ["slow.py", "fails.py", "b.py", "empty.py", "slow2.py", "a.py"]
+    summaries = generator.summarize_files(
+        RepoFile(path, content=b"x") for path in paths
+    )
+    assert list(summaries) == ["slow.py", "b.py", "slow2.py", "a.py"]
+    assert generator.failed == {"fails.py": "rate limited", "empty.py": "empty summary"}
+
+
+def test_token_budget_keeps_the_most_important_files(generator):
+    """
+    With a token budget, files are summarized in rank order while they fit,
+    smaller files further down still fill the budget
+    Unit test: summarize_files
+    """
+    files = [
+        RepoFile("tests/test_large.py", size=4000, local=False),
+        RepoFile("pkg/deep/module.py", size=400, local=False),
+        RepoFile("setup.py", size=400, local=False),
+        RepoFile("pkg/big.py", size=40000, local=False),
+    ]
+    summaries = generator.summarize_files(files, token_budget=700)
+    assert list(summaries) == ["setup.py", "pkg/deep/module.py"]
+    assert generator.over_budget == ["pkg/big.py", "tests/test_large.py"]
+
+
+def test_time_budget_stops_starting_files(generator):
+    """
+    No file is started once the time budget is spent
+    Unit test: summarize_files
+    """
+    generator.workers = 1
+    files = [RepoFile(f"slow{i}.py", size=400, local=False) for i in range(20)]
+    summaries = generator.summarize_files(files, time_budget=0.1)
+    assert 0 < len(summaries) < len(files)
+    assert len(summaries) + len(generator.over_budget) == len(files)
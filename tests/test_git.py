@@ -1,7 +1,12 @@
+import sys
+import threading
+
 import pytest
 
 from gitbrew.command_handler import CommandHandler
+from gitbrew.constants import ConversationLimits, OutputLimits
 from gitbrew.exceptions import InvalidAnswerFormatException
+from gitbrew.intent_cache import IntentCache
 
 
 @pytest.fixture
@@ -115,3 +120,136 @@ def test_clarification(command_handler):
         Are you asking for the URL or name of the remote repository in your git project? 
         </CLARIFY>"""
     command_handler.handle(user_input)
+
+
+def test_clarification_rounds_are_bounded(command_handler, monkeypatch):
+    """
+    An LLM that keeps asking for clarification does not recurse forever,
+    the handler gives up after a bounded number of rounds
+    Unit test: _get_clarification
+    """
+    clarify = "<CLARIFY>Which branch?</CLARIFY>"
+    asked = []
+    monkeypatch.setattr(
+        "gitbrew.command_handler.prompt",
+        lambda question: asked.append(question) or {"clarification": "main"},
+    )
+    monkeypatch.setattr(command_handler.openai_client, "ask_llm", lambda _: clarify)
+    assert command_handler._get_clarification(clarify, "delete the branch") == []
+    assert len(asked) == ConversationLimits.MAX_CLARIFICATIONS
+
+
+def test_command_output_is_streamed_with_a_bounded_tail(command_handler, capfd):
+    """
+    Output of a command is printed as it is produced
+    and only the last lines are kept for the logs
+    Unit test: _run_command
+    """
+    lines = OutputLimits.LOG_TAIL_LINES * 5
+    script = f"for i in range({lines}): print(i)\nraise SystemExit(3)"
+    return_code, tail = command_handler._run_command([sys.executable, "-c", script])
+    assert return_code == 3
+    assert tail.splitlines() == [
+        str(i) for i in range(lines - OutputLimits.LOG_TAIL_LINES, lines)
+    ]
+    assert capfd.readouterr().out.splitlines() == [str(i) for i in range(lines)]
+
+
+def test_explanations_are_prefetched_and_cancelled(command_handler, monkeypatch):
+    """
+    Explanations of the commands to confirm are requested before the user
+    asks for them, and the ones not started when the user answers are cancelled
+    Unit test: _prefetch_explanations, get_user_confirmation
+    """
+    started, release = threading.Event(), threading.Event()
+    asked = []
+
+    def ask_llm(message):
+        asked.append(message)
+        started.set()
+        release.wait(5)
+        return "explanation"
+
+    answers = iter(["No", "Explain", "Yes"])
+    monkeypatch.setattr(command_handler.openai_client, "ask_llm", ask_llm)
+    monkeypatch.setattr(
+        "gitbrew.command_handler.prompt",
+        lambda question: {"confirmation": next(answers)},
+    )
+    # refused while the first explanation is in flight, the second never starts
+    command_handler._execute_commands(["git reset --hard", "git push --force"])
+    assert started.wait(5)
+    release.set()
+    command_handler.explainer.submit(lambda: None).result()
+    assert len(asked) == 1
+    assert command_handler.explanations == {}
+
+    # "Explain" uses the prefetched explanation
+    command_handler._prefetch_explanations(["git status", "git reset --hard"])
+    assert list(command_handler.explanations) == ["git reset --hard"]
+    command_handler.explanations["git reset --hard"].result()
+    assert command_handler.get_user_confirmation("git reset --hard")
+    assert len(asked) == 2
+
+
+def test_only_accepted_answers_are_cached(command_handler, monkeypatch, tmp_path):
+    """
+    An answer the user rejects is not cached, and a cached answer is confirmed
+    even if its commands are whitelisted
+    Unit test: handle
+    """
+    command_handler.intent_cache = IntentCache(
+        command_handler.logger, path=str(tmp_path / "intents.json")
+    )
+    monkeypatch.setattr(command_handler.repo_context, "scope", lambda: "/repo")
+    monkeypatch.setattr(command_handler.intent_parser, "parse", lambda _: None)
+    monkeypatch.setattr(
+        command_handler.openai_client,
+        "ask_llm",
+        lambda _: "<START>git push --force<END>",
+    )
+    executed = []
+    monkeypatch.setattr(
+        command_handler,
+        "_run_command",
+        lambda command: executed.append(command) or (0, ""),
+    )
+    answers = []
+    monkeypatch.setattr(
+        "gitbrew.command_handler.prompt",
+        lambda question: {"confirmation": answers.pop(0)},
+    )
+    intent = "force push my branch"
+
+    answers.append("No")
+    command_handler.handle(intent)
+    assert command_handler.intent_cache.get(intent, "/repo") is None
+
+    answers.append("Yes")
+    command_handler.handle(intent)
+    assert command_handler.intent_cache.get(intent, "/repo")
+    assert len(executed) == 1
+
+    command_handler.intent_cache.set(
+        "list the remotes", "/repo", "<START>git remote -v<END>"
+    )
+    answers.append("No")  # "remote" is whitelisted, but the answer is cached
+    command_handler.handle("list the remotes")
+    assert answers == []
+    assert len(executed) == 1
+
+
+def test_only_read_only_commands_are_paged(command_handler, monkeypatch):
+    """
+    Commands that may prompt or open an editor never start the pager,
+    read-only commands do
+    Unit test: _run_command
+    """
+    paged = []
+    monkeypatch.setattr(command_handler, "_open_pager", lambda: paged.append(1))
+    return_code, _ = command_handler._run_command(["git", "config", "--list"])
+    assert return_code == 0
+    assert paged == []
+    return_code, tail = command_handler._run_command(["git", "--version"])
+    assert return_code == 0 and "git version" in tail
+    assert paged == [1]
@@ -0,0 +1,61 @@
+import logging
+from types import SimpleNamespace
+
+from gitbrew.gitpy import GitPy
+
+
+def _element(path, type="blob", sha=None):
+    return SimpleNamespace(path=path, type=type, sha=sha or path, size=10)
+
+
+class FakeRepo:
+    """
+    Repository whose recursive listings of the root and of docs/ are
+    truncated, like GitHub does for very large trees
+    """
+
+    default_branch = "main"
+    recursive = {
+        "src": [
+            _element("pkg", "tree"),
+            _element("pkg/__init__.py"),
+            _element("pkg/core.py"),
+        ],
+        "img": [_element("logo.png"), _element("diagram.md")],
+    }
+    flat = {
+        "main": [
+            _element("setup.py"),
+            _element("src", "tree"),
+            _element(".github", "tree"),
+            _element("docs", "tree"),
+        ],
+        "docs": [_element("index.md"), _element("img", "tree")],
+    }
+
+    def __init__(self):
+        self.listed = []
+
+    def get_git_tree(self, sha, recursive=False):
+        self.listed.append(sha)
+        if recursive and sha in self.recursive:
+            return SimpleNamespace(tree=self.recursive[sha], truncated=False)
+        return SimpleNamespace(tree=self.flat[sha], truncated=recursive)
+
+
+def test_truncated_tree_is_listed_by_subtree():
+    """
+    A truncated recursive listing is replaced by a listing of each subtree,
+    ignored directories are not listed
+    Unit test: _list_tree
+    """
+    repo = FakeRepo()
+    files = GitPy(None, logger=logging.getLogger()).get_content(repo)
+    assert {file.path for file in files} == {
+        "setup.py",
+        "src/pkg/__init__.py",
+        "src/pkg/core.py",
+        "docs/index.md",
+        "docs/img/diagram.md",
+    }
+    assert ".github" not in repo.listed
@@ -0,0 +1,89 @@
+import logging
+
+from gitbrew.intent_cache import IntentCache
+
+ANSWER = "<START>git log -5<END>"
+
+
+def test_similar_intents_hit_in_scope(tmp_path):
+    """
+    Rephrased intents are answered from the cache, in the same repository only,
+    and the cache survives a restart
+    """
+    path = tmp_path / "intents.json"
+    cache = IntentCache(logging.getLogger(), path=str(path))
+    cache.set("show me recent changes", "/repo", ANSWER)
+    assert cache.get("Show me the recent changes.", "/repo") == ANSWER
+    assert cache.get("show me recent changes", "/other") is None
+    assert IntentCache(logging.getLogger(), path=str(path)).get(
+        "please show recent changes", "/repo"
+    )
+
+
+def test_specific_tokens_must_match(tmp_path):
+    """
+    Branch names, messages and negations are never answered from another intent
+    """
+    cache = IntentCache(logging.getLogger(), path=str(tmp_path / "intents.json"))
+    cache.set("switch to branch login", "/repo", "<START>git checkout login<END>")
+    cache.set("commit with message 'Fix UI'", "/repo", "<START>git commit<END>")
+    assert cache.get("switch to the branch login", "/repo")
+    assert cache.get("switch to branch logout", "/repo") is None
+    assert cache.get("commit with message 'fix ui'", "/repo") is None
+    assert cache.get("do not switch to branch login", "/repo") is None
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    """
+    Entries beyond max_entries are evicted, hits count as a use
+    """
+    cache = IntentCache(
+        logging.getLogger(), path=str(tmp_path / "intents.json"), max_entries=2
+    )
+    cache.set("show status", "/repo", "<START>git status<END>")
+    cache.set("show log", "/repo", ANSWER)
+    assert cache.get("show status", "/repo")
+    cache.set("show tags", "/repo", "<START>git tag<END>")
+    assert cache.get("show status", "/repo")
+    assert cache.get("show log", "/repo") is None
+
+
+def test_actions_and_targets_must_match(tmp_path):
+    """
+    Intents that differ in what they do or what they act on are never
+    answered from each other, however similar the rest of the sentence
+    """
+    cache = IntentCache(logging.getLogger(), path=str(tmp_path / "intents.json"))
+    cache.set(
+        "delete the remote that is called origin in this repository",
+        "/repo",
+        "<START>git remote remove origin<END>",
+    )
+    cache.set(
+        "push all my local commits on the current branch to the remote repository",
+        "/repo",
+        "<START>git push<END>",
+    )
+    cache.set(
+        "delete all the local branches that have already been merged into main",
+        "/repo",
+        "<START>git branch --merged main<END>",
+    )
+    assert (
+        cache.get("show the remote that is called origin in this repository", "/repo")
+        is None
+    )
+    assert (
+        cache.get(
+            "pull all my local commits on the current branch to the remote repository",
+            "/repo",
+        )
+        is None
+    )
+    assert (
+        cache.get(
+            "delete all the remote branches that have already been merged into main",
+            "/repo",
+        )
+        is None
+    )
@@ -0,0 +1,48 @@
+import logging
+
+import pytest
+
+from gitbrew.intent_parser import IntentParser
+
+
+@pytest.fixture
+def intent_parser():
+    return IntentParser(logging.getLogger())
+
+
+@pytest.mark.parametrize(
+    "intent, answer",
+    [
+        ("git status", "<START>git status<END>"),
+        ("what's changed?", "<START>git status<END>"),
+        ("show me the last 5 commits", "<START>git log --oneline -n 5<END>"),
+        ("show last commit", "<START>git show HEAD<END>"),
+        ("show staged changes", "<START>git diff --staged<END>"),
+        ("what branch am I on", "<START>git branch --show-current<END>"),
+        ("push my current branch", "<START>git push origin HEAD<END>"),
+    ],
+)
+def test_common_intents(intent_parser, intent, answer):
+    """
+    Common intents are answered in the format of the LLM
+    """
+    assert intent_parser.parse(intent) == answer
+
+
+@pytest.mark.parametrize(
+    "intent",
+    [
+        "push the branch feature-x",
+        'commit with message "Fix the UI"',
+        "show the diff and push",
+        "rebase onto main",
+        "push to upstream",
+        "fetch from upstream",
+        "pull from origin",
+    ],
+)
+def test_unsure_intents_fall_through(intent_parser, intent):
+    """
+    Intents with details the rules do not explain are left to the LLM
+    """
+    assert intent_parser.parse(intent) is None
@@ -0,0 +1,71 @@
+import logging
+import os
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from gitbrew.local_diff import LocalDiffSource
+
+
+def _git(path, *args):
+    return subprocess.run(
+        ["git", "-C", str(path), *args], check=True, stdout=subprocess.PIPE
+    ).stdout.decode()
+
+
+@pytest.fixture
+def pull_request(tmp_path):
+    """
+    Repository whose head renames, adds a binary, changes a mode and edits
+    files around them, as a pull request of its base and head commits
+    """
+    _git(tmp_path, "init", "--quiet")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    _git(tmp_path, "config", "user.name", "test")
+    _git(tmp_path, "config", "core.fileMode", "true")
+    files = {
+        "a.py": "print('a')\n",
+        "old_name.py": "".join(f"line = {i}\n" for i in range(20)),
+        "run.sh": "echo run\n",
+        "z.py": "print('z')\n",
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "-m", "base")
+    base = _git(tmp_path, "rev-parse", "HEAD").strip()
+    (tmp_path / "a.py").write_text("print('a changed')\n")
+    _git(tmp_path, "mv", "old_name.py", "new_name.py")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0binary")
+    os.chmod(tmp_path / "run.sh", 0o755)
+    (tmp_path / "z.py").write_text("print('z changed')\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "-m", "head")
+    head = _git(tmp_path, "rev-parse", "HEAD").strip()
+    return SimpleNamespace(
+        number=1,
+        path=str(tmp_path / ".git"),
+        base=SimpleNamespace(sha=base),
+        head=SimpleNamespace(sha=head),
+    )
+
+
+def test_patches_stay_aligned_with_files(monkeypatch, pull_request):
+    """
+    Renames, binary files and mode changes without a hunk keep an entry,
+    so every file gets its own patch
+    Unit test: get_files, _split_patches
+    """
+    source = LocalDiffSource(None, logging.getLogger())
+    monkeypatch.setattr(source, "fetch", lambda pr: pr.path)
+    files = {file.filename: file for file in source.get_files(pull_request)}
+    assert list(files) == ["a.py", "image.png", "new_name.py", "run.sh", "z.py"]
+    assert "a changed" in files["a.py"].patch
+    assert files["image.png"].patch is None
+    assert files["new_name.py"].status == "renamed"
+    assert files["new_name.py"].previous_filename == "old_name.py"
+    assert files["new_name.py"].patch == ""
+    assert files["run.sh"].patch == ""
+    assert "z changed" in files["z.py"].patch
+    assert files["z.py"].patch.startswith("@@")
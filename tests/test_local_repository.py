@@ -0,0 +1,79 @@
+import logging
+import subprocess
+
+from gitbrew.local_repository import LocalRepository
+
+
+def _checkout(path):
+    """
+    Files of a checkout: a tracked, an untracked, an ignored, an empty and
+    a hidden one
+    """
+    (path / "pkg").mkdir(parents=True)
+    (path / ".hidden").mkdir()
+    (path / "app.py").write_text("print('app')\n" * 10)
+    (path / "pkg" / "new.py").write_text("print('new')\n")
+    (path / "pkg" / "empty.py").write_text("")
+    (path / "build.log").write_text("log\n")
+    (path / ".hidden" / "secret.py").write_text("token = 1\n")
+    (path / ".gitignore").write_text("*.log\n")
+
+
+def test_git_checkout_lists_tracked_and_untracked_files(tmp_path):
+    """
+    A git checkout lists tracked and untracked files, without ignored ones
+    Unit test: list_files
+    """
+    _checkout(tmp_path)
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("add", "app.py", ".gitignore", ".hidden")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "one")
+    repository = LocalRepository(str(tmp_path), logging.getLogger())
+    assert repository.list_files() == [
+        ".gitignore",
+        ".hidden/secret.py",
+        "app.py",
+        "pkg/empty.py",
+        "pkg/new.py",
+    ]
+    assert repository.head()
+
+
+def test_plain_directory_is_walked(tmp_path):
+    """
+    A directory that is not a git repository is walked, skipping hidden
+    directories
+    Unit test: list_files
+    """
+    _checkout(tmp_path)
+    repository = LocalRepository(str(tmp_path), logging.getLogger())
+    assert repository.list_files() == [
+        ".gitignore",
+        "app.py",
+        "build.log",
+        "pkg/empty.py",
+        "pkg/new.py",
+    ]
+    assert repository.head() is None
+
+
+def test_reads_are_capped_and_empty_files_are_read(tmp_path):
+    """
+    Files are read up to max_file_size bytes, empty files give empty content
+    Unit test: get_content, _read
+    """
+    _checkout(tmp_path)
+    repository = LocalRepository(str(tmp_path), logging.getLogger(), max_file_size=20)
+    files = {
+        file.path: file
+        for file in repository.get_content(include=lambda path: path.endswith(".py"))
+    }
+    assert sorted(files) == ["app.py", "pkg/empty.py", "pkg/new.py"]
+    assert files["app.py"].size == 130
+    assert files["app.py"].read() == (b"print('app')\n" * 10)[:20]
+    assert files["pkg/empty.py"].read() == b""
+    assert files["pkg/new.py"].read() == b"print('new')\n"
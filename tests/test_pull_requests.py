@@ -0,0 +1,71 @@
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from gitbrew.pull_requests import PullRequestReviewer
+
+
+@pytest.fixture
+def reviewer(monkeypatch):
+    reviewer = PullRequestReviewer(logging.getLogger())
+    files = [SimpleNamespace(filename=f"file{i}.py", patch="+x") for i in range(30)]
+    monkeypatch.setattr(reviewer, "filter_files", lambda pr: (files, {}))
+    monkeypatch.setattr(reviewer, "generate_review", lambda *args: ["looks good"])
+    return reviewer
+
+
+def _run(target):
+    """
+    Run a function in a thread, failing instead of hanging if it deadlocks
+    :return: result or exception of the function
+    """
+    result = {}
+
+    def run():
+        try:
+            result["value"] = target()
+        except BaseException as e:
+            result["value"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "deadlocked"
+    return result["value"]
+
+
+def test_posting_errors_do_not_stop_the_review(reviewer, monkeypatch):
+    """
+    Files whose review cannot be posted are reported as skipped
+    and the other reviews are still posted
+    Unit test: review_and_post
+    """
+
+    def post_file_review(pr, filename, review):
+        if filename != "file0.py":
+            raise RuntimeError("403 secondary rate limit")
+
+    monkeypatch.setattr(reviewer, "post_file_review", post_file_review)
+    pr = SimpleNamespace(body="", title="")
+    posted, skipped = _run(lambda: reviewer.review_and_post(pr, queue_size=2))
+    assert posted == ["file0.py"]
+    assert len(skipped) == 29
+    assert all(reason.startswith("posting failed") for reason in skipped.values())
+
+
+def test_interrupted_posting_shuts_down_the_workers(reviewer, monkeypatch):
+    """
+    An interruption while posting cancels the pending reviews
+    instead of waiting on workers blocked on the full queue
+    Unit test: review_and_post
+    """
+
+    def post_file_review(pr, filename, review):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(reviewer, "post_file_review", post_file_review)
+    pr = SimpleNamespace(body="", title="")
+    result = _run(lambda: reviewer.review_and_post(pr, queue_size=2))
+    assert isinstance(result, KeyboardInterrupt)
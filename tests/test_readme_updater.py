@@ -0,0 +1,161 @@
+import logging
+import subprocess
+
+import pytest
+
+from gitbrew.readme_updater import ReadmeUpdater
+
+README = "# Tool\r\nIntro\r\n\r\n## Usage\r\n```sh\r\n# not a heading\r\n```\r\n\r\n## License\r\nMIT\r\n"
+
+
+class FakeGenerator:
+    """
+    Stands in for ReadmeGenerator, answers the LLM calls in order
+    """
+
+    def __init__(self, answers, failed=None):
+        self.answers = list(answers)
+        self.failed = failed or {}
+        self.summarized = []
+        self.summary_reducer = self
+        self.rate_limiter = self
+        self.openai_agent = self
+
+    @staticmethod
+    def _to_summarize(path):
+        return str(path).endswith(".py")
+
+    def summarize_files(self, files):
+        self.summarized = [file.path for file in files]
+        return {path: f"summary of {path}" for path in self.summarized}
+
+    def reduce(self, summaries):
+        return summaries
+
+    def acquire(self):
+        pass
+
+    @staticmethod
+    def create_message(system_prompt, user_prompt):
+        return user_prompt
+
+    def ask_llm(self, message):
+        return self.answers.pop(0)
+
+
+def test_split_sections_round_trip():
+    """
+    Sections start at headings outside code blocks and join back unchanged
+    """
+    sections = ReadmeUpdater.split_sections(README)
+    assert [section.split("\r\n")[0] for section in sections] == [
+        "# Tool",
+        "## Usage",
+        "## License",
+    ]
+    assert "".join(sections) == README
+
+
+def test_update_rewrites_only_selected_sections(tmp_path, monkeypatch):
+    """
+    Only the files changed since the recorded commit are summarized,
+    and unselected sections are kept byte for byte
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+    git("init", "-q")
+    (repo / "app.py").write_text("print('a')\n")
+    (repo / "other.py").write_text("print('b')\n")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "one")
+    readme = tmp_path / "README.md"
+    readme.write_bytes(README.encode())
+    generator = FakeGenerator(["1", "<<<SECTION 1>>>\n## Usage\nRun `app`\n"])
+    updater = ReadmeUpdater(generator, logging.getLogger())
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo, text=True)
+    updater.save_state(str(repo), str(readme), head.strip())
+
+    (repo / "app.py").write_text("print('c')\n")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-am", "two")
+    assert updater.update(str(repo), str(readme))
+
+    assert generator.summarized == ["app.py"]
+    assert readme.read_bytes().decode() == README.replace(
+        "## Usage\r\n```sh\r\n# not a heading\r\n```\r\n", "## Usage\r\nRun `app`\r\n"
+    )
+
+
+def _changed_repo(tmp_path):
+    """
+    Repository with a readme state at its first commit and app.py changed since
+    :return: path of the repository, path of the readme, first commit
+    """
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+    git("init", "-q")
+    (repo / "app.py").write_text("print('a')\n")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "one")
+    base = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo, text=True)
+    (repo / "app.py").write_text("print('c')\n")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-am", "two")
+    readme = tmp_path / "README.md"
+    readme.write_bytes(README.encode())
+    return repo, readme, base.strip()
+
+
+@pytest.mark.parametrize(
+    "answers, failed",
+    [
+        ([], {"app.py": "rate limited"}),  # the changed file was not summarized
+        ([None], None),  # no section selection
+        (["1, 2", "<<<SECTION 1>>>\n## Usage\nRun `app`\n"], None),  # one missing
+    ],
+)
+def test_failed_update_keeps_the_state(tmp_path, monkeypatch, answers, failed):
+    """
+    The recorded commit only advances when every change was applied,
+    otherwise the readme is left unchanged for a regeneration
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    repo, readme, base = _changed_repo(tmp_path)
+    updater = ReadmeUpdater(FakeGenerator(answers, failed), logging.getLogger())
+    updater.save_state(str(repo), str(readme), base)
+    assert not updater.update(str(repo), str(readme))
+    assert updater.load_state(str(repo), str(readme))["commit"] == base
+    assert readme.read_bytes().decode() == README
+
+
+def test_uncommitted_changes_are_updated_once(tmp_path, monkeypatch):
+    """
+    Edited and untracked files of a local checkout trigger an update, and
+    are not summarized again while their content stays the same
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    repo, readme, _ = _changed_repo(tmp_path)
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo, text=True)
+    generator = FakeGenerator(["none", "none", "none"])
+    updater = ReadmeUpdater(generator, logging.getLogger())
+    updater.save_state(str(repo), str(readme), head.strip())
+
+    (repo / "app.py").write_text("print('dirty')\n")
+    (repo / "new.py").write_text("print('new')\n")
+    assert updater.update(str(repo), str(readme))
+    assert generator.summarized == ["app.py", "new.py"]
+
+    generator.summarized = []
+    assert updater.update(str(repo), str(readme))
+    assert generator.summarized == []
+
+    (repo / "app.py").write_text("print('c')\n")  # reverted to the commit
+    assert updater.update(str(repo), str(readme))
+    assert generator.summarized == ["app.py"]
@@ -0,0 +1,50 @@
+import logging
+import subprocess
+
+from gitbrew.repo_context import RepoContext
+
+
+def test_context_is_cached_until_the_repository_changes(tmp_path):
+    """
+    The context describes the branch and changed files, is not gathered
+    again while HEAD, the index and the refs are unchanged, and follows
+    branch switches
+    """
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+    git("init", "-q", "-b", "main")
+    (repo / "app.py").write_text("print('a')\n")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "one")
+    context = RepoContext(logging.getLogger(), path=str(repo))
+    calls = []
+    git_command = context._git
+    context._git = lambda *args: calls.append(args) or git_command(*args)
+
+    (repo / "app.py").write_text("print('b')\n")
+    git("add", "app.py")
+    description = context.describe()
+    assert "Current branch: main (no upstream)" in description
+    assert "Changed files (1): M  app.py" in description
+    assert context.scope() == f"{repo}@main"
+    gathered = len(calls)
+    assert context.describe() == description
+    assert len(calls) == gathered  # cached, no git process
+
+    git("checkout", "-q", "-b", "feature")
+    assert "Current branch: feature (no upstream)" in context.describe()
+    assert "Recent branches: " in context.describe()
+    assert context.scope() == f"{repo}@feature"
+
+
+def test_no_context_outside_a_repository(tmp_path):
+    """
+    Outside a repository the context is empty and the scope is the directory
+    """
+    context = RepoContext(logging.getLogger(), path=str(tmp_path))
+    assert context.describe() == ""
+    assert context.scope() == str(tmp_path)
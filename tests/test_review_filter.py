@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+
+from gitbrew.review_filter import ReviewFilter
+
+
+@pytest.fixture
+def review_filter():
+    return ReviewFilter(non_code_files=(".md",))
+
+
+def make_file(filename, patch="@@ -1 +1 @@\n-a = 1\n+a = 2"):
+    return SimpleNamespace(filename=filename, patch=patch)
+
+
+def test_reviewable_file(review_filter):
+    """
+    A regular code change should be reviewed
+    """
+    assert review_filter.classify(make_file("src/app.py")) is None
+
+
+@pytest.mark.parametrize(
+    "filename, reason",
+    [
+        ("README.md", "non-code file"),
+        ("static/app.min.js", "generated"),
+        ("proto/user_pb2.py", "generated"),
+        ("vendor/lib/code.go", "vendored"),
+        ("web/node_modules/pkg/index.js", "vendored"),
+        ("images/logo.png", "binary"),
+    ],
+)
+def test_path_rules(review_filter, filename, reason):
+    """
+    Files are classified by their path before the patch is inspected
+    """
+    assert review_filter.classify(make_file(filename)) == reason
+
+
+def test_patch_heuristics(review_filter):
+    """
+    Missing, huge, minified and whitespace-only patches are skipped
+    """
+    assert review_filter.classify(make_file("a.py", patch=None)).startswith("binary")
+    huge = "@@ -1 +1 @@\n" + "+x = 1\n" * 10000
+    assert review_filter.classify(make_file("a.py", huge)).startswith("patch too")
+    minified = "@@ -1 +1 @@\n+" + "a;" * 1000
+    assert review_filter.classify(make_file("a.js", minified)).startswith("minified")
+    whitespace = "@@ -1,2 +1,2 @@\n-if x:\n-  y()\n+if  x:\n+    y()\n+"
+    assert review_filter.classify(make_file("a.py", whitespace)) == (
+        "whitespace-only changes"
+    )
+
+
+def test_gitattributes_overrides_defaults(review_filter):
+    """
+    .gitattributes rules are applied after the defaults, the last match wins
+    """
+    review_filter.load_gitattributes(
+        "# comment\n"
+        "*.min.js -linguist-generated\n"
+        "gen/** linguist-generated=true\n"
+        "lib/external/ linguist-vendored\n"
+    )
+    assert review_filter.classify(make_file("static/app.min.js")) is None
+    assert review_filter.classify(make_file("gen/models.py")) == "generated"
+    assert review_filter.classify(make_file("lib/external/x.c")) == "vendored"
+
+
+def test_partition(review_filter):
+    """
+    partition returns the files to review and the skipped files with reasons
+    """
+    files = [make_file("a.py"), make_file("docs.md"), make_file("b.py", None)]
+    to_review, skipped = review_filter.partition(files)
+    assert [file.filename for file in to_review] == ["a.py"]
+    assert set(skipped) == {"docs.md", "b.py"}
+
+
+def test_content_changes_are_not_mistaken_for_whitespace(review_filter):
+    """
+    Reordered lines, removed lines that look like diff headers and a single
+    long line among regular code are reviewed
+    """
+    reordered = "@@ -1,2 +1,2 @@\n-x = 1\n-y = x\n+y = x\n+x = 1"
+    assert review_filter.classify(make_file("a.py", reordered)) is None
+    sql_comment = "@@ -1,2 +1 @@\n-- a\n select 1"
+    assert review_filter.classify(make_file("a.sql", sql_comment)) is None
+    increment = "@@ -1 +1 @@\n-x = 1\n++x"
+    assert review_filter.classify(make_file("a.c", increment)) is None
+    long_url = "@@ -1 +1,4 @@\n+a = 1\n+b = 2\n+c = 3\n+URL = '" + "u" * 600 + "'"
+    assert review_filter.classify(make_file("a.py", long_url)) is None
+    rewrapped = "@@ -1,2 +1 @@\n-call(a,\n-     b)\n+call(a, b)"
+    assert review_filter.classify(make_file("a.py", rewrapped)) == (
+        "whitespace-only changes"
+    )
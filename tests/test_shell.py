@@ -0,0 +1,49 @@
+import inspect
+
+import pytest
+
+import gitbrew.shell
+from gitbrew.shell import Shell
+
+
+@pytest.fixture
+def shell(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=test\n")
+    return Shell()
+
+
+def test_menu_round_trips_keep_the_stack_flat(shell, monkeypatch):
+    """
+    Returning to the menu after a utility does not nest calls,
+    thousands of round trips run at a constant stack depth
+    """
+    rounds, depths = 3000, set()
+
+    class Handler:
+        def handle(self):
+            depths.add(len(inspect.stack(0)))
+
+    shell.readme_generator = Handler()
+    answers = iter(["Generate a Readme"] * rounds + ["Exit"])
+    monkeypatch.setattr(
+        gitbrew.shell, "prompt", lambda questions: {"utility": next(answers)}
+    )
+    with pytest.raises(SystemExit):
+        shell.cmdloop()
+    assert len(depths) == 1
+
+
+def test_cancel_returns_to_the_menu(shell, monkeypatch):
+    """
+    "cancel" leaves the git command line for the menu without re-entering it
+    """
+    answers = iter(["Use the git command line", "Exit"])
+    monkeypatch.setattr(
+        gitbrew.shell, "prompt", lambda questions: {"utility": next(answers)}
+    )
+    shell.cmdqueue = ["cancel"]
+    with pytest.raises(SystemExit):
+        shell.cmdloop()
+    assert shell.state == Shell.EXIT
+    assert next(answers, None) is None
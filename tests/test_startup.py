@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# seconds from the first gitbrew import to the first prompt, override on slow machines
+BUDGET = float(os.getenv("GITBREW_STARTUP_BUDGET", "1.0"))
+
+# libraries that must not be imported before the user picks a utility
+HEAVY_MODULES = {
+    "cohere",
+    "gensim",
+    "github",
+    "openai",
+    "pinecone",
+    "rich",
+    "sklearn",
+    "tiktoken",
+    "tqdm",
+}
+
+# runs gitbrew.main:main up to the first prompt of the shell
+HARNESS = """
+import json, sys, time
+start = time.perf_counter()
+import gitbrew.shell
+gitbrew.shell.Shell.cmdloop = lambda self, intro=None: None
+sys.argv = ["gitbrew"]
+from gitbrew.main import main
+main()
+print(json.dumps({"elapsed": time.perf_counter() - start, "modules": list(sys.modules)}))
+"""
+
+
+def _start(tmp_path):
+    """
+    Start the shell in a fresh interpreter with -X importtime
+    :return: elapsed seconds, imported modules, import time report
+    """
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=\nGITHUB_TOKEN=\n")
+    env = dict(
+        os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.getenv("PYTHONPATH", "")])
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", HARNESS],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+    return state["elapsed"], set(state["modules"]), result.stderr
+
+
+def _slowest_imports(report, n=10):
+    """
+    Top level imports with the largest cumulative time, from -X importtime
+    """
+    rows = []
+    for line in report.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("   "):
+                rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def test_time_to_prompt(tmp_path):
+    """
+    The shell reaches its first prompt within the startup budget,
+    without importing the libraries of the utilities
+    Best of three runs, to smooth out a cold disk cache
+    """
+    runs = [_start(tmp_path) for _ in range(3)]
+    elapsed, modules, report = min(runs, key=lambda run: run[0])
+    loaded = {name.split(".")[0] for name in modules} & HEAVY_MODULES
+    assert not loaded, f"heavy modules imported at startup: {sorted(loaded)}"
+    assert elapsed < BUDGET, (
+        f"time to prompt {elapsed:.2f}s exceeds the budget of {BUDGET}s, "
+        f"slowest imports (us): {_slowest_imports(report)}"
+    )
@@ -0,0 +1,57 @@
+import logging
+
+from gitbrew.generate_readme import ReadmeGenerator
+from gitbrew.repo_file import RepoFile
+from gitbrew.summary_cache import SummaryCache
+
+
+def test_summaries_are_reused_until_the_key_changes(tmp_path):
+    """
+    A stored summary is returned for the same sha, prompt version and model
+    Unit test: get_or_create
+    """
+    cache = SummaryCache(logging.getLogger(), path=str(tmp_path / "cache.sqlite3"))
+    calls = []
+
+    def create():
+        calls.append(1)
+        return f"summary {len(calls)}"
+
+    assert cache.get_or_create("a" * 40, 1, "model", create) == "summary 1"
+    assert cache.get_or_create("a" * 40, 1, "model", create) == "summary 1"
+    assert cache.get_or_create("a" * 40, 2, "model", create) == "summary 2"
+    assert cache.get_or_create("a" * 40, 1, "other", create) == "summary 3"
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_empty_summaries_are_not_stored(tmp_path):
+    """
+    A failed LLM call is asked again on the next run
+    Unit test: get_or_create
+    """
+    cache = SummaryCache(logging.getLogger(), path=str(tmp_path / "cache.sqlite3"))
+    assert cache.get_or_create("a" * 40, 1, "model", lambda: None) is None
+    assert cache.get("a" * 40, 1, "model") is None
+
+
+def test_file_summaries_are_keyed_by_path(tmp_path, monkeypatch):
+    """
+    Identical content at two paths is summarized once per path, since the
+    prompt names the file
+    Unit test: _summarize_file
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    generator = ReadmeGenerator(logging.getLogger())
+    prompts = []
+    monkeypatch.setattr(
+        generator, "_ask_llm", lambda file, prompt: prompts.append(prompt) or str(file)
+    )
+    content = b"def main():\n    pass\n"
+    files = [
+        RepoFile("a/cli.py", content=content),
+        RepoFile("b/cli.py", content=content),
+        RepoFile("a/cli.py", content=content),
+    ]
+    summaries = [generator._summarize_file(file) for file in files]
+    assert summaries == ["a/cli.py", "b/cli.py", "a/cli.py"]
+    assert len(prompts) == 2
@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+
+from gitbrew.llms.openai import OpenAI
+from gitbrew.summary_reducer import SummaryReducer
+
+
+class FakeAgent:
+    """
+    Stands in for the OpenAI agent, answers every directory prompt with
+    a fixed summary, or echoes the prompt
+    """
+
+    chat_model = "fake-model"
+    create_message = staticmethod(OpenAI.create_message)
+
+    def __init__(self, answer=None):
+        self.answer = answer
+        self.directories = []
+
+    def ask_llm(self, message):
+        prompt = message[-1]["content"]
+        self.directories.append(prompt)
+        return self.answer or prompt
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """
+    Count words as tokens, so that budgets do not depend on the tokenizer
+    """
+    monkeypatch.setattr(
+        "gitbrew.summary_reducer.count_tokens", lambda text: len(text.split())
+    )
+
+
+SUMMARIES = {
+    "setup.py": "installs the package",
+    "pkg/cli.py": "command line " * 10,
+    "pkg/core/engine.py": "runs the engine " * 10,
+    "pkg/core/state.py": "keeps the state " * 10,
+}
+
+
+def test_deepest_level_is_rolled_up_first():
+    """
+    Only the deepest directories are summarized while that is enough to fit
+    Unit test: reduce
+    """
+    agent = FakeAgent("summary of the directory")
+    reducer = SummaryReducer(agent, logging.getLogger(), token_budget=80)
+    reduced = reducer.reduce(SUMMARIES)
+    assert list(reduced) == ["pkg/cli.py", "pkg/core/", "setup.py"]
+    assert reduced["pkg/core/"] == "summary of the directory"
+    assert len(agent.directories) == 1
+
+
+def test_levels_are_rolled_up_to_the_root():
+    """
+    Levels are reduced one after the other until the summaries fit
+    Unit test: reduce
+    """
+    agent = FakeAgent("summary")
+    reducer = SummaryReducer(agent, logging.getLogger(), token_budget=5)
+    assert reducer.reduce(SUMMARIES) == {"./": "summary"}
+    assert len(agent.directories) == 3  # pkg/core/, pkg/ and the root
+
+
+def test_reduction_stops_when_it_cannot_shrink():
+    """
+    A root summary that is not shorter than its input ends the reduction
+    Unit test: reduce
+    """
+    agent = FakeAgent()
+    reducer = SummaryReducer(agent, logging.getLogger(), token_budget=1)
+    reduced = reducer.reduce({"setup.py": "installs the package"})
+    assert reduced == {"setup.py": "installs the package"}
+    assert len(agent.directories) == 1
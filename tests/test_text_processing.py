@@ -0,0 +1,47 @@
+from gitbrew.text_processing import is_binary, iter_text, split_text
+
+
+def test_is_binary():
+    """
+    Content with a NUL byte near the start is binary
+    """
+    assert is_binary(b"\x89PNG\r\n\x1a\n\0\0\0")
+    assert not is_binary("print('héllo')\n".encode())
+
+
+def test_iter_text_handles_split_and_invalid_sequences():
+    """
+    Multi-byte characters split across blocks are decoded,
+    invalid sequences are replaced instead of raising
+    """
+    data = "é".encode() * 3 + b"\xff"
+    assert "".join(iter_text(data, block_size=1)) == "ééé�"
+
+
+def test_split_text_within_budget():
+    """
+    Small content is returned as a single chunk
+    """
+    assert split_text(b"a = 1\nb = 2\n", 100, 4) == (["a = 1\nb = 2\n"], False)
+
+
+def test_split_text_is_bounded():
+    """
+    Large content is split into chunks of at most the token budget
+    and reading stops after max_chunks chunks
+    """
+    data = b"INSERT INTO t VALUES (1);\n" * 5000
+    chunks, truncated = split_text(data, 200, 3)
+    assert len(chunks) == 3
+    assert truncated
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+def test_split_text_splits_long_lines():
+    """
+    A single line over the budget (minified code) is split as well
+    """
+    chunks, truncated = split_text(b"a;" * 10000, 500, 100)
+    assert len(chunks) > 1
+    assert not truncated
+    assert "".join(chunks) == "a;" * 10000
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from gitbrew.webhook import WebhookServer, replay
+
+PAYLOAD = os.path.join(
+    os.path.dirname(__file__), "payloads", "pull_request_opened.json"
+)
+SECRET = "webhook-secret"
+
+
+class FakeReviewer:
+    """
+    Stands in for PullRequestReviewer, records the reviewed pull requests
+    """
+
+    def __init__(self):
+        self.reviewed = []
+        self.posted = []
+        self.git_helper = SimpleNamespace(
+            github=SimpleNamespace(get_repo=self._get_repo)
+        )
+
+    def _get_repo(self, repo_name):
+        return SimpleNamespace(
+            get_pull=lambda number: SimpleNamespace(
+                repo=repo_name, number=number, head=SimpleNamespace(sha="head")
+            )
+        )
+
+    def review_files(self, pr):
+        self.reviewed.append((pr.repo, pr.number))
+        return {"greeting.py": ["Looks good."]}, {"README.md": "non-code file"}
+
+    def review_and_post(self, pr):
+        reviews, skipped = self.review_files(pr)
+        self.posted.append((pr.repo, pr.number))
+        return list(reviews), skipped
+
+
+@pytest.fixture
+def payload():
+    with open(PAYLOAD, "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def server():
+    server = WebhookServer(
+        FakeReviewer(), logging.getLogger(__name__), secret=SECRET, port=0
+    )
+    server.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def url(server):
+    host, port = server.address
+    return f"http://{host}:{port}/"
+
+
+def test_review_recorded_payload(server, url, payload):
+    """
+    A recorded pull_request payload is queued, reviewed and posted
+    """
+    status, response = replay(url, payload, secret=SECRET)
+    assert (status, response["message"]) == (202, "queued")
+    server.queue.join()
+    assert server.reviewer.reviewed == [("octocat/hello-world", 42)]
+    assert server.reviewer.posted == [("octocat/hello-world", 42)]
+
+
+def test_invalid_signature(server, url, payload):
+    """
+    Deliveries with a wrong signature are rejected
+    """
+    status, _ = replay(url, payload, secret="wrong-secret")
+    assert status == 401
+    assert server.queue.qsize() == 0
+
+
+def test_ignored_deliveries(server, url, payload):
+    """
+    Pings, other events, closed and draft pull requests are not reviewed
+    """
+    assert replay(url, payload, event="ping", secret=SECRET)[0] == 200
+    assert replay(url, payload, event="issues", secret=SECRET)[0] == 202
+    closed = dict(json.loads(payload), action="closed")
+    assert replay(url, closed, secret=SECRET)[1]["message"] == "ignored action: closed"
+    server.queue.join()
+    assert server.reviewer.reviewed == []
+
+
+def test_repeated_pushes_are_coalesced():
+    """
+    A pull request that is already queued is reviewed once at its latest head
+    """
+    server = WebhookServer(FakeReviewer(), logging.getLogger(__name__), port=0)
+    server.enqueue("octocat/hello-world", 42, "first")
+    server.enqueue("octocat/hello-world", 42, "second")
+    assert server.queue.qsize() == 1
+    assert server._pending[("octocat/hello-world", 42)] == "second"
+    server.httpd.server_close()
+
+
+def test_secret_is_required_off_loopback():
+    """
+    Without a secret the server only listens on loopback interfaces,
+    where unsigned deliveries are accepted
+    """
+    for host in ("0.0.0.0", "", "example.com"):
+        with pytest.raises(ValueError):
+            WebhookServer(FakeReviewer(), logging.getLogger(__name__), host=host)
+    server = WebhookServer(FakeReviewer(), logging.getLogger(__name__), port=0)
+    assert server.verify_signature(None, b"{}")
+    server.httpd.server_close()
+    assert WebhookServer.is_loopback("::1") and WebhookServer.is_loopback("localhost")